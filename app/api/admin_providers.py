@@ -2,10 +2,12 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from config import get_config
+from api.jobs import enqueue_job_response
+from api.providers import breaker_out, limiter_out, raise_if_provider_unavailable
 from database import get_db
 from schemas.admin_providers import (
     ProviderConnectionCreateIn,
@@ -26,16 +28,21 @@ from schemas.admin_providers import (
     VectorStoreSearchIn,
     VectorStoreUpdateIn,
 )
+from schemas.rows import provider_file_upload_row
 from services.provider_file_uploads_service import ProviderFileUploadsService
 from services.provider_sync_service import ProviderSyncService
 from services.provider_vector_stores_service import ProviderVectorStoresService
 from services.providers_connections_service import ProvidersConnectionsService
 from utils.crypto import encrypt_json
+from utils.cursor import next_cursor
+from utils.json_response import FastJSONResponse
+from utils.ndjson import ndjson_response, wants_ndjson
 
 router = APIRouter(prefix="/api/v1/admin/providers", tags=["providers-admin"])
 
 
 def _raise_provider_error(e: Exception) -> None:
+    raise_if_provider_unavailable(e)
     if isinstance(e, ValueError):
         raise HTTPException(status_code=400, detail=str(e)) from e
     if isinstance(e, NotImplementedError):
@@ -53,10 +60,22 @@ def encrypt_provider_credentials(payload: ProviderCredentialsEncryptIn):
     return ProviderCredentialsEncryptOut(credentials_enc=credentials_enc)
 
 
+def _iter_sync_ndjson(report: dict, file_results):
+    for file_result in file_results:
+        yield {"type": "file_result", **file_result}
+
+    yield {"type": "report", **report}
+
+
 @router.post("/{provider_type}/sync")
-def sync_provider_data(provider_type: str, db: Session = Depends(get_db)):
+def sync_provider_data(provider_type: str, request: Request, background: bool = False, db: Session = Depends(get_db)):
+    if background:
+        return enqueue_job_response(db, "provider_sync", domain_id=None, provider_type=provider_type)
     try:
         service = ProviderSyncService(db=db)
+        if wants_ndjson(request):
+            report, file_results = service.stream_sync(provider_type=provider_type)
+            return ndjson_response(_iter_sync_ndjson(report, file_results))
         return service.sync(provider_type=provider_type)
     except Exception as e:
         _raise_provider_error(e)
@@ -80,6 +99,10 @@ def list_connections(db: Session = Depends(get_db)):
                 has_credentials=bool(c.credentials_enc),
                 has_token=bool(c.token_enc),
                 token_expires_at=c.token_expires_at,
+                rate_limit_per_minute=c.rate_limit_per_minute,
+                rate_limit_burst=c.rate_limit_burst,
+                max_concurrency=c.max_concurrency,
+                http_options=c.http_options,
                 created_at=c.created_at,
                 updated_at=c.updated_at,
             )
@@ -105,6 +128,10 @@ def get_connection(provider_type: str, db: Session = Depends(get_db)):
         has_credentials=bool(c.credentials_enc),
         has_token=bool(c.token_enc),
         token_expires_at=c.token_expires_at,
+        rate_limit_per_minute=c.rate_limit_per_minute,
+        rate_limit_burst=c.rate_limit_burst,
+        max_concurrency=c.max_concurrency,
+        http_options=c.http_options,
         created_at=c.created_at,
         updated_at=c.updated_at,
     )
@@ -126,6 +153,10 @@ def create_connection(
         token=payload.token,
         token_expires_at=payload.token_expires_at,
         is_enabled=payload.is_enabled,
+        rate_limit_per_minute=payload.rate_limit_per_minute,
+        rate_limit_burst=payload.rate_limit_burst,
+        max_concurrency=payload.max_concurrency,
+        http_options=payload.http_options.model_dump(exclude_none=True) if payload.http_options else None,
     )
 
     return ProviderConnectionOut(
@@ -138,6 +169,10 @@ def create_connection(
         has_credentials=bool(c.credentials_enc),
         has_token=bool(c.token_enc),
         token_expires_at=c.token_expires_at,
+        rate_limit_per_minute=c.rate_limit_per_minute,
+        rate_limit_burst=c.rate_limit_burst,
+        max_concurrency=c.max_concurrency,
+        http_options=c.http_options,
         created_at=c.created_at,
         updated_at=c.updated_at,
     )
@@ -159,6 +194,10 @@ def patch_connection(
         token=payload.token,
         token_expires_at=payload.token_expires_at,
         is_enabled=payload.is_enabled,
+        rate_limit_per_minute=payload.rate_limit_per_minute,
+        rate_limit_burst=payload.rate_limit_burst,
+        max_concurrency=payload.max_concurrency,
+        http_options=payload.http_options.model_dump(exclude_none=True) if payload.http_options else None,
     )
     if c is None:
         raise HTTPException(status_code=404, detail="Подключение провайдера не найдено")
@@ -173,6 +212,10 @@ def patch_connection(
         has_credentials=bool(c.credentials_enc),
         has_token=bool(c.token_enc),
         token_expires_at=c.token_expires_at,
+        rate_limit_per_minute=c.rate_limit_per_minute,
+        rate_limit_burst=c.rate_limit_burst,
+        max_concurrency=c.max_concurrency,
+        http_options=c.http_options,
         created_at=c.created_at,
         updated_at=c.updated_at,
     )
@@ -200,12 +243,23 @@ def provider_health(provider_type: str, db: Session = Depends(get_db)):
         c.last_healthcheck_at = datetime.utcnow()
         c.last_error = None
         db.commit()
-        return ProviderHealthOut(provider_type=provider_type, status="ok")
+        return ProviderHealthOut(
+            provider_type=provider_type,
+            status="ok",
+            breaker=breaker_out(provider_type),
+            limiter=limiter_out(provider_type),
+        )
     except Exception as e:
         c.last_healthcheck_at = datetime.utcnow()
         c.last_error = str(e)
         db.commit()
-        return ProviderHealthOut(provider_type=provider_type, status="failed", detail=str(e))
+        return ProviderHealthOut(
+            provider_type=provider_type,
+            status="failed",
+            detail=str(e),
+            breaker=breaker_out(provider_type),
+            limiter=limiter_out(provider_type),
+        )
 
 
 @router.get("/{provider_type}/vector-stores")
@@ -502,12 +556,20 @@ def list_file_uploads(
     provider_type: str,
     skip: int = 0,
     limit: int = 100,
+    after: str | None = None,
     db: Session = Depends(get_db),
 ):
     service = ProviderFileUploadsService(db=db)
-    items = service.list_uploads(provider_type=provider_type, skip=skip, limit=limit)
-    return ProviderFileUploadsListOut(
-        items=[ProviderFileUploadOut.model_validate(i, from_attributes=True) for i in items]
+    try:
+        items = service.list_uploads(provider_type=provider_type, skip=skip, limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    return FastJSONResponse(
+        {
+            "items": [provider_file_upload_row(i) for i in items],
+            "next_cursor": next_cursor(items, limit),
+        }
     )
 
 
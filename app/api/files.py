@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-from pathlib import Path
+import os
 
-from fastapi import APIRouter, Body, Depends, File, Form, Header, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 
+from api.providers import raise_if_provider_unavailable
+from config import get_config
 from database import get_db
 from schemas.files import (
     FileChangeDomainIn,
@@ -17,8 +20,15 @@ from schemas.files import (
     FileProviderUploadsListOut,
     FilesListOut,
 )
-from services.files_service import FilesService, parse_chunking_strategy, parse_tags
+from schemas.rows import file_row
+from services.files_service import FilesService, backfill_content_sha256, parse_chunking_strategy, parse_tags
 from services.provider_file_uploads_service import ProviderFileUploadsService
+from utils.cursor import next_cursor
+from utils.file_response import ContentFileResponse
+from utils.file_sink import FileSink
+from utils.json_response import FastJSONResponse
+from utils.multipart_upload import FILE_TOO_LARGE, receive_multipart_file
+from utils.ndjson import ndjson_response, wants_ndjson
 
 router = APIRouter(prefix="/api/v1", tags=["files"])
 
@@ -29,43 +39,115 @@ def get_domain_id(x_domain_id: str | None = Header(default=None, alias="X-Domain
     return x_domain_id.strip()
 
 
-@router.post("/files", response_model=FileOut)
-def upload_file(
-    file: UploadFile = File(...),
-    file_type: str | None = Form(default=None),
-    tags: str | None = Form(default=None),
-    notes: str | None = Form(default=None),
-    chunking_strategy: str | None = Form(default=None),
+# Запас на разметку multipart и поля формы сверх UPLOAD_MAX_FILE_BYTES при проверке Content-Length
+_MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+
+_UPLOAD_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "file_type": {"type": "string"},
+                        "tags": {"type": "string"},
+                        "notes": {"type": "string"},
+                        "chunking_strategy": {"type": "string"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+@router.post("/files", response_model=FileOut, openapi_extra=_UPLOAD_FORM_SCHEMA)
+async def upload_file(
+    request: Request,
     domain_id: str = Depends(get_domain_id),
     db: Session = Depends(get_db),
 ):
+    # Асинхронный обработчик: multipart разбирается по мере чтения из сокета, файл пишется
+    # сразу в FILES_ROOT (без промежуточного временного файла) с подсчётом SHA-256;
+    # диск и БД — в пуле потоков, цикл событий не блокируется
+    config = get_config()
+    service = FilesService(db=db, domain_id=domain_id)
+    max_file_bytes = config.upload_max_file_bytes
+    content_length = request.headers.get("content-length")
+    declared = int(content_length) if content_length and content_length.isdigit() else None
+    if max_file_bytes > 0 and declared is not None and declared > max_file_bytes + _MULTIPART_OVERHEAD_BYTES:
+        raise HTTPException(status_code=413, detail=FILE_TOO_LARGE)
+    # Место предвыделяется по заявленному Content-Length, только если размер ограничен:
+    # иначе клиент с огромным Content-Length и медленным телом держал бы занятым сколько угодно диска
+    preallocate = 0
+    if config.upload_preallocate and declared is not None and max_file_bytes > 0:
+        preallocate = min(declared, max_file_bytes)
+    target: dict = {}
+
+    async def open_sink(file_name: str, content_type: str | None) -> FileSink:
+        file_id, path = await run_in_threadpool(service.new_upload_path, file_name)
+        target.update(file_id=file_id, path=path)
+        return await FileSink.open(str(path), buffer_size=config.upload_write_buffer_bytes, preallocate=preallocate)
+
     try:
-        parsed_tags = parse_tags(tags)
-        parsed_chunking_strategy = parse_chunking_strategy(chunking_strategy)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e)) from e
+        upload = await receive_multipart_file(
+            request.headers.get("content-type"),
+            request.stream(),
+            open_sink,
+            max_file_bytes=max_file_bytes,
+        )
+        fields = upload.fields
+        parsed_tags = parse_tags(fields.get("tags") or None)
+        parse_chunking_strategy(fields.get("chunking_strategy") or None)
+        rag_file = await run_in_threadpool(
+            lambda: service.add_uploaded_file(
+                file_id=target["file_id"],
+                path=target["path"],
+                file_type=fields.get("file_type") or upload.content_type,
+                size_bytes=upload.sink.size,
+                content_sha256=upload.sink.sha256,
+                tags=parsed_tags,
+                notes=fields.get("notes"),
+            )
+        )
+    except BaseException as e:
+        if "path" in target:
+            await run_in_threadpool(service.discard_upload_path, target["path"])
+        if isinstance(e, ValueError):
+            status_code = 413 if str(e) == FILE_TOO_LARGE else 400
+            raise HTTPException(status_code=status_code, detail=str(e)) from e
+        raise
 
-    service = FilesService(db=db, domain_id=domain_id)
-    rag_file = service.create_file(
-        upload=file,
-        file_type=file_type,
-        tags=parsed_tags,
-        notes=notes,
-        chunking_strategy=parsed_chunking_strategy,
-    )
     return FileOut.model_validate(rag_file, from_attributes=True)
 
 
 @router.get("/files", response_model=FilesListOut)
 def list_files(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
+    after: str | None = None,
     domain_id: str = Depends(get_domain_id),
     db: Session = Depends(get_db),
 ):
     service = FilesService(db=db, domain_id=domain_id)
-    items = service.list_files(skip=skip, limit=limit)
-    return FilesListOut(items=[FileOut.model_validate(i, from_attributes=True) for i in items])
+    try:
+        if wants_ndjson(request):
+            return ndjson_response(file_row(i) for i in service.iter_files(skip=skip, limit=limit, after=after))
+
+        items = service.list_files(skip=skip, limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    return FastJSONResponse(
+        {
+            "items": [file_row(i) for i in items],
+            "next_cursor": next_cursor(items, limit),
+        }
+    )
 
 
 @router.get("/files/{file_id}", response_model=FileOut)
@@ -82,23 +164,36 @@ def get_file(
 
 
 @router.get("/files/{file_id}/download")
+@router.head("/files/{file_id}/download", include_in_schema=False)
 def download_file(
     file_id: str,
     domain_id: str = Depends(get_domain_id),
     db: Session = Depends(get_db),
 ):
+    # ETag — SHA-256 содержимого: If-None-Match -> 304, If-Range + Range -> 206 (в т.ч. multipart/byteranges)
     service = FilesService(db=db, domain_id=domain_id)
     rag_file = service.get_file(file_id)
     if rag_file is None:
         raise HTTPException(status_code=404, detail="Файл не найден")
 
-    if not Path(rag_file.local_path).exists():
-        raise HTTPException(status_code=404, detail="Файл не найден на диске")
+    try:
+        stat_result = os.stat(rag_file.local_path)
+    except OSError as e:
+        raise HTTPException(status_code=404, detail="Файл не найден на диске") from e
+
+    # У файлов, загруженных до появления content_sha256, хеш досчитывается после ответа
+    background = None
+    if rag_file.content_sha256 is None:
+        background = BackgroundTask(backfill_content_sha256, rag_file.id)
 
-    return FileResponse(
-        path=rag_file.local_path,
+    return ContentFileResponse(
+        rag_file.local_path,
+        stat_result=stat_result,
+        content_sha256=rag_file.content_sha256,
+        chunk_size=get_config().download_chunk_size_bytes,
         filename=rag_file.file_name,
         media_type=rag_file.file_type,
+        background=background,
     )
 
 
@@ -188,6 +283,7 @@ def get_or_create_provider_upload(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
     except Exception as e:
+        raise_if_provider_unavailable(e)
         raise HTTPException(status_code=502, detail=f"Ошибка загрузки файла в провайдера: {e}") from e
 
     return FileProviderUploadOut.model_validate(upload, from_attributes=True)
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Header, HTTPException
+import asyncio
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from sqlalchemy.orm import Session
 
-from database import get_db
+from api.jobs import enqueue_job_response
+from api.providers import raise_if_provider_unavailable
+from config import get_config
+from database import get_db, get_session_maker
+from providers.limiter import PRIORITY_INTERACTIVE, provider_priority
+from schemas.jobs import JobOut
 from schemas.indexes import (
     AttachFileIn,
     IndexCreateIn,
     IndexFilesListOut,
-    IndexFileOut,
     IndexesListOut,
     IndexProviderFileOut,
     IndexProviderFilesOut,
@@ -22,12 +29,18 @@ from schemas.indexes import (
     IndexSyncOut,
 )
 from schemas.files import FileOut
+from schemas.rows import file_row, index_row
+from services.index_events import get_index_events_watcher, initial_events
 from services.index_files_service import IndexFilesService
 from services.index_files_provider_status_service import IndexFilesProviderStatusService
 from services.index_search_service import IndexSearchService
 from services.indexes_service import IndexesService
 from services.index_publish_service import IndexPublishService
 from services.indexes_sync_service import IndexesSyncService
+from utils.cursor import next_cursor
+from utils.json_response import FastJSONResponse
+from utils.ndjson import ndjson_response, wants_ndjson
+from utils.sse import format_sse, format_sse_comment, sse_response
 
 router = APIRouter(prefix="/api/v1", tags=["indexes"])
 
@@ -38,6 +51,11 @@ def get_domain_id(x_domain_id: str | None = Header(default=None, alias="X-Domain
     return x_domain_id.strip()
 
 
+def _require_index(db: Session, domain_id: str, index_id: str) -> None:
+    if IndexesService(db=db, domain_id=domain_id).get_index(index_id) is None:
+        raise HTTPException(status_code=404, detail="Индекс не найден")
+
+
 @router.post("/indexes", response_model=IndexOut)
 def create_index(
     payload: IndexCreateIn,
@@ -45,14 +63,17 @@ def create_index(
     db: Session = Depends(get_db),
 ):
     service = IndexesService(db=db, domain_id=domain_id)
-    rag_index = service.create_index(
-        provider_type=payload.provider_type,
-        name=payload.name,
-        description=payload.description,
-        expires_after=payload.expires_after,
-        file_ids=payload.file_ids,
-        metadata=payload.metadata,
-    )
+    try:
+        rag_index = service.create_index(
+            provider_type=payload.provider_type,
+            name=payload.name,
+            description=payload.description,
+            expires_after=payload.expires_after,
+            file_ids=payload.file_ids,
+            metadata=payload.metadata,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
     return IndexOut.model_validate(rag_index, from_attributes=True)
 
 
@@ -60,12 +81,83 @@ def create_index(
 def list_indexes(
     skip: int = 0,
     limit: int = 100,
+    after: str | None = None,
     domain_id: str = Depends(get_domain_id),
     db: Session = Depends(get_db),
 ):
     service = IndexesService(db=db, domain_id=domain_id)
-    items = service.list_indexes(skip=skip, limit=limit)
-    return IndexesListOut(items=[IndexOut.model_validate(i, from_attributes=True) for i in items])
+    try:
+        items = service.list_indexes(skip=skip, limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    return FastJSONResponse(
+        {
+            "items": [index_row(i) for i in items],
+            "next_cursor": next_cursor(items, limit),
+        }
+    )
+
+
+async def _iter_index_events(
+    request: Request,
+    *,
+    domain_id: str,
+    index_id: str | None,
+    initial: list[tuple[str, dict]],
+) -> AsyncIterator[bytes]:
+    # Поток SSE: снимок текущего состояния, затем изменения от общего наблюдателя (один опрос БД
+    # на процесс для всех подписчиков) и комментарий-пинг, чтобы прокси не закрывали соединение
+    heartbeat = max(1, get_config().sse_heartbeat_seconds)
+    watcher = get_index_events_watcher()
+    subscription = watcher.subscribe(domain_id, index_id)
+    try:
+        yield format_sse_comment("connected")
+        for event, data in initial:
+            yield format_sse(event, data)
+        while True:
+            try:
+                event_id, event, data = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield format_sse_comment("ping")
+                continue
+            yield format_sse(event, data, event_id=event_id)
+    finally:
+        watcher.unsubscribe(subscription)
+
+
+def _initial_index_events(domain_id: str, index_id: str | None) -> list[tuple[str, dict]]:
+    # Снимок — в короткой сессии, закрытой до начала потока: Depends(get_db) держал бы
+    # соединение из пула, пока открыт SSE, и десятки подписчиков исчерпали бы пул
+    db = get_session_maker()()
+    try:
+        if index_id is not None:
+            _require_index(db, domain_id, index_id)
+        return initial_events(db, domain_id=domain_id, index_id=index_id)
+    finally:
+        db.close()
+
+
+# Объявлен до /indexes/{index_id}, иначе "events" совпадёт с index_id
+@router.get("/indexes/events")
+def stream_domain_index_events(
+    request: Request,
+    domain_id: str = Depends(get_domain_id),
+):
+    initial = _initial_index_events(domain_id, None)
+    return sse_response(_iter_index_events(request, domain_id=domain_id, index_id=None, initial=initial))
+
+
+@router.get("/indexes/{index_id}/events")
+def stream_index_events(
+    index_id: str,
+    request: Request,
+    domain_id: str = Depends(get_domain_id),
+):
+    initial = _initial_index_events(domain_id, index_id)
+    return sse_response(_iter_index_events(request, domain_id=domain_id, index_id=index_id, initial=initial))
 
 
 @router.get("/indexes/{index_id}", response_model=IndexOut)
@@ -89,29 +181,43 @@ def patch_index(
     db: Session = Depends(get_db),
 ):
     service = IndexesService(db=db, domain_id=domain_id)
-    rag_index = service.update_index(
-        index_id=index_id,
-        provider_type=payload.provider_type,
-        name=payload.name,
-        description=payload.description,
-        expires_after=payload.expires_after,
-        file_ids=payload.file_ids,
-        metadata=payload.metadata,
-    )
+    try:
+        rag_index = service.update_index(
+            index_id=index_id,
+            provider_type=payload.provider_type,
+            name=payload.name,
+            description=payload.description,
+            expires_after=payload.expires_after,
+            file_ids=payload.file_ids,
+            metadata=payload.metadata,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
     if rag_index is None:
         raise HTTPException(status_code=404, detail="Индекс не найден")
     return IndexOut.model_validate(rag_index, from_attributes=True)
 
 
-@router.post("/indexes/{index_id}/publish", response_model=IndexPublishOut)
+@router.post("/indexes/{index_id}/publish", response_model=IndexPublishOut, responses={202: {"model": JobOut}})
 def publish_index(
     index_id: str,
     detach_extra: bool = True,
     force_upload: bool = False,
     dry_run: bool = False,
+    background: bool = False,
     domain_id: str = Depends(get_domain_id),
     db: Session = Depends(get_db),
 ):
+    if background:
+        _require_index(db, domain_id, index_id)
+        return enqueue_job_response(
+            db,
+            "publish",
+            domain_id=domain_id,
+            index_id=index_id,
+            params={"detach_extra": detach_extra, "force_upload": force_upload, "dry_run": dry_run},
+        )
+
     service = IndexPublishService(db=db, domain_id=domain_id)
     try:
         result = service.publish(
@@ -126,6 +232,7 @@ def publish_index(
             raise HTTPException(status_code=404, detail=detail) from e
         raise HTTPException(status_code=400, detail=detail) from e
     except Exception as e:
+        raise_if_provider_unavailable(e)
         raise HTTPException(status_code=502, detail=f"Ошибка публикации в провайдер: {e}") from e
 
     return IndexPublishOut(
@@ -146,13 +253,24 @@ def publish_index(
     )
 
 
-@router.post("/indexes/{index_id}/reindex", response_model=IndexPublishOut)
+@router.post("/indexes/{index_id}/reindex", response_model=IndexPublishOut, responses={202: {"model": JobOut}})
 def reindex_index(
     index_id: str,
     force_upload: bool = False,
+    background: bool = False,
     domain_id: str = Depends(get_domain_id),
     db: Session = Depends(get_db),
 ):
+    if background:
+        _require_index(db, domain_id, index_id)
+        return enqueue_job_response(
+            db,
+            "reindex",
+            domain_id=domain_id,
+            index_id=index_id,
+            params={"force_upload": force_upload},
+        )
+
     service = IndexPublishService(db=db, domain_id=domain_id)
     try:
         result = service.publish(
@@ -167,6 +285,7 @@ def reindex_index(
             raise HTTPException(status_code=404, detail=detail) from e
         raise HTTPException(status_code=400, detail=detail) from e
     except Exception as e:
+        raise_if_provider_unavailable(e)
         raise HTTPException(status_code=502, detail=f"Ошибка публикации в провайдер: {e}") from e
 
     return IndexPublishOut(
@@ -205,6 +324,7 @@ def sync_index(
             raise HTTPException(status_code=409, detail=detail) from e
         raise HTTPException(status_code=400, detail=detail) from e
     except Exception as e:
+        raise_if_provider_unavailable(e)
         raise HTTPException(status_code=502, detail=f"Ошибка синхронизации с провайдером: {e}") from e
 
     rag_index = result.get("rag_index")
@@ -214,25 +334,38 @@ def sync_index(
     )
 
 
-@router.post("/indexes/sync", response_model=IndexesSyncOut)
+@router.post("/indexes/sync", response_model=IndexesSyncOut, responses={202: {"model": JobOut}})
 def sync_indexes(
     provider_type: str | None = None,
     force: bool = False,
+    background: bool = False,
     domain_id: str = Depends(get_domain_id),
     db: Session = Depends(get_db),
 ):
+    if background:
+        return enqueue_job_response(
+            db,
+            "indexes_sync",
+            domain_id=domain_id,
+            provider_type=provider_type,
+            params={"force": force},
+        )
+
     service = IndexesSyncService(db=db, domain_id=domain_id)
     try:
         result = service.sync_domain_indexes(provider_type=provider_type, force=force)
     except Exception as e:
+        raise_if_provider_unavailable(e)
         raise HTTPException(status_code=502, detail=f"Ошибка синхронизации с провайдером: {e}") from e
 
     items = result.get("items") or []
     errors = result.get("errors") or []
 
-    return IndexesSyncOut(
-        items=[IndexOut.model_validate(i, from_attributes=True) for i in items],
-        errors=errors,
+    return FastJSONResponse(
+        {
+            "items": [index_row(i) for i in items],
+            "errors": list(errors),
+        }
     )
 
 
@@ -283,29 +416,35 @@ def detach_file(
     return {"status": "ok"}
 
 
+def _index_file_out(include_order: int, rag_file) -> dict:
+    # Поля IndexFileOut
+    return {
+        "include_order": include_order,
+        "file": file_row(rag_file),
+        "external_id": getattr(rag_file, 'external_id', None),
+        "chunking_strategy": getattr(rag_file, 'chunking_strategy', None),
+    }
+
+
 @router.get("/indexes/{index_id}/files", response_model=IndexFilesListOut)
 def list_index_files(
     index_id: str,
+    request: Request,
     domain_id: str = Depends(get_domain_id),
     db: Session = Depends(get_db),
 ):
     service = IndexFilesService(db=db, domain_id=domain_id)
+    if wants_ndjson(request):
+        rows = service.iter_files(index_id=index_id)
+        if rows is None:
+            raise HTTPException(status_code=404, detail="Индекс не найден")
+        return ndjson_response(_index_file_out(include_order, rag_file) for include_order, rag_file in rows)
+
     rows = service.list_files(index_id=index_id)
     if rows is None:
         raise HTTPException(status_code=404, detail="Индекс не найден")
 
-    items: list[IndexFileOut] = []
-    for include_order, rag_file in rows:
-        items.append(
-            IndexFileOut(
-                include_order=include_order,
-                file=FileOut.model_validate(rag_file, from_attributes=True),
-                external_id=getattr(rag_file, 'external_id', None),
-                chunking_strategy=getattr(rag_file, 'chunking_strategy', None),
-            )
-        )
-
-    return IndexFilesListOut(items=items)
+    return FastJSONResponse({"items": [_index_file_out(include_order, rag_file) for include_order, rag_file in rows]})
 
 
 @router.post("/indexes/{index_id}/search", response_model=IndexSearchOut)
@@ -317,7 +456,9 @@ def search_index(
 ):
     service = IndexSearchService(db=db, domain_id=domain_id)
     try:
-        items = service.search(index_id=index_id, **payload.model_dump())
+        # Поиск ждёт пользователь: его вызовы провайдера идут вперёд фоновой синхронизации
+        with provider_priority(PRIORITY_INTERACTIVE):
+            items = service.search(index_id=index_id, **payload.model_dump())
     except ValueError as e:
         detail = str(e)
         if detail == "Индекс не найден":
@@ -326,49 +467,66 @@ def search_index(
             raise HTTPException(status_code=409, detail=detail) from e
         raise HTTPException(status_code=400, detail=detail) from e
     except Exception as e:
+        raise_if_provider_unavailable(e)
         raise HTTPException(status_code=502, detail=f"Ошибка поиска в провайдере: {e}") from e
 
     return IndexSearchOut(items=items)
 
 
+def _provider_file_out(item: dict) -> IndexProviderFileOut:
+    include_order = item.get("include_order")
+    rag_file = item.get("file")
+    provider_upload = item.get("provider_upload")
+    provider_vector_store_file = item.get("provider_vector_store_file")
+
+    provider_upload_out = None
+    if isinstance(provider_upload, dict):
+        provider_upload_out = IndexProviderUploadOut(
+            status=str(provider_upload.get("status") or ""),
+            last_error=provider_upload.get("last_error"),
+            external_file_id=provider_upload.get("external_file_id"),
+        )
+
+    return IndexProviderFileOut(
+        include_order=int(include_order or 0),
+        file=FileOut.model_validate(rag_file, from_attributes=True),
+        provider_upload=provider_upload_out,
+        provider_vector_store_file=provider_vector_store_file if isinstance(provider_vector_store_file, dict) else None,
+    )
+
+
+def _iter_provider_files_ndjson(result: dict, items):
+    for item in items:
+        yield {"type": "item", **_provider_file_out(item).model_dump(mode="json")}
+
+    yield {
+        "type": "summary",
+        "provider_type": str(result.get("provider_type") or ""),
+        "vector_store_id": result.get("vector_store_id"),
+        "errors": list(result.get("errors") or []),
+    }
+
+
 @router.get("/indexes/{index_id}/provider-files", response_model=IndexProviderFilesOut)
 def list_index_provider_files(
     index_id: str,
+    request: Request,
     domain_id: str = Depends(get_domain_id),
     db: Session = Depends(get_db),
 ):
     service = IndexFilesProviderStatusService(db=db, domain_id=domain_id)
     try:
-        result = service.list_provider_files(index_id=index_id)
+        result, result_items = service.stream_provider_files(index_id=index_id)
     except ValueError as e:
         detail = str(e)
         if detail == "Индекс не найден":
             raise HTTPException(status_code=404, detail=detail) from e
         raise HTTPException(status_code=400, detail=detail) from e
 
-    items: list[IndexProviderFileOut] = []
-    for item in result.get("items") or []:
-        include_order = item.get("include_order")
-        rag_file = item.get("file")
-        provider_upload = item.get("provider_upload")
-        provider_vector_store_file = item.get("provider_vector_store_file")
-
-        provider_upload_out = None
-        if isinstance(provider_upload, dict):
-            provider_upload_out = IndexProviderUploadOut(
-                status=str(provider_upload.get("status") or ""),
-                last_error=provider_upload.get("last_error"),
-                external_file_id=provider_upload.get("external_file_id"),
-            )
-
-        items.append(
-            IndexProviderFileOut(
-                include_order=int(include_order or 0),
-                file=FileOut.model_validate(rag_file, from_attributes=True),
-                provider_upload=provider_upload_out,
-                provider_vector_store_file=provider_vector_store_file if isinstance(provider_vector_store_file, dict) else None,
-            )
-        )
+    if wants_ndjson(request):
+        return ndjson_response(_iter_provider_files_ndjson(result, result_items))
+
+    items: list[IndexProviderFileOut] = [_provider_file_out(item) for item in result_items]
 
     return IndexProviderFilesOut(
         provider_type=str(result.get("provider_type") or ""),
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models.rag_job import RagJob
+from schemas.jobs import JobOut
+from services.jobs_service import JobsService
+from services.jobs_worker import notify_workers
+from utils.json_response import FastJSONResponse
+
+router = APIRouter(prefix="/api/v1", tags=["jobs"])
+admin_router = APIRouter(prefix="/api/v1/admin", tags=["jobs-admin"])
+
+
+def get_domain_id(x_domain_id: str | None = Header(default=None, alias="X-Domain-Id")) -> str:
+    if not x_domain_id or not x_domain_id.strip():
+        raise HTTPException(status_code=400, detail="X-Domain-Id обязателен")
+    return x_domain_id.strip()
+
+
+def enqueue_job_response(
+    db: Session,
+    job_type: str,
+    *,
+    domain_id: str | None,
+    index_id: str | None = None,
+    provider_type: str | None = None,
+    params: dict | None = None,
+) -> FastJSONResponse:
+    # Фоновый вариант ручки: 202 + задача; статус и прогресс — GET /jobs/{job_id} (Location)
+    job = JobsService(db=db).enqueue(
+        job_type,
+        domain_id=domain_id,
+        index_id=index_id,
+        provider_type=provider_type,
+        params=params,
+    )
+    notify_workers()
+
+    location = f"/api/v1/jobs/{job.id}" if domain_id is not None else f"/api/v1/admin/jobs/{job.id}"
+    return FastJSONResponse(
+        _job_out(job).model_dump(mode="json"),
+        status_code=202,
+        headers={"Location": location},
+    )
+
+
+def _job_out(job: RagJob) -> JobOut:
+    return JobOut.model_validate(job, from_attributes=True)
+
+
+@router.get("/jobs/{job_id}", response_model=JobOut)
+def get_job(job_id: str, domain_id: str = Depends(get_domain_id), db: Session = Depends(get_db)):
+    job = JobsService(db=db).get_job(job_id, domain_id=domain_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return _job_out(job)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobOut)
+def cancel_job(job_id: str, domain_id: str = Depends(get_domain_id), db: Session = Depends(get_db)):
+    job = JobsService(db=db).request_cancel(job_id, domain_id=domain_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return _job_out(job)
+
+
+@admin_router.get("/jobs/{job_id}", response_model=JobOut)
+def admin_get_job(job_id: str, db: Session = Depends(get_db)):
+    job = JobsService(db=db).get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return _job_out(job)
+
+
+@admin_router.post("/jobs/{job_id}/cancel", response_model=JobOut)
+def admin_cancel_job(job_id: str, db: Session = Depends(get_db)):
+    job = JobsService(db=db).request_cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return _job_out(job)
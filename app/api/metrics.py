@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from utils.metrics import CONTENT_TYPE_LATEST, render_latest
+
+router = APIRouter(tags=["system"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -6,12 +6,38 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from database import get_db
-from schemas.providers import ProviderHealthOut, ProviderPublicOut, ProvidersPublicListOut
+from providers.limiter import get_provider_governor
+from providers.resilience import ProviderUnavailableError, get_circuit_breaker
+from schemas.providers import (
+    ProviderBreakerOut,
+    ProviderHealthOut,
+    ProviderLimiterOut,
+    ProviderPublicOut,
+    ProvidersPublicListOut,
+)
 from services.providers_connections_service import ProvidersConnectionsService
 
 router = APIRouter(prefix="/api/v1", tags=["providers"])
 
 
+def raise_if_provider_unavailable(e: Exception) -> None:
+    # Открытый circuit breaker — не ошибка провайдера (502), а отказ без вызова: 503 + Retry-After
+    if isinstance(e, ProviderUnavailableError):
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, round(e.retry_after)))},
+        ) from e
+
+
+def breaker_out(provider_type: str) -> ProviderBreakerOut:
+    return ProviderBreakerOut(**get_circuit_breaker(provider_type).snapshot())
+
+
+def limiter_out(provider_type: str) -> ProviderLimiterOut:
+    return ProviderLimiterOut(**get_provider_governor(provider_type).snapshot())
+
+
 @router.get("/providers", response_model=ProvidersPublicListOut)
 def list_providers(db: Session = Depends(get_db)):
     service = ProvidersConnectionsService(db=db)
@@ -37,9 +63,20 @@ def provider_health(provider_type: str, db: Session = Depends(get_db)):
         c.last_healthcheck_at = datetime.utcnow()
         c.last_error = None
         db.commit()
-        return ProviderHealthOut(provider_type=provider_type, status="ok")
+        return ProviderHealthOut(
+            provider_type=provider_type,
+            status="ok",
+            breaker=breaker_out(provider_type),
+            limiter=limiter_out(provider_type),
+        )
     except Exception as e:
         c.last_healthcheck_at = datetime.utcnow()
         c.last_error = str(e)
         db.commit()
-        return ProviderHealthOut(provider_type=provider_type, status="failed", detail=str(e))
+        return ProviderHealthOut(
+            provider_type=provider_type,
+            status="failed",
+            detail=str(e),
+            breaker=breaker_out(provider_type),
+            limiter=limiter_out(provider_type),
+        )
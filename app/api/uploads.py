@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from api.files import get_domain_id
+from database import get_db
+from models.rag_upload_session import RagUploadSession
+from schemas.files import FileOut
+from schemas.uploads import UploadChunkOut, UploadSessionCreateIn, UploadSessionOut
+from services.upload_sessions_service import (
+    CHUNKS_MISSING,
+    SESSION_COMPLETED,
+    SESSION_COMPLETING,
+    SESSION_NOT_FOUND,
+    SHA256_MISMATCH,
+    UploadSessionsService,
+    chunks_total,
+    write_chunk,
+)
+
+router = APIRouter(prefix="/api/v1", tags=["uploads"])
+
+_ERROR_STATUS_CODES = {
+    SESSION_NOT_FOUND: 404,
+    SESSION_COMPLETED: 409,
+    SESSION_COMPLETING: 409,
+    CHUNKS_MISSING: 409,
+    SHA256_MISMATCH: 409,
+}
+
+
+def _upload_error(e: ValueError) -> HTTPException:
+    detail = str(e)
+    return HTTPException(status_code=_ERROR_STATUS_CODES.get(detail, 400), detail=detail)
+
+
+def _session_out(service: UploadSessionsService, session: RagUploadSession) -> UploadSessionOut:
+    total = chunks_total(session.size_bytes, session.chunk_size)
+    if session.status == "completed":
+        # Куски завершённой сессии уже удалены — файл собран целиком
+        received, received_bytes = list(range(total)), session.size_bytes
+    else:
+        received = service.received_chunks(session.id)
+        received_bytes = sum(min(session.chunk_size, session.size_bytes - i * session.chunk_size) for i in received)
+    return UploadSessionOut(
+        id=session.id,
+        domain_id=session.domain_id,
+        file_id=session.file_id,
+        file_name=session.file_name,
+        file_type=session.file_type,
+        size_bytes=session.size_bytes,
+        chunk_size=session.chunk_size,
+        chunks_total=total,
+        status=session.status,
+        received_chunks=received,
+        received_bytes=received_bytes,
+        expected_sha256=session.expected_sha256,
+        content_sha256=session.content_sha256,
+        created_at=session.created_at,
+        updated_at=session.updated_at,
+        expires_at=session.expires_at,
+    )
+
+
+@router.post("/uploads", response_model=UploadSessionOut)
+def create_upload_session(
+    payload: UploadSessionCreateIn,
+    domain_id: str = Depends(get_domain_id),
+    db: Session = Depends(get_db),
+):
+    service = UploadSessionsService(db=db, domain_id=domain_id)
+    try:
+        session = service.create_session(
+            file_name=payload.file_name,
+            size_bytes=payload.size_bytes,
+            file_type=payload.file_type,
+            tags=payload.tags,
+            notes=payload.notes,
+            chunk_size=payload.chunk_size,
+            sha256=payload.sha256,
+        )
+    except ValueError as e:
+        raise _upload_error(e) from e
+    return _session_out(service, session)
+
+
+@router.get("/uploads/{session_id}", response_model=UploadSessionOut)
+def get_upload_session(
+    session_id: str,
+    domain_id: str = Depends(get_domain_id),
+    db: Session = Depends(get_db),
+):
+    service = UploadSessionsService(db=db, domain_id=domain_id)
+    session = service.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=SESSION_NOT_FOUND)
+    return _session_out(service, session)
+
+
+@router.put("/uploads/{session_id}/chunks/{chunk_index}", response_model=UploadChunkOut)
+async def put_upload_chunk(
+    session_id: str,
+    chunk_index: int,
+    request: Request,
+    x_chunk_sha256: str | None = Header(default=None, alias="X-Chunk-Sha256"),
+    domain_id: str = Depends(get_domain_id),
+    db: Session = Depends(get_db),
+):
+    # Асинхронный обработчик: тело куска читается из сокета и пишется на диск потоком,
+    # без буферизации запроса целиком; запросы к БД — в пуле потоков
+    service = UploadSessionsService(db=db, domain_id=domain_id)
+    try:
+        target = await run_in_threadpool(service.chunk_target, session_id, chunk_index)
+    except ValueError as e:
+        raise _upload_error(e) from e
+
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) != target.size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Кусок {chunk_index} должен быть {target.size} байт, Content-Length: {content_length}",
+        )
+
+    try:
+        sha256 = await write_chunk(target, request.stream())
+    except ValueError as e:
+        raise _upload_error(e) from e
+
+    if x_chunk_sha256 and x_chunk_sha256.strip().lower() != sha256:
+        raise HTTPException(status_code=400, detail=f"SHA-256 куска {chunk_index} не совпадает с X-Chunk-Sha256")
+
+    try:
+        session = await run_in_threadpool(service.record_chunk, target, sha256)
+    except ValueError as e:
+        raise _upload_error(e) from e
+
+    return UploadChunkOut(
+        session_id=session_id,
+        chunk_index=chunk_index,
+        offset=target.offset,
+        size_bytes=target.size,
+        sha256=sha256,
+        expires_at=session.expires_at,
+    )
+
+
+@router.post("/uploads/{session_id}/complete", response_model=FileOut)
+def complete_upload_session(
+    session_id: str,
+    domain_id: str = Depends(get_domain_id),
+    db: Session = Depends(get_db),
+):
+    service = UploadSessionsService(db=db, domain_id=domain_id)
+    try:
+        rag_file = service.complete(session_id)
+    except ValueError as e:
+        raise _upload_error(e) from e
+    return FileOut.model_validate(rag_file, from_attributes=True)
+
+
+@router.delete("/uploads/{session_id}")
+def abort_upload_session(
+    session_id: str,
+    domain_id: str = Depends(get_domain_id),
+    db: Session = Depends(get_db),
+):
+    service = UploadSessionsService(db=db, domain_id=domain_id)
+    try:
+        removed = service.abort(session_id)
+    except ValueError as e:
+        raise _upload_error(e) from e
+    if not removed:
+        raise HTTPException(status_code=404, detail=SESSION_NOT_FOUND)
+    return {"status": "ok"}
@@ -7,6 +7,12 @@ def _parse_bool(value: str | None, default: bool = False) -> bool:
     return value.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
+def _parse_int(value: str | None, default: int) -> int:
+    if value is None or not value.strip():
+        return default
+    return int(value.strip())
+
+
 def _parse_csv(value: str | None) -> list[str]:
     if not value:
         return []
@@ -16,6 +22,7 @@ def _parse_csv(value: str | None) -> list[str]:
 class Config:
     def __init__(self) -> None:
         self.allow_hosts: list[str] = _parse_csv(os.getenv("ALLOW_HOSTS"))
+        self.trusted_proxies: list[str] = _parse_csv(os.getenv("TRUSTED_PROXIES"))
 
         self.log_level: str = os.getenv("LOG_LEVEL", "INFO")
         self.log_format: str = os.getenv(
@@ -24,6 +31,104 @@ class Config:
         )
         self.log_file: str | None = os.getenv("LOG_FILE")
         self.log_to_console: bool = _parse_bool(os.getenv("LOG_TO_CONSOLE"), default=True)
+        self.log_queue_enabled: bool = _parse_bool(os.getenv("LOG_QUEUE_ENABLED"), default=True)
+        self.log_payload_max_chars: int = _parse_int(os.getenv("LOG_PAYLOAD_MAX_CHARS"), default=2000)
+        self.log_payload_sample_every: int = _parse_int(os.getenv("LOG_PAYLOAD_SAMPLE_EVERY"), default=1)
+
+        self.metrics_enabled: bool = _parse_bool(os.getenv("METRICS_ENABLED"), default=True)
+
+        self.provider_retry_max_attempts: int = _parse_int(os.getenv("PROVIDER_RETRY_MAX_ATTEMPTS"), default=3)
+        self.provider_retry_backoff_ms: int = _parse_int(os.getenv("PROVIDER_RETRY_BACKOFF_MS"), default=500)
+        self.provider_retry_backoff_max_ms: int = _parse_int(os.getenv("PROVIDER_RETRY_BACKOFF_MAX_MS"), default=8000)
+        self.provider_retry_max_delay_ms: int = _parse_int(os.getenv("PROVIDER_RETRY_MAX_DELAY_MS"), default=10000)
+        self.provider_breaker_failure_threshold: int = _parse_int(
+            os.getenv("PROVIDER_BREAKER_FAILURE_THRESHOLD"),
+            default=5,
+        )
+        self.provider_breaker_open_seconds: int = _parse_int(os.getenv("PROVIDER_BREAKER_OPEN_SECONDS"), default=30)
+        self.provider_breaker_half_open_max_calls: int = _parse_int(
+            os.getenv("PROVIDER_BREAKER_HALF_OPEN_MAX_CALLS"),
+            default=1,
+        )
+
+        self.provider_default_rate_limit_per_minute: int = _parse_int(
+            os.getenv("PROVIDER_DEFAULT_RATE_LIMIT_PER_MINUTE"),
+            default=0,
+        )
+        self.provider_default_max_concurrency: int = _parse_int(os.getenv("PROVIDER_DEFAULT_MAX_CONCURRENCY"), default=0)
+        self.provider_limiter_background_share_percent: int = _parse_int(
+            os.getenv("PROVIDER_LIMITER_BACKGROUND_SHARE_PERCENT"),
+            default=50,
+        )
+        self.provider_limiter_max_wait_ms: int = _parse_int(os.getenv("PROVIDER_LIMITER_MAX_WAIT_MS"), default=10000)
+        self.provider_limiter_background_max_wait_ms: int = _parse_int(
+            os.getenv("PROVIDER_LIMITER_BACKGROUND_MAX_WAIT_MS"),
+            default=300000,
+        )
+        self.provider_limiter_db_coordination: bool = _parse_bool(
+            os.getenv("PROVIDER_LIMITER_DB_COORDINATION"),
+            default=False,
+        )
+        self.provider_limiter_node_heartbeat_seconds: int = _parse_int(
+            os.getenv("PROVIDER_LIMITER_NODE_HEARTBEAT_SECONDS"),
+            default=10,
+        )
+
+        self.provider_read_cache_ttl_ms: int = _parse_int(os.getenv("PROVIDER_READ_CACHE_TTL_MS"), default=2000)
+        self.provider_read_cache_max_entries: int = _parse_int(
+            os.getenv("PROVIDER_READ_CACHE_MAX_ENTRIES"),
+            default=1000,
+        )
+
+        self.provider_http2: bool = _parse_bool(os.getenv("PROVIDER_HTTP2"), default=False)
+        self.provider_http_max_connections: int = _parse_int(os.getenv("PROVIDER_HTTP_MAX_CONNECTIONS"), default=100)
+        self.provider_http_max_keepalive_connections: int = _parse_int(
+            os.getenv("PROVIDER_HTTP_MAX_KEEPALIVE_CONNECTIONS"),
+            default=20,
+        )
+        self.provider_http_keepalive_expiry_seconds: int = _parse_int(
+            os.getenv("PROVIDER_HTTP_KEEPALIVE_EXPIRY_SECONDS"),
+            default=30,
+        )
+        self.provider_http_connect_timeout_seconds: int = _parse_int(
+            os.getenv("PROVIDER_HTTP_CONNECT_TIMEOUT_SECONDS"),
+            default=5,
+        )
+        self.provider_http_timeout_seconds: int = _parse_int(os.getenv("PROVIDER_HTTP_TIMEOUT_SECONDS"), default=60)
+        self.provider_http_search_timeout_seconds: int = _parse_int(
+            os.getenv("PROVIDER_HTTP_SEARCH_TIMEOUT_SECONDS"),
+            default=15,
+        )
+        self.provider_http_upload_timeout_seconds: int = _parse_int(
+            os.getenv("PROVIDER_HTTP_UPLOAD_TIMEOUT_SECONDS"),
+            default=600,
+        )
+        self.provider_dns_cache_ttl_seconds: int = _parse_int(os.getenv("PROVIDER_DNS_CACHE_TTL_SECONDS"), default=60)
+
+        self.jobs_embedded_workers: int = _parse_int(os.getenv("JOBS_EMBEDDED_WORKERS"), default=1)
+        self.jobs_worker_threads: int = _parse_int(os.getenv("JOBS_WORKER_THREADS"), default=2)
+        self.jobs_lease_seconds: int = _parse_int(os.getenv("JOBS_LEASE_SECONDS"), default=60)
+        self.jobs_poll_interval_ms: int = _parse_int(os.getenv("JOBS_POLL_INTERVAL_MS"), default=1000)
+        self.jobs_max_attempts: int = _parse_int(os.getenv("JOBS_MAX_ATTEMPTS"), default=3)
+        self.jobs_retry_backoff_seconds: int = _parse_int(os.getenv("JOBS_RETRY_BACKOFF_SECONDS"), default=10)
+        self.jobs_retry_backoff_max_seconds: int = _parse_int(os.getenv("JOBS_RETRY_BACKOFF_MAX_SECONDS"), default=600)
+        self.jobs_progress_flush_ms: int = _parse_int(os.getenv("JOBS_PROGRESS_FLUSH_MS"), default=1000)
+
+        self.status_poller_enabled: bool = _parse_bool(os.getenv("STATUS_POLLER_ENABLED"), default=True)
+        self.status_poller_tick_ms: int = _parse_int(os.getenv("STATUS_POLLER_TICK_MS"), default=2000)
+        self.status_poll_min_interval_seconds: int = _parse_int(os.getenv("STATUS_POLL_MIN_INTERVAL_SECONDS"), default=5)
+        self.status_poll_max_interval_seconds: int = _parse_int(os.getenv("STATUS_POLL_MAX_INTERVAL_SECONDS"), default=600)
+        self.status_poller_provider_budget_per_minute: int = _parse_int(
+            os.getenv("STATUS_POLLER_PROVIDER_BUDGET_PER_MINUTE"),
+            default=60,
+        )
+
+        self.index_events_poll_ms: int = _parse_int(os.getenv("INDEX_EVENTS_POLL_MS"), default=1000)
+        self.sse_heartbeat_seconds: int = _parse_int(os.getenv("SSE_HEARTBEAT_SECONDS"), default=15)
+
+        self.tracing_exporter: str = os.getenv("TRACING_EXPORTER", "none")
+        self.tracing_file: str | None = os.getenv("TRACING_FILE")
+        self.server_timing_enabled: bool = _parse_bool(os.getenv("SERVER_TIMING_ENABLED"), default=True)
 
         self.running_in_container: bool = _parse_bool(
             os.getenv("RUNNING_IN_CONTAINER"),
@@ -32,8 +137,28 @@ class Config:
 
         self.database_uri: str | None = os.getenv("DATABASE_URI")
 
+        # По умолчанию — значения QueuePool SQLAlchemy (5 + 10, без пересоздания соединений)
+        self.db_pool_size: int = _parse_int(os.getenv("DB_POOL_SIZE"), 5)
+        self.db_max_overflow: int = _parse_int(os.getenv("DB_MAX_OVERFLOW"), 10)
+        self.db_pool_timeout: int = _parse_int(os.getenv("DB_POOL_TIMEOUT"), 30)
+        self.db_pool_recycle: int = _parse_int(os.getenv("DB_POOL_RECYCLE"), -1)
+        self.db_pool_pre_ping: bool = _parse_bool(os.getenv("DB_POOL_PRE_PING"), default=True)
+        self.db_statement_timeout_ms: int = _parse_int(os.getenv("DB_STATEMENT_TIMEOUT_MS"), 0)
+
         self.files_root: str = os.getenv("FILES_ROOT", "/files")
 
+        self.download_chunk_size_bytes: int = _parse_int(os.getenv("DOWNLOAD_CHUNK_SIZE_BYTES"), default=1024 * 1024)
+        self.upload_write_buffer_bytes: int = _parse_int(os.getenv("UPLOAD_WRITE_BUFFER_BYTES"), default=4 * 1024 * 1024)
+        self.upload_preallocate: bool = _parse_bool(os.getenv("UPLOAD_PREALLOCATE"), default=True)
+        self.upload_chunk_size_bytes: int = _parse_int(os.getenv("UPLOAD_CHUNK_SIZE_BYTES"), default=8 * 1024 * 1024)
+        self.upload_chunk_max_bytes: int = _parse_int(os.getenv("UPLOAD_CHUNK_MAX_BYTES"), default=64 * 1024 * 1024)
+        self.upload_max_file_bytes: int = _parse_int(os.getenv("UPLOAD_MAX_FILE_BYTES"), default=16 * 1024 * 1024 * 1024)
+        self.upload_session_ttl_seconds: int = _parse_int(os.getenv("UPLOAD_SESSION_TTL_SECONDS"), default=24 * 3600)
+        self.upload_sessions_gc_interval_seconds: int = _parse_int(
+            os.getenv("UPLOAD_SESSIONS_GC_INTERVAL_SECONDS"),
+            default=600,
+        )
+
         self.default_domain_id: str = os.getenv("DEFAULT_DOMAIN_ID", "0")
 
         self.yc_folder_id: str | None = os.getenv("YC_FOLDER_ID")
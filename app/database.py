@@ -2,12 +2,16 @@ from __future__ import annotations
 
 from collections.abc import Generator
 import logging
+import time
 
-from sqlalchemy import create_engine
-from sqlalchemy.engine import make_url
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from config import get_config
+from utils.metrics import callback_gauge, counter, histogram
+from utils.request_context import get_request_stats
 
 logger = logging.getLogger("vector-stores.database")
 
@@ -17,6 +21,90 @@ _engine = None
 _session_maker: sessionmaker | None = None
 
 
+DB_POOL_WAIT_SECONDS = histogram(
+    "db_pool_wait_seconds",
+    "Ожидание соединения из пула БД",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_CHECKOUTS = counter("db_pool_checkouts", "Выдачи соединений из пула БД")
+
+
+class _TimedQueuePool(QueuePool):
+    # Замеряем время ожидания свободного соединения (включая создание нового)
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+def _safe_uri(uri: str) -> str:
+    try:
+        return make_url(uri).render_as_string(hide_password=True)
+    except Exception:
+        return "<invalid DATABASE_URI>"
+
+
+def _engine_kwargs(url: URL) -> dict:
+    config = get_config()
+    kwargs: dict = {"pool_pre_ping": config.db_pool_pre_ping}
+
+    if url.get_backend_name() == "sqlite":
+        # У SQLite свой пул (Singleton/Static), параметры QueuePool к нему не применимы
+        return kwargs
+
+    kwargs.update(
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_timeout=config.db_pool_timeout,
+        pool_recycle=config.db_pool_recycle,
+    )
+    return kwargs
+
+
+def _statement_timeout_sql(is_mariadb: bool, timeout_ms: int) -> str:
+    # MariaDB: max_statement_time в секундах, любые запросы; MySQL: max_execution_time в мс, только SELECT
+    if is_mariadb:
+        return f"SET SESSION max_statement_time={timeout_ms / 1000:g}"
+    return f"SET SESSION max_execution_time={timeout_ms}"
+
+
+def _listen_statement_timeout(engine, timeout_ms: int) -> None:
+    # Схема mysql:// часто указывает на MariaDB, поэтому сервер определяется по диалекту:
+    # is_mariadb выставляется при первом подключении, до обработчиков события connect
+    def _set_statement_timeout(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(_statement_timeout_sql(engine.dialect.is_mariadb, timeout_ms))
+        finally:
+            cursor.close()
+
+    event.listen(engine, "connect", _set_statement_timeout)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if get_request_stats() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = get_request_stats()
+    if stats is not None:
+        stats.db_ms += elapsed * 1000
+        stats.db_queries += 1
+
+
+def _listen_query_timing(sync_engine) -> None:
+    # Время SQL-запросов суммируется в статистику текущего HTTP-запроса (access-лог)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
 def get_engine():
     global _engine
 
@@ -27,17 +115,18 @@ def get_engine():
     if not config.database_uri:
         raise RuntimeError("DATABASE_URI не задан")
 
-    try:
-        safe_uri = make_url(config.database_uri).render_as_string(hide_password=True)
-    except Exception:
-        safe_uri = "<invalid DATABASE_URI>"
+    logger.info("Подключение к базе данных: %s", _safe_uri(config.database_uri))
 
-    logger.info("Подключение к базе данных: %s", safe_uri)
+    url = make_url(config.database_uri)
+    kwargs = _engine_kwargs(url)
+    if "pool_size" in kwargs:
+        kwargs["poolclass"] = _TimedQueuePool
 
-    _engine = create_engine(
-        config.database_uri,
-        pool_pre_ping=True,
-    )
+    _engine = create_engine(url, **kwargs)
+    event.listen(_engine, "checkout", lambda *_: DB_POOL_CHECKOUTS.inc())
+    if config.db_statement_timeout_ms > 0 and url.get_backend_name() in {"mysql", "mariadb"}:
+        _listen_statement_timeout(_engine, config.db_statement_timeout_ms)
+    _listen_query_timing(_engine)
     return _engine
 
 
@@ -64,6 +153,36 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_pool_status() -> dict:
+    pool = get_engine().pool
+    status: dict = {"pool_class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    return status
+
+
+def _pool_status_samples():
+    if _engine is None:
+        return []
+    status = get_pool_status()
+    return [((name,), status[name]) for name in ("size", "checkedin", "checkedout", "overflow") if name in status]
+
+
+callback_gauge("db_pool_connections", "Состояние пула соединений БД", ("state",), _pool_status_samples)
+
+
+def dispose_engine() -> None:
+    global _engine, _session_maker
+
+    if _engine is not None:
+        _engine.dispose()
+
+    _engine = None
+    _session_maker = None
+
+
 def init_db() -> None:
     config = get_config()
     if not config.database_uri:
@@ -72,14 +191,22 @@ def init_db() -> None:
     import models.rag_file
     import models.rag_index
     import models.rag_index_file
+    import models.rag_job
+    import models.rag_limiter_node
     import models.rag_provider_connection
     import models.rag_provider_file_upload
+    import models.rag_upload_chunk
+    import models.rag_upload_session
 
     _ = models.rag_file.RagFile
     _ = models.rag_index.RagIndex
     _ = models.rag_index_file.RagIndexFile
+    _ = models.rag_job.RagJob
+    _ = models.rag_limiter_node.RagLimiterNode
     _ = models.rag_provider_connection.RagProviderConnection
     _ = models.rag_provider_file_upload.RagProviderFileUpload
+    _ = models.rag_upload_chunk.RagUploadChunk
+    _ = models.rag_upload_session.RagUploadSession
 
     engine = get_engine()
     try:
@@ -0,0 +1,53 @@
+import signal
+import sys
+import threading
+
+from config import get_config
+from database import init_db
+from providers.http_transport import close_http_clients
+from providers.limiter import start_limiter_coordination, stop_limiter_coordination
+from services.index_status_poller import start_status_poller, stop_status_poller
+from services.jobs_worker import JobWorker
+from utils.logger import configure_logging, stop_logging
+
+# Отдельный процесс воркеров очереди задач: `python jobs_worker.py [число_потоков]` из каталога app.
+
+
+def main() -> None:
+    config = get_config()
+    logger = configure_logging(config)
+    init_db()
+    start_limiter_coordination()
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else max(1, config.jobs_worker_threads)
+    stop = threading.Event()
+
+    def _handle_signal(signum, _frame) -> None:
+        logger.info("Получен сигнал %s, воркеры завершают текущие задачи", signum)
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+    threads = []
+    for i in range(count):
+        worker = JobWorker(f"worker-{i}", stop_event=stop)
+        thread = threading.Thread(target=worker.run, name=f"jobs-worker-{i}")
+        thread.start()
+        threads.append(thread)
+
+    # Опрос статусов безопасно запускать в нескольких процессах: индекс захватывается условным UPDATE
+    start_status_poller()
+
+    for thread in threads:
+        thread.join()
+
+    stop_status_poller()
+    stop_limiter_coordination()
+    close_http_clients()
+
+    stop_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,29 @@ from fastapi.routing import APIRoute
 from api.admin_providers import router as admin_providers_router
 from api.files import router as files_router
 from api.indexes import router as indexes_router
+from api.jobs import admin_router as jobs_admin_router
+from api.jobs import router as jobs_router
 from api.health import router as health_router
+from api.metrics import router as metrics_router
 from api.providers import router as providers_router
+from api.uploads import router as uploads_router
 from config import get_config
-from database import init_db
-from utils.logger import configure_logging
-from utils.middlewares import AllowHostsMiddleware, RequestIdMiddleware
+from database import dispose_engine, init_db
+from providers.http_transport import close_http_clients
+from providers.limiter import start_limiter_coordination, stop_limiter_coordination
+from services.index_status_poller import start_status_poller, stop_status_poller
+from services.jobs_worker import start_embedded_workers, stop_embedded_workers
+from services.upload_sessions_service import start_upload_sessions_gc, stop_upload_sessions_gc
+from utils.json_response import FastJSONResponse
+from utils.logger import configure_logging, stop_logging
+from utils.middlewares import AllowHostsMiddleware, MetricsMiddleware, RequestIdMiddleware, TracingMiddleware
+from utils.tracing import configure_tracing
 
 config = get_config()
 logger = configure_logging(config)
+configure_tracing(config.tracing_exporter, config.tracing_file)
 
-app = FastAPI(title="vector-stores.sentralix.ru")
+app = FastAPI(title="vector-stores.sentralix.ru", default_response_class=FastJSONResponse)
 
 
 def log_startup_info() -> None:
@@ -27,8 +39,20 @@ def log_startup_info() -> None:
         "  Разрешенные хосты: %s",
         ", ".join(config.allow_hosts) if config.allow_hosts else "все",
     )
+    logger.info(
+        "  Доверенные прокси: %s",
+        ", ".join(config.trusted_proxies) if config.trusted_proxies else "не заданы",
+    )
     logger.info("  Логирование в файл: %s", config.log_file)
     logger.info("  Уровень логирования: %s", config.log_level)
+    logger.info(
+        "  Пул БД: size=%s overflow=%s recycle=%s pre_ping=%s statement_timeout_ms=%s",
+        config.db_pool_size,
+        config.db_max_overflow,
+        config.db_pool_recycle,
+        config.db_pool_pre_ping,
+        config.db_statement_timeout_ms or "-",
+    )
     logger.info("  Сервер запущен: http://0.0.0.0:8000")
     logger.info("  Ручки бэкенда:")
 
@@ -45,17 +69,44 @@ def log_startup_info() -> None:
 
     logger.info("=" * 50)
 
-app.add_middleware(AllowHostsMiddleware, allow_hosts=config.allow_hosts)
+app.add_middleware(TracingMiddleware, server_timing=config.server_timing_enabled)
+app.add_middleware(
+    AllowHostsMiddleware,
+    allow_hosts=config.allow_hosts,
+    trusted_proxies=config.trusted_proxies,
+)
 app.add_middleware(RequestIdMiddleware)
+if config.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(health_router)
+if config.metrics_enabled:
+    app.include_router(metrics_router)
 app.include_router(providers_router)
 app.include_router(files_router)
+app.include_router(uploads_router)
 app.include_router(indexes_router)
 app.include_router(admin_providers_router)
+app.include_router(jobs_router)
+app.include_router(jobs_admin_router)
 
 
 @app.on_event("startup")
 async def _startup() -> None:
     init_db()
+    start_limiter_coordination()
+    start_embedded_workers(config.jobs_embedded_workers)
+    start_status_poller()
+    start_upload_sessions_gc()
     log_startup_info()
+
+
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    stop_upload_sessions_gc()
+    stop_status_poller()
+    stop_embedded_workers()
+    stop_limiter_coordination()
+    close_http_clients()
+    dispose_engine()
+    stop_logging()
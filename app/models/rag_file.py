@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import BigInteger, DateTime, JSON, String, Text
+from sqlalchemy import BigInteger, DateTime, Index, JSON, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database import Base
@@ -10,6 +10,9 @@ from database import Base
 
 class RagFile(Base):
     __tablename__ = "rag_files"
+    __table_args__ = (
+        Index("ix_rag_files_domain_created_id", "domain_id", "created_at", "id"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     domain_id: Mapped[str] = mapped_column(String(128), index=True)
@@ -18,6 +21,8 @@ class RagFile(Base):
     file_type: Mapped[str] = mapped_column(String(128))
     local_path: Mapped[str] = mapped_column(String(1024))
     size_bytes: Mapped[int] = mapped_column(BigInteger)
+    # SHA-256 содержимого: считается при загрузке, у старых записей — после первого скачивания
+    content_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
 
     tags: Mapped[dict | list | None] = mapped_column(JSON, nullable=True)
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import JSON, DateTime, String, Text
+from sqlalchemy import JSON, DateTime, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database import Base
@@ -10,6 +10,11 @@ from database import Base
 
 class RagIndex(Base):
     __tablename__ = "rag_indexes"
+    __table_args__ = (
+        Index("ix_rag_indexes_domain_created_id", "domain_id", "created_at", "id"),
+        Index("ix_rag_indexes_provider_external", "provider_type", "external_id"),
+        Index("ix_rag_indexes_status_poll", "indexing_status", "status_poll_after"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     domain_id: Mapped[str] = mapped_column(String(128), index=True)
@@ -27,6 +32,10 @@ class RagIndex(Base):
     indexing_status: Mapped[str] = mapped_column(String(32), default="not_indexed")
     indexed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
+    # Фоновый опрос статуса (IndexStatusPoller): время следующего опроса и число опросов подряд без изменений
+    status_poll_after: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    status_poll_attempts: Mapped[int] = mapped_column(Integer, default=0)
+
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Integer, String, JSON
+from sqlalchemy import Index, Integer, String, JSON
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database import Base
@@ -8,6 +8,10 @@ from database import Base
 
 class RagIndexFile(Base):
     __tablename__ = "rag_index_files"
+    __table_args__ = (
+        Index("ix_rag_index_files_file_id", "file_id"),
+        Index("ix_rag_index_files_index_order", "index_id", "include_order"),
+    )
 
     index_id: Mapped[str] = mapped_column(
         String(36),
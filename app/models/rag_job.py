@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import JSON, Boolean, DateTime, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+
+class RagJob(Base):
+    __tablename__ = "rag_jobs"
+    __table_args__ = (
+        Index("ix_rag_jobs_status_run_after", "status", "run_after"),
+        Index("ix_rag_jobs_domain_created_id", "domain_id", "created_at", "id"),
+        Index("ix_rag_jobs_index_status", "index_id", "status"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+
+    job_type: Mapped[str] = mapped_column(String(32))
+    domain_id: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    index_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    provider_type: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    params: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
+    # queued -> running -> succeeded | failed | cancelled (при ошибке с повтором — снова queued)
+    status: Mapped[str] = mapped_column(String(16), default="queued")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3)
+    run_after: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    lease_owner: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, default=False)
+
+    progress: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    result: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+
+class RagLimiterNode(Base):
+    # Живые процессы (API, jobs_worker) для деления лимитов провайдеров между ними
+    __tablename__ = "rag_limiter_nodes"
+    __table_args__ = (Index("ix_rag_limiter_nodes_heartbeat_at", "heartbeat_at"),)
+
+    id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    heartbeat_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
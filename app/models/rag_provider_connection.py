@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import JSON, Boolean, DateTime, String, Text
+from sqlalchemy import JSON, Boolean, DateTime, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database import Base
@@ -24,6 +24,14 @@ class RagProviderConnection(Base):
     last_healthcheck_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    # Клиентские лимиты вызовов провайдера (providers/limiter.py); NULL — значение по умолчанию, 0 — без лимита
+    rate_limit_per_minute: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    rate_limit_burst: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    max_concurrency: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # Параметры HTTP-клиента провайдера (providers/http_transport.py); NULL/нет ключа — PROVIDER_HTTP_*
+    http_options: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
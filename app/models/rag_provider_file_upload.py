@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import JSON, DateTime, String, Text, UniqueConstraint
+from sqlalchemy import JSON, DateTime, Index, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database import Base
@@ -17,6 +17,7 @@ class RagProviderFileUpload(Base):
             "external_file_id",
             name="uq_rag_provider_file_uploads_provider_external_file",
         ),
+        Index("ix_rag_provider_file_uploads_provider_created_id", "provider_id", "created_at", "id"),
     )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
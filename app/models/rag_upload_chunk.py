@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+
+class RagUploadChunk(Base):
+    # Принятый кусок сессии загрузки; смещение в файле — chunk_index * chunk_size сессии
+    __tablename__ = "rag_upload_chunks"
+
+    session_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    chunk_index: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    size_bytes: Mapped[int] = mapped_column(BigInteger)
+    sha256: Mapped[str] = mapped_column(String(64))
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
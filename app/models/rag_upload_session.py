@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import JSON, BigInteger, DateTime, Index, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+
+class RagUploadSession(Base):
+    __tablename__ = "rag_upload_sessions"
+    __table_args__ = (
+        Index("ix_rag_upload_sessions_status_expires", "status", "expires_at"),
+        Index("ix_rag_upload_sessions_domain_created_id", "domain_id", "created_at", "id"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    domain_id: Mapped[str] = mapped_column(String(128))
+
+    # Будущая запись rag_files; куски пишутся сразу в её local_path
+    file_id: Mapped[str] = mapped_column(String(36))
+    file_name: Mapped[str] = mapped_column(String(512))
+    file_type: Mapped[str] = mapped_column(String(128))
+    local_path: Mapped[str] = mapped_column(String(1024))
+    size_bytes: Mapped[int] = mapped_column(BigInteger)
+    chunk_size: Mapped[int] = mapped_column(BigInteger)
+
+    tags: Mapped[dict | list | None] = mapped_column(JSON, nullable=True)
+    notes: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # Ожидаемая клиентом контрольная сумма (проверяется при завершении) и вычисленная
+    expected_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    content_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
+    # open -> completing -> completed (при ошибке завершения — снова open)
+    status: Mapped[str] = mapped_column(String(16), default="open")
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+    # Продлевается каждым куском; брошенные сессии удаляет сборщик вместе с файлом
+    expires_at: Mapped[datetime] = mapped_column(DateTime)
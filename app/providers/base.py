@@ -3,8 +3,21 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from typing import Any
 
+from providers.instrumentation import wrap_provider_method
+
 
 class BaseProvider(ABC):
+    # Заполняется ProvidersConnectionsService.get_provider — используется в метриках
+    provider_type: str = "unknown"
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # Оборачиваем реализации методов провайдера (метрики) без правки мест вызова
+        for name in _PROVIDER_METHODS:
+            fn = cls.__dict__.get(name)
+            if callable(fn):
+                setattr(cls, name, wrap_provider_method(name, fn))
+
     @abstractmethod
     def healthcheck(self) -> None:
         raise NotImplementedError
@@ -153,3 +166,8 @@ class BaseProvider(ABC):
     @abstractmethod
     def create_file(self, local_path: str, meta: dict | None = None) -> dict[str, Any]:
         raise NotImplementedError
+
+
+_PROVIDER_METHODS = frozenset(
+    name for name, value in vars(BaseProvider).items() if getattr(value, "__isabstractmethod__", False)
+)
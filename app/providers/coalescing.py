@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable
+import copy
+import json
+import threading
+import time
+from typing import Any
+
+from config import get_config
+from utils.metrics import counter, register_cache
+
+# Чтения без побочных эффектов: одинаковые одновременные вызовы выполняются один раз (single-flight)
+SINGLE_FLIGHT_METHODS = frozenset(
+    {
+        "retrieve_vector_store",
+        "retrieve_vector_store_file",
+        "list_vector_store_files",
+        "retrieve_vector_store_file_batch",
+        "list_vector_store_file_batch_files",
+        "list_vector_stores",
+        "list_files",
+        "retrieve_file",
+    }
+)
+
+# Листинги дополнительно кешируются на PROVIDER_READ_CACHE_TTL_MS (всплески опроса статуса)
+CACHED_METHODS = frozenset(
+    {
+        "list_vector_store_files",
+        "list_vector_store_file_batch_files",
+        "list_vector_stores",
+        "list_files",
+    }
+)
+
+# Вызовы, которые ничего у провайдера не меняют и кеш не сбрасывают
+_NON_MUTATING_METHODS = SINGLE_FLIGHT_METHODS | {
+    "healthcheck",
+    "search_vector_store",
+    "retrieve_vector_store_file_content",
+    "retrieve_file_content",
+}
+
+PROVIDER_COALESCED_CALLS = counter(
+    "provider_coalesced_calls",
+    "Чтения провайдера, обслуженные без собственного вызова: shared — общий вызов в полёте, cached — кеш",
+    ("provider_type", "method", "kind"),
+)
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class ProviderReadCoalescer:
+    # Ключ — (provider_type, method, аргументы). Результат общий для всех ожидающих, поэтому
+    # каждому отдаётся своя копия: вызывающий код свободно меняет полученные dict/list.
+    # Любой изменяющий вызов провайдера сбрасывает кеш этого провайдера и повышает его поколение:
+    # чтение, начатое до изменения, в кеш уже не попадёт.
+
+    def __init__(self, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flights: dict[tuple, _Flight] = {}
+        self._cache: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def make_key(provider_type: str, method: str, args: tuple, kwargs: dict) -> tuple:
+        return provider_type, method, json.dumps([args, kwargs], sort_keys=True, default=str)
+
+    def call(self, provider_type: str, method: str, args: tuple, kwargs: dict, fn: Callable[[], Any]) -> Any:
+        config = get_config()
+        ttl = max(0, config.provider_read_cache_ttl_ms) / 1000 if method in CACHED_METHODS else 0.0
+        key = self.make_key(provider_type, method, args, kwargs)
+
+        with self._lock:
+            if ttl:
+                cached = self._cache.get(key)
+                if cached is not None and cached[0] > self._clock():
+                    self._hits += 1
+                    PROVIDER_COALESCED_CALLS.labels(provider_type, method, "cached").inc()
+                    return copy.deepcopy(cached[1])
+                self._misses += 1
+
+            # Вызов, начатый до изменения у провайдера, новым читателям не подходит
+            generation = self._generations.get(provider_type, 0)
+            flight_key = (*key, generation)
+            flight = self._flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[flight_key] = flight
+
+        if not leader:
+            PROVIDER_COALESCED_CALLS.labels(provider_type, method, "shared").inc()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            flight.result = copy.deepcopy(result)
+            if ttl:
+                with self._lock:
+                    if self._generations.get(provider_type, 0) == generation:
+                        self._cache[key] = (self._clock() + ttl, flight.result)
+                        self._cache.move_to_end(key)
+                        while len(self._cache) > max(1, config.provider_read_cache_max_entries):
+                            self._cache.popitem(last=False)
+            return result
+        finally:
+            with self._lock:
+                self._flights.pop(flight_key, None)
+            flight.done.set()
+
+    def invalidate(self, provider_type: str) -> None:
+        with self._lock:
+            self._generations[provider_type] = self._generations.get(provider_type, 0) + 1
+            for key in [k for k in self._cache if k[0] == provider_type]:
+                del self._cache[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def cache_stats(self) -> tuple[int, int, int]:
+        with self._lock:
+            return self._hits, self._misses, len(self._cache)
+
+
+_coalescer = ProviderReadCoalescer()
+register_cache("provider_reads", _coalescer.cache_stats)
+
+
+def get_read_coalescer() -> ProviderReadCoalescer:
+    return _coalescer
+
+
+def coalesce_provider_call(provider_type: str, method: str, args: tuple, kwargs: dict, fn: Callable[[], Any]) -> Any:
+    if method in SINGLE_FLIGHT_METHODS:
+        return _coalescer.call(provider_type, method, args, kwargs, fn)
+    try:
+        return fn()
+    finally:
+        if method not in _NON_MUTATING_METHODS:
+            # Успешный или нет (таймаут мог примениться у провайдера) — кешированные листинги устарели
+            _coalescer.invalidate(provider_type)
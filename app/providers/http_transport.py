@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import importlib.util
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from typing import Any, NamedTuple
+from urllib.request import getproxies, proxy_bypass
+
+import httpcore
+import httpx
+from openai import OpenAI
+
+from config import get_config
+from utils.metrics import register_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HttpTransportSettings:
+    # Параметры пула; подключения с одинаковыми параметрами делят один httpx.Client
+    http2: bool
+    max_connections: int
+    max_keepalive_connections: int
+    keepalive_expiry: float
+    dns_cache_ttl: float
+
+
+@dataclass(frozen=True)
+class HttpTimeouts:
+    connect: float
+    default: float
+    search: float
+    upload: float
+
+    def for_operation(self, seconds: float) -> httpx.Timeout:
+        return httpx.Timeout(seconds, connect=self.connect)
+
+
+class OpenAIClients(NamedTuple):
+    default: OpenAI
+    # Короткий таймаут: поиск отвечает пользователю, зависший запрос лучше оборвать и повторить
+    search: OpenAI
+    # Длинный таймаут: загрузка и выгрузка содержимого файлов
+    upload: OpenAI
+
+
+def _option(options: dict, key: str, default: Any, cast: type) -> Any:
+    value = options.get(key)
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        logger.warning("Некорректное значение http_options.%s=%r, используется %r", key, value, default)
+        return default
+
+
+def http_settings_for(options: dict | None) -> tuple[HttpTransportSettings, HttpTimeouts]:
+    # options — rag_provider_connections.http_options; отсутствующие ключи — PROVIDER_HTTP_* из конфигурации
+    config = get_config()
+    options = options if isinstance(options, dict) else {}
+    settings = HttpTransportSettings(
+        http2=_option(options, "http2", config.provider_http2, bool),
+        max_connections=max(1, _option(options, "max_connections", config.provider_http_max_connections, int)),
+        max_keepalive_connections=max(
+            0,
+            _option(options, "max_keepalive_connections", config.provider_http_max_keepalive_connections, int),
+        ),
+        keepalive_expiry=max(
+            0.0,
+            _option(options, "keepalive_expiry_seconds", config.provider_http_keepalive_expiry_seconds, float),
+        ),
+        dns_cache_ttl=max(0.0, _option(options, "dns_cache_ttl_seconds", config.provider_dns_cache_ttl_seconds, float)),
+    )
+    timeouts = HttpTimeouts(
+        connect=_option(options, "connect_timeout_seconds", config.provider_http_connect_timeout_seconds, float),
+        default=_option(options, "timeout_seconds", config.provider_http_timeout_seconds, float),
+        search=_option(options, "search_timeout_seconds", config.provider_http_search_timeout_seconds, float),
+        upload=_option(options, "upload_timeout_seconds", config.provider_http_upload_timeout_seconds, float),
+    )
+    return settings, timeouts
+
+
+class DnsCache:
+    # Кеш getaddrinfo на ttl секунд: без него каждое новое соединение пула ждёт резолвер.
+    # Адрес, к которому не удалось подключиться, из записи убирается (переезд хоста, смена IP).
+
+    def __init__(self, *, clock=time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, int], tuple[float, list[str]]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def resolve(self, host: str, port: int, ttl: float) -> list[str]:
+        key = (host, port)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock() and entry[1]:
+                self._hits += 1
+                return list(entry[1])
+            self._misses += 1
+
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, addresses)
+        return list(addresses)
+
+    def forget(self, host: str, port: int, address: str) -> None:
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry is not None and address in entry[1]:
+                entry[1].remove(address)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def cache_stats(self) -> tuple[int, int, int]:
+        with self._lock:
+            return self._hits, self._misses, len(self._entries)
+
+
+_dns_cache = DnsCache()
+register_cache("provider_dns", _dns_cache.cache_stats)
+
+
+def get_dns_cache() -> DnsCache:
+    return _dns_cache
+
+
+def _is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class _CachingResolverBackend(httpcore.SyncBackend):
+    # Подключается к закешированному IP; TLS (SNI и проверка сертификата) по-прежнему
+    # идёт по имени хоста из URL — его httpcore берёт из origin, а не из адреса сокета
+    def __init__(self, ttl: float) -> None:
+        self._ttl = ttl
+
+    def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: float | None = None,
+        local_address: str | None = None,
+        socket_options=None,
+    ) -> httpcore.NetworkStream:
+        if _is_ip_address(host):
+            return super().connect_tcp(host, port, timeout, local_address, socket_options)
+        try:
+            addresses = _dns_cache.resolve(host, port, self._ttl)
+        except OSError as e:
+            raise httpcore.ConnectError(str(e)) from e
+
+        error: Exception | None = None
+        for address in addresses:
+            try:
+                return super().connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                _dns_cache.forget(host, port, address)
+                error = e
+        if error is None:
+            raise httpcore.ConnectError(f"Хост {host} не разрешился ни в один адрес")
+        raise error
+
+
+_http2_warned = False
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class ProviderHttpTransport(httpx.HTTPTransport):
+    def __init__(self, settings: HttpTransportSettings, proxy: str | None = None) -> None:
+        global _http2_warned
+
+        http2 = settings.http2
+        if http2 and not _http2_available():
+            if not _http2_warned:
+                logger.warning("HTTP/2 для провайдеров запрошен, но пакет h2 не установлен — используется HTTP/1.1")
+                _http2_warned = True
+            http2 = False
+
+        limits = httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        )
+        super().__init__(http2=http2, limits=limits, proxy=proxy)
+        # Через прокси адрес провайдера резолвит сам прокси — кеш DNS не нужен
+        if settings.dns_cache_ttl > 0 and proxy is None:
+            # Тот же пул, что собирает httpx, но с резолвером через DnsCache
+            self._pool.close()
+            self._pool = httpcore.ConnectionPool(
+                ssl_context=httpx.create_ssl_context(),
+                max_connections=limits.max_connections,
+                max_keepalive_connections=limits.max_keepalive_connections,
+                keepalive_expiry=limits.keepalive_expiry,
+                http1=True,
+                http2=http2,
+                network_backend=_CachingResolverBackend(settings.dns_cache_ttl),
+            )
+
+
+_clients_lock = threading.Lock()
+_clients: dict[HttpTransportSettings, httpx.Client] = {}
+# Транспорты для отдельных адресов (локальный стенд провайдера в бенчмарках и нагрузочных тестах)
+_mounts: dict[str, httpx.BaseTransport] = {}
+
+
+def _environment_proxies() -> dict[str, str]:
+    # Схема -> адрес прокси из HTTP(S)_PROXY / ALL_PROXY (ключ "all"); NO_PROXY проверяет proxy_bypass
+    proxies: dict[str, str] = {}
+    for scheme, url in getproxies().items():
+        if scheme in ("http", "https", "all") and url:
+            proxies[scheme] = url if "://" in url else f"http://{url}"
+    return proxies
+
+
+class _ProviderRoutingTransport(httpx.BaseTransport):
+    # httpx учитывает прокси из окружения, только когда транспорт не передан явно, поэтому с собственным
+    # транспортом выбор делается здесь: адрес из mount_transport, прокси для схемы (кроме хостов из NO_PROXY)
+    # или прямое соединение. Подмены адресов читаются на каждый запрос — клиенты при них не пересоздаются.
+
+    def __init__(self, settings: HttpTransportSettings) -> None:
+        self._direct = ProviderHttpTransport(settings)
+        self._proxies = {
+            scheme: ProviderHttpTransport(settings, proxy=url) for scheme, url in _environment_proxies().items()
+        }
+
+    def _route(self, request: httpx.Request) -> httpx.BaseTransport:
+        if _mounts:
+            origin = f"{request.url.scheme}://{request.url.netloc.decode('ascii')}"
+            mounted = _mounts.get(origin)
+            if mounted is not None:
+                return mounted
+        proxy = self._proxies.get(request.url.scheme) or self._proxies.get("all")
+        if proxy is None or proxy_bypass(request.url.host):
+            return self._direct
+        return proxy
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._route(request).handle_request(request)
+
+    def close(self) -> None:
+        self._direct.close()
+        for proxy in self._proxies.values():
+            proxy.close()
+
+
+def get_http_client(settings: HttpTransportSettings) -> httpx.Client:
+    # Один пул соединений на набор параметров на процесс: get_provider вызывается на каждый запрос,
+    # и без общего клиента keep-alive соединения не переживали бы экземпляр провайдера
+    with _clients_lock:
+        client = _clients.get(settings)
+        if client is None:
+            client = httpx.Client(transport=_ProviderRoutingTransport(settings), follow_redirects=True)
+            _clients[settings] = client
+        return client
+
+
+def mount_transport(url_prefix: str, transport: httpx.BaseTransport | None) -> httpx.BaseTransport | None:
+    # Запросы на адрес url_prefix (схема и хост, например "http://fake-provider.local") идут в transport;
+    # None — снять. Клиенты не закрываются: маршрут выбирается на каждый запрос, и уже идущие запросы
+    # доходят через прежний транспорт. -> снятый транспорт; закрывает его вызывающий, когда запросов больше нет.
+    with _clients_lock:
+        previous = _mounts.pop(url_prefix.rstrip("/"), None)
+        if transport is not None:
+            _mounts[url_prefix.rstrip("/")] = transport
+    return previous
+
+
+def close_http_clients() -> None:
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            logger.exception("Не удалось закрыть HTTP-клиент провайдера")
+
+
+def create_openai_clients(http_options: dict | None, **kwargs: Any) -> OpenAIClients:
+    # kwargs — параметры OpenAI(...) провайдера (api_key, base_url, project, ...)
+    settings, timeouts = http_settings_for(http_options)
+    # Повторы и backoff — в обёртке BaseProvider (providers/resilience.py), а не внутри SDK
+    client = OpenAI(
+        **kwargs,
+        max_retries=0,
+        timeout=timeouts.for_operation(timeouts.default),
+        http_client=get_http_client(settings),
+    )
+    return OpenAIClients(
+        default=client,
+        search=client.with_options(timeout=timeouts.for_operation(timeouts.search)),
+        upload=client.with_options(timeout=timeouts.for_operation(timeouts.upload)),
+    )
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+import functools
+import time
+from typing import Any
+
+from providers.coalescing import coalesce_provider_call
+from providers.limiter import get_provider_governor
+from providers.resilience import call_with_resilience
+from utils.metrics import PROVIDER_CALL_ERRORS, PROVIDER_CALL_SECONDS
+from utils.request_context import get_request_stats
+from utils.tracing import get_current_span, get_tracer
+
+_WRAPPED_ATTR = "__provider_instrumented__"
+
+
+def call_provider_method(provider: Any, method: str, fn: Callable, args: tuple, kwargs: dict) -> Any:
+    provider_type = getattr(provider, "provider_type", None) or "unknown"
+    # Вложенный вызов (метод провайдера через другой метод) уже учтён во внешнем
+    parent = get_current_span()
+    nested = parent is not None and parent.name.startswith("provider.")
+    started = time.perf_counter()
+    with get_tracer().start_as_current_span(f"provider.{method}", {"provider_type": provider_type}):
+        try:
+            if nested:
+                return fn(provider, *args, **kwargs)
+            # Повторы, circuit breaker и лимиты — только на внешнем вызове, иначе попытки перемножаются.
+            # Одинаковые одновременные чтения ждут один общий вызов и не занимают слоты лимитера.
+            return coalesce_provider_call(
+                provider_type,
+                method,
+                args,
+                kwargs,
+                lambda: call_with_resilience(
+                    provider_type,
+                    method,
+                    lambda: fn(provider, *args, **kwargs),
+                    slot=get_provider_governor(provider_type).slot,
+                ),
+            )
+        except Exception as e:
+            PROVIDER_CALL_ERRORS.labels(provider_type, method, type(e).__name__).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            PROVIDER_CALL_SECONDS.labels(provider_type, method).observe(elapsed)
+            stats = get_request_stats()
+            if stats is not None and not nested:
+                stats.provider_ms += elapsed * 1000
+                stats.provider_calls += 1
+
+
+def wrap_provider_method(method: str, fn: Callable) -> Callable:
+    if getattr(fn, _WRAPPED_ATTR, False):
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        return call_provider_method(self, method, fn, args, kwargs)
+
+    setattr(wrapper, _WRAPPED_ATTR, True)
+    return wrapper
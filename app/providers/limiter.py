@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+import logging
+import math
+import os
+import socket
+import threading
+import time
+
+from config import get_config
+from database import get_session_maker
+from models.rag_limiter_node import RagLimiterNode
+from providers.resilience import ProviderThrottledError
+from utils.metrics import callback_gauge, histogram
+
+logger = logging.getLogger(__name__)
+
+# Полосы приоритета: пока ждёт вызов более высокой полосы, более низкие слот не получают
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_DEFAULT = "default"
+PRIORITY_BACKGROUND = "background"
+_PRIORITY_RANK = {PRIORITY_INTERACTIVE: 0, PRIORITY_DEFAULT: 1, PRIORITY_BACKGROUND: 2}
+
+_priority: ContextVar[str] = ContextVar("provider_priority", default=PRIORITY_DEFAULT)
+
+PROVIDER_LIMITER_WAIT_SECONDS = histogram(
+    "provider_limiter_wait_seconds",
+    "Ожидание слота лимитера провайдера",
+    ("provider_type", "priority"),
+)
+
+
+@contextmanager
+def provider_priority(priority: str) -> Iterator[None]:
+    # Полоса для вызовов провайдера внутри блока (поиск — interactive, задачи и опрос статуса — background)
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class ProviderGovernor:
+    # Токен-бакет (rate_per_minute, burst) и семафор параллельности (max_concurrency) одного провайдера,
+    # общие для всех потоков процесса. Фоновая полоса получает не больше background_share лимитов
+    # (отдельный бакет и потолок слотов), так что синхронизация не выедает квоту поиска.
+    # При координации через БД лимиты делятся на число живых процессов (set_nodes).
+
+    def __init__(self, provider_type: str, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.provider_type = provider_type
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._rate_per_minute = 0
+        self._burst = 0
+        self._max_concurrency = 0
+        self._background_share = 1.0
+        self._nodes = 1
+        self._tokens = 0.0
+        self._background_tokens = 0.0
+        self._updated = clock()
+        self._in_flight = 0
+        self._background_in_flight = 0
+        self._waiting = {lane: 0 for lane in _PRIORITY_RANK}
+
+    def configure(
+        self,
+        *,
+        rate_per_minute: int,
+        burst: int,
+        max_concurrency: int,
+        background_share: float,
+    ) -> None:
+        # Сравнение — уже с приведёнными значениями: иначе настройка вне диапазона (доля 0, отрицательный лимит)
+        # никогда не совпадёт с сохранённой, и каждый get_provider заново наполнял бы бакеты
+        limits = (
+            max(0, rate_per_minute),
+            max(0, burst),
+            max(0, max_concurrency),
+            min(1.0, max(0.01, background_share)),
+        )
+        with self._cond:
+            if limits == (self._rate_per_minute, self._burst, self._max_concurrency, self._background_share):
+                return
+            self._rate_per_minute, self._burst, self._max_concurrency, self._background_share = limits
+            # Новый лимит — бакеты полные
+            self._tokens = self._capacity()
+            self._background_tokens = self._capacity() * self._background_share
+            self._updated = self._clock()
+            self._cond.notify_all()
+
+    def set_nodes(self, nodes: int) -> None:
+        with self._cond:
+            self._nodes = max(1, nodes)
+            self._cond.notify_all()
+
+    def _rate(self) -> float:
+        # Токенов в секунду на этот процесс
+        return self._rate_per_minute / 60.0 / self._nodes
+
+    def _capacity(self) -> float:
+        burst = self._burst or max(1, math.ceil(self._rate_per_minute / 60))
+        return max(1.0, burst / self._nodes)
+
+    def _concurrency(self) -> int:
+        return max(1, self._max_concurrency // self._nodes)
+
+    def _background_concurrency(self) -> int:
+        return max(1, math.floor(self._concurrency() * self._background_share))
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated
+        self._updated = now
+        if not self._rate_per_minute or elapsed <= 0:
+            return
+        capacity = self._capacity()
+        self._tokens = min(capacity, self._tokens + elapsed * self._rate())
+        self._background_tokens = min(
+            capacity * self._background_share,
+            self._background_tokens + elapsed * self._rate() * self._background_share,
+        )
+
+    def _try_take(self, lane: str) -> float | None:
+        # -> None — слот выдан; иначе сколько подождать до следующей проверки
+        rank = _PRIORITY_RANK[lane]
+        if any(count for other, count in self._waiting.items() if _PRIORITY_RANK[other] < rank):
+            return 1.0
+        background = lane == PRIORITY_BACKGROUND
+
+        if self._max_concurrency:
+            if self._in_flight >= self._concurrency():
+                return 1.0
+            if background and self._background_in_flight >= self._background_concurrency():
+                return 1.0
+
+        if self._rate_per_minute:
+            self._refill()
+            if self._tokens < 1:
+                return (1 - self._tokens) / self._rate()
+            if background and self._background_tokens < 1:
+                return (1 - self._background_tokens) / (self._rate() * self._background_share)
+            self._tokens -= 1
+            if background:
+                self._background_tokens -= 1
+
+        self._in_flight += 1
+        if background:
+            self._background_in_flight += 1
+        return None
+
+    def acquire(self, lane: str, *, timeout: float) -> None:
+        lane = lane if lane in _PRIORITY_RANK else PRIORITY_DEFAULT
+        started = self._clock()
+        deadline = started + max(0.0, timeout)
+        with self._cond:
+            self._waiting[lane] += 1
+            try:
+                while True:
+                    wait = self._try_take(lane)
+                    if wait is None:
+                        break
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        raise ProviderThrottledError(self.provider_type, max(1.0, wait))
+                    self._cond.wait(min(wait, remaining))
+            finally:
+                self._waiting[lane] -= 1
+                # Ожидающие более низкой полосы могли блокироваться этим вызовом
+                self._cond.notify_all()
+        PROVIDER_LIMITER_WAIT_SECONDS.labels(self.provider_type, lane).observe(self._clock() - started)
+
+    def release(self, lane: str) -> None:
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            if lane == PRIORITY_BACKGROUND:
+                self._background_in_flight = max(0, self._background_in_flight - 1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, lane: str | None = None, *, timeout: float | None = None) -> Iterator[None]:
+        lane = lane or current_priority()
+        if lane not in _PRIORITY_RANK:
+            lane = PRIORITY_DEFAULT
+        if timeout is None:
+            config = get_config()
+            wait_ms = (
+                config.provider_limiter_background_max_wait_ms
+                if lane == PRIORITY_BACKGROUND
+                else config.provider_limiter_max_wait_ms
+            )
+            timeout = max(0, wait_ms) / 1000
+        self.acquire(lane, timeout=timeout)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            if self._rate_per_minute:
+                self._refill()
+            return {
+                "rate_limit_per_minute": self._rate_per_minute or None,
+                "rate_limit_burst": self._burst or None,
+                "max_concurrency": self._max_concurrency or None,
+                "nodes": self._nodes,
+                "in_flight": self._in_flight,
+                "background_in_flight": self._background_in_flight,
+                "tokens": round(self._tokens, 2) if self._rate_per_minute else None,
+                "waiting": dict(self._waiting),
+            }
+
+
+_governors_lock = threading.Lock()
+_governors: dict[str, ProviderGovernor] = {}
+_nodes = 1
+
+
+def get_provider_governor(provider_type: str) -> ProviderGovernor:
+    with _governors_lock:
+        governor = _governors.get(provider_type)
+        if governor is None:
+            governor = ProviderGovernor(provider_type)
+            governor.set_nodes(_nodes)
+            config = get_config()
+            # До первого get_provider (лимиты из подключения) — значения по умолчанию
+            governor.configure(
+                rate_per_minute=config.provider_default_rate_limit_per_minute,
+                burst=0,
+                max_concurrency=config.provider_default_max_concurrency,
+                background_share=config.provider_limiter_background_share_percent / 100,
+            )
+            _governors[provider_type] = governor
+        return governor
+
+
+def configure_provider_limits(
+    provider_type: str,
+    *,
+    rate_limit_per_minute: int | None,
+    rate_limit_burst: int | None,
+    max_concurrency: int | None,
+) -> None:
+    # Лимиты подключения (rag_provider_connections); None — значение по умолчанию из конфигурации, 0 — без лимита
+    config = get_config()
+    get_provider_governor(provider_type).configure(
+        rate_per_minute=(
+            config.provider_default_rate_limit_per_minute if rate_limit_per_minute is None else rate_limit_per_minute
+        ),
+        burst=rate_limit_burst or 0,
+        max_concurrency=config.provider_default_max_concurrency if max_concurrency is None else max_concurrency,
+        background_share=config.provider_limiter_background_share_percent / 100,
+    )
+
+
+def limiter_nodes() -> int:
+    # Число живых процессов по rag_limiter_nodes (1, если координация через БД выключена)
+    return _nodes
+
+
+def _set_nodes(nodes: int) -> None:
+    global _nodes
+
+    with _governors_lock:
+        _nodes = max(1, nodes)
+        governors = list(_governors.values())
+    for governor in governors:
+        governor.set_nodes(_nodes)
+
+
+def _in_flight_samples():
+    with _governors_lock:
+        items = list(_governors.items())
+    for provider_type, governor in items:
+        yield (provider_type,), governor.snapshot()["in_flight"]
+
+
+callback_gauge(
+    "provider_limiter_in_flight",
+    "Выполняющиеся вызовы провайдера (слоты лимитера)",
+    ("provider_type",),
+    _in_flight_samples,
+)
+
+
+# Координация между процессами: каждый процесс отмечается в rag_limiter_nodes, лимиты делятся
+# на число живых узлов. Одна запись раз в PROVIDER_LIMITER_NODE_HEARTBEAT_SECONDS, без блокировок на вызов.
+
+_coordination_stop = threading.Event()
+_coordination_thread: threading.Thread | None = None
+
+
+def _node_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def refresh_limiter_nodes(db, node_id: str, *, heartbeat_seconds: int) -> int:
+    now = datetime.utcnow()
+    node = db.get(RagLimiterNode, node_id)
+    if node is None:
+        db.add(RagLimiterNode(id=node_id, heartbeat_at=now, created_at=now))
+    else:
+        node.heartbeat_at = now
+    # Узел, пропустивший три отметки, считается остановленным
+    stale_before = now - timedelta(seconds=heartbeat_seconds * 3)
+    db.query(RagLimiterNode).filter(RagLimiterNode.heartbeat_at < stale_before).delete(synchronize_session=False)
+    db.commit()
+    return db.query(RagLimiterNode).count()
+
+
+def _coordination_loop(heartbeat_seconds: int) -> None:
+    session_local = get_session_maker()
+    node_id = _node_id()
+    while True:
+        db = session_local()
+        try:
+            _set_nodes(refresh_limiter_nodes(db, node_id, heartbeat_seconds=heartbeat_seconds))
+        except Exception:
+            db.rollback()
+            logger.exception("Лимитер провайдеров: ошибка обновления узлов в БД")
+        finally:
+            db.close()
+        if _coordination_stop.wait(heartbeat_seconds):
+            break
+
+    db = session_local()
+    try:
+        db.query(RagLimiterNode).filter(RagLimiterNode.id == node_id).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        logger.exception("Лимитер провайдеров: не удалось снять отметку узла")
+    finally:
+        db.close()
+
+
+def start_limiter_coordination() -> None:
+    global _coordination_thread
+
+    config = get_config()
+    if not config.provider_limiter_db_coordination or _coordination_thread is not None:
+        return
+
+    _coordination_stop.clear()
+    _coordination_thread = threading.Thread(
+        target=_coordination_loop,
+        args=(max(1, config.provider_limiter_node_heartbeat_seconds),),
+        name="provider-limiter-nodes",
+        daemon=True,
+    )
+    _coordination_thread.start()
+
+
+def stop_limiter_coordination(timeout: float = 5.0) -> None:
+    global _coordination_thread
+
+    _coordination_stop.set()
+    if _coordination_thread is not None:
+        _coordination_thread.join(timeout)
+        _coordination_thread = None
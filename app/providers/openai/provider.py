@@ -2,10 +2,9 @@ from __future__ import annotations
 
 from typing import Any
 
-from openai import OpenAI
-
 from models.rag_provider_connection import RagProviderConnection
 from providers.base import BaseProvider
+from providers.http_transport import create_openai_clients
 
 
 class OpenAIProvider(BaseProvider):
@@ -27,12 +26,17 @@ class OpenAIProvider(BaseProvider):
         organization = credentials.get("organization")
         project = credentials.get("project")
 
-        self._client = OpenAI(
+        # Общий пул соединений и таймауты по операциям — providers/http_transport.py
+        clients = create_openai_clients(
+            connection.http_options,
             api_key=api_key,
             base_url=base_url,
             organization=organization,
             project=project,
         )
+        self._client = clients.default
+        self._search_client = clients.search
+        self._upload_client = clients.upload
 
     def _dump(self, obj: Any) -> dict[str, Any]:
         if obj is None:
@@ -116,7 +120,7 @@ class OpenAIProvider(BaseProvider):
         if rewrite_query is not None:
             kwargs["rewrite_query"] = rewrite_query
 
-        page = self._client.vector_stores.search(vector_store_id, **kwargs)
+        page = self._search_client.vector_stores.search(vector_store_id, **kwargs)
         return self._dump_page(page)
 
     def attach_file_to_vector_store(
@@ -181,7 +185,7 @@ class OpenAIProvider(BaseProvider):
         return self._dump_page(page)
 
     def retrieve_vector_store_file_content(self, vector_store_id: str, file_id: str) -> list[dict[str, Any]]:
-        page = self._client.vector_stores.files.content(file_id, vector_store_id=vector_store_id)
+        page = self._upload_client.vector_stores.files.content(file_id, vector_store_id=vector_store_id)
         return self._dump_page(page)
 
     def create_vector_store_file_batch(
@@ -255,7 +259,7 @@ class OpenAIProvider(BaseProvider):
         return self._dump(item)
 
     def retrieve_file_content(self, file_id: str) -> bytes:
-        resp = self._client.files.content(file_id)
+        resp = self._upload_client.files.content(file_id)
         if isinstance(resp, (bytes, bytearray)):
             return bytes(resp)
         if hasattr(resp, "read"):
@@ -276,7 +280,7 @@ class OpenAIProvider(BaseProvider):
 
     def create_file(self, local_path: str, meta: dict | None = None) -> dict[str, Any]:
         with open(local_path, "rb") as f:
-            created = self._client.files.create(file=f, purpose="assistants")
+            created = self._upload_client.files.create(file=f, purpose="assistants")
 
         data = self._dump(created)
         if meta:
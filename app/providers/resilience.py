@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import logging
+import random
+import threading
+import time
+from typing import Any
+
+import httpx
+import openai
+
+from config import get_config
+from utils.metrics import callback_gauge, counter
+
+logger = logging.getLogger(__name__)
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+_BREAKER_STATE_VALUES = {BREAKER_CLOSED: 0, BREAKER_HALF_OPEN: 1, BREAKER_OPEN: 2}
+
+# Статусы, при которых запрос провайдером не выполнен и его можно повторить
+_RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Создающие методы без ключа идемпотентности: повтор после таймаута/5xx может создать дубль,
+# поэтому повторяются только отклонённые до выполнения (429)
+NON_IDEMPOTENT_METHODS = frozenset({"create_vector_store", "create_file", "create_vector_store_file_batch"})
+
+PROVIDER_CALL_RETRIES = counter(
+    "provider_call_retries",
+    "Повторы вызовов методов провайдера",
+    ("provider_type", "method", "reason"),
+)
+
+PROVIDER_BREAKER_REJECTED = counter(
+    "provider_breaker_rejected",
+    "Вызовы провайдера, отклонённые открытым circuit breaker",
+    ("provider_type",),
+)
+
+
+class ProviderUnavailableError(Exception):
+    # Circuit breaker провайдера открыт: вызов не выполнялся
+    def __init__(self, provider_type: str, retry_after: float) -> None:
+        self.provider_type = provider_type
+        self.retry_after = max(0.0, retry_after)
+        super().__init__(self._message())
+
+    def _message(self) -> str:
+        return f"Провайдер {self.provider_type} временно недоступен, повторите через {self.retry_after:.0f} с"
+
+
+class ProviderThrottledError(ProviderUnavailableError):
+    # Локальный лимит провайдера (частота/параллельность) не дал слот за отведённое время
+    def _message(self) -> str:
+        return f"Превышен лимит запросов к провайдеру {self.provider_type}, повторите через {self.retry_after:.0f} с"
+
+
+def _parse_retry_after(headers: Any) -> float | None:
+    if headers is None:
+        return None
+    # OpenAI-совместимые API отдают ещё и retry-after-ms с точностью до миллисекунд
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return max(0.0, (at - datetime.now(timezone.utc)).total_seconds())
+
+
+def classify_error(e: BaseException) -> tuple[str | None, float | None]:
+    # -> (причина для повтора или None, если ошибка не временная; Retry-After в секундах)
+    if isinstance(e, openai.APIStatusError):
+        if e.status_code not in _RETRYABLE_STATUS_CODES:
+            return None, None
+        return f"http_{e.status_code}", _parse_retry_after(e.response.headers)
+    if isinstance(e, openai.APITimeoutError | httpx.TimeoutException | TimeoutError):
+        return "timeout", None
+    if isinstance(e, openai.APIConnectionError | httpx.TransportError | ConnectionError):
+        return "connection", None
+    return None, None
+
+
+class CircuitBreaker:
+    # closed → (failure_threshold временных ошибок подряд) → open → (open_seconds) → half_open:
+    # пропускается half_open_max_calls пробных вызовов; успех закрывает, ошибка снова открывает.
+    # Ошибки входных данных (4xx, кроме 408/425/429) провайдер не «ломают» и считаются успехом.
+
+    def __init__(
+        self,
+        provider_type: str,
+        *,
+        failure_threshold: int,
+        open_seconds: float,
+        half_open_max_calls: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.provider_type = provider_type
+        self._failure_threshold = max(1, failure_threshold)
+        self._open_seconds = max(0.1, open_seconds)
+        self._half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = BREAKER_CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._half_open_calls = 0
+        self._last_error: str | None = None
+        self._last_failure_at: datetime | None = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self) -> None:
+        if self._state == BREAKER_OPEN and self._clock() >= self._open_until:
+            self._state = BREAKER_HALF_OPEN
+            self._half_open_calls = 0
+
+    def before_call(self) -> None:
+        with self._lock:
+            self._refresh()
+            if self._state == BREAKER_CLOSED:
+                return
+            if self._state == BREAKER_HALF_OPEN and self._half_open_calls < self._half_open_max_calls:
+                self._half_open_calls += 1
+                return
+            retry_after = max(0.0, self._open_until - self._clock()) if self._state == BREAKER_OPEN else 1.0
+        PROVIDER_BREAKER_REJECTED.labels(self.provider_type).inc()
+        raise ProviderUnavailableError(self.provider_type, retry_after)
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self._state != BREAKER_CLOSED:
+                logger.info("Circuit breaker провайдера %s закрыт", self.provider_type)
+            self._state = BREAKER_CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+
+    def on_failure(self, error: BaseException, *, retry_after: float | None = None) -> None:
+        with self._lock:
+            self._failures += 1
+            self._last_error = f"{type(error).__name__}: {error}"
+            self._last_failure_at = datetime.utcnow()
+            if self._state == BREAKER_HALF_OPEN or self._failures >= self._failure_threshold:
+                if self._state != BREAKER_OPEN:
+                    logger.warning(
+                        "Circuit breaker провайдера %s открыт: %s ошибок подряд, последняя: %s",
+                        self.provider_type,
+                        self._failures,
+                        self._last_error,
+                    )
+                now = self._clock()
+                self._state = BREAKER_OPEN
+                # Retry-After провайдера длиннее нашего окна — ждём столько, сколько он просит
+                self._open_until = now + max(self._open_seconds, retry_after or 0.0)
+                self._half_open_calls = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._refresh()
+            now = self._clock()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_after_seconds": round(max(0.0, self._open_until - now), 1) if self._state == BREAKER_OPEN else None,
+                "last_error": self._last_error,
+                "last_failure_at": self._last_failure_at,
+            }
+
+
+_breakers_lock = threading.Lock()
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider_type: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(provider_type)
+        if breaker is None:
+            config = get_config()
+            breaker = CircuitBreaker(
+                provider_type,
+                failure_threshold=config.provider_breaker_failure_threshold,
+                open_seconds=config.provider_breaker_open_seconds,
+                half_open_max_calls=config.provider_breaker_half_open_max_calls,
+            )
+            _breakers[provider_type] = breaker
+        return breaker
+
+
+def reset_circuit_breakers() -> None:
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def _breaker_samples():
+    with _breakers_lock:
+        items = list(_breakers.items())
+    for provider_type, breaker in items:
+        yield (provider_type,), _BREAKER_STATE_VALUES[breaker.state]
+
+
+callback_gauge(
+    "provider_breaker_state",
+    "Состояние circuit breaker провайдера: 0 — closed, 1 — half_open, 2 — open",
+    ("provider_type",),
+    _breaker_samples,
+)
+
+
+def backoff_delay(attempt: int, *, base: float, cap: float) -> float:
+    # Полный джиттер: [0, min(cap, base·2^(attempt-1))]
+    return random.uniform(0, min(cap, base * (2 ** max(0, attempt - 1))))
+
+
+def call_with_resilience(
+    provider_type: str,
+    method: str,
+    call: Callable[[], Any],
+    *,
+    slot: Callable[[], AbstractContextManager] | None = None,
+) -> Any:
+    # Повторы временных ошибок с экспоненциальной задержкой (не меньше Retry-After) и circuit breaker
+    # на тип провайдера. Retry-After длиннее PROVIDER_RETRY_MAX_DELAY_MS не ждём — поток запроса
+    # не должен висеть: ошибка уходит вызывающему, а breaker учитывает её как сбой.
+    # slot — лимитер провайдера: занимается на каждую попытку (до breaker), на время задержки отпускается.
+    config = get_config()
+    max_attempts = max(1, config.provider_retry_max_attempts)
+    base = max(0, config.provider_retry_backoff_ms) / 1000
+    cap = max(base, config.provider_retry_backoff_max_ms / 1000)
+    max_delay = max(0, config.provider_retry_max_delay_ms) / 1000
+    breaker = get_circuit_breaker(provider_type)
+
+    attempt = 0
+    while True:
+        attempt += 1
+        with slot() if slot is not None else nullcontext():
+            breaker.before_call()
+            try:
+                result = call()
+            except Exception as e:
+                error = e
+            else:
+                breaker.on_success()
+                return result
+
+        reason, retry_after = classify_error(error)
+        if reason is None:
+            breaker.on_success()
+            raise error
+        breaker.on_failure(error, retry_after=retry_after)
+
+        if attempt >= max_attempts or (method in NON_IDEMPOTENT_METHODS and reason != "http_429"):
+            raise error
+        delay = max(backoff_delay(attempt, base=base, cap=cap), retry_after or 0.0)
+        if delay > max_delay:
+            raise error
+        PROVIDER_CALL_RETRIES.labels(provider_type, method, reason).inc()
+        logger.warning(
+            "Повтор вызова провайдера %s.%s: попытка %s, причина %s, задержка %.2f с",
+            provider_type,
+            method,
+            attempt,
+            reason,
+            delay,
+        )
+        time.sleep(delay)
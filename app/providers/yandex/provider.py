@@ -3,11 +3,12 @@ from __future__ import annotations
 import logging
 from typing import Any
 
-from openai import OpenAI
 from openai import NotFoundError
 
 from models.rag_provider_connection import RagProviderConnection
 from providers.base import BaseProvider
+from providers.http_transport import create_openai_clients
+from utils.logger import log_payload
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -36,11 +37,16 @@ class YandexProvider(BaseProvider):
 
         base_url = connection.base_url or credentials.get("base_url") or _DEFAULT_YANDEX_BASE_URL
 
-        self._client = OpenAI(
+        # Общий пул соединений и таймауты по операциям — providers/http_transport.py
+        clients = create_openai_clients(
+            connection.http_options,
             api_key=api_key,
             base_url=base_url,
             project=project,
         )
+        self._client = clients.default
+        self._search_client = clients.search
+        self._upload_client = clients.upload
 
     def _dump(self, obj: Any) -> dict[str, Any]:
         if obj is None:
@@ -140,7 +146,7 @@ class YandexProvider(BaseProvider):
         if rewrite_query is not None:
             kwargs["rewrite_query"] = rewrite_query
 
-        page = self._client.vector_stores.search(vector_store_id, **kwargs)
+        page = self._search_client.vector_stores.search(vector_store_id, **kwargs)
         return self._dump_page(page)
 
     def attach_file_to_vector_store(
@@ -151,17 +157,17 @@ class YandexProvider(BaseProvider):
         attributes: dict | None = None,
         chunking_strategy: dict | None = None,
     ) -> dict[str, Any]:
-        logger.info(f"attach_file_to_vector_store called: vector_store_id={vector_store_id}, file_id={file_id}")
-        logger.info(f"attributes: {attributes}, chunking_strategy: {chunking_strategy}")
+        logger.info("attach_file_to_vector_store called: vector_store_id=%s, file_id=%s", vector_store_id, file_id)
+        logger.info("attributes: %s, chunking_strategy: %s", log_payload(attributes, sample=False), chunking_strategy)
         
         # Сначала проверим, не прикреплен ли уже файл к vector store
         try:
-            logger.info(f"Checking if file {file_id} is already attached to vector store {vector_store_id}")
+            logger.info("Checking if file %s is already attached to vector store %s", file_id, vector_store_id)
             existing_file = self._client.vector_stores.files.retrieve(file_id, vector_store_id=vector_store_id)
-            logger.info(f"File is already attached: {existing_file}")
+            logger.info("File is already attached: %s", log_payload(existing_file, sample=False))
             return self._dump(existing_file)
         except Exception as e:
-            logger.info(f"File is not attached yet: {e}")
+            logger.info("File is not attached yet: %s", e)
             # Файл не прикреплен, продолжаем с прикреплением
         
         kwargs: dict[str, Any] = {"file_id": file_id}
@@ -170,10 +176,10 @@ class YandexProvider(BaseProvider):
         # Yandex API не поддерживает chunking_strategy в attach_file_to_vector_store
         # chunking_strategy используется только при загрузке файла в create_file
 
-        logger.info(f"Calling vector_stores.files.create with kwargs: {kwargs}")
+        logger.info("Calling vector_stores.files.create with kwargs: %s", log_payload(kwargs, sample=False))
         try:
             created = self._client.vector_stores.files.create(vector_store_id, **kwargs)
-            logger.info(f"Successfully attached file: {created}")
+            logger.info("Successfully attached file: %s", log_payload(created, sample=False))
             
             # Yandex API не позволяет проверять статус файла во время обработки
             # Возвращает 404 при попытке retrieve файла со статусом 'in_progress'
@@ -181,24 +187,24 @@ class YandexProvider(BaseProvider):
             
             return self._dump(created)
         except Exception as e:
-            logger.error(f"Error attaching file to vector store: {e}")
-            logger.error(f"Exception type: {type(e).__name__}")
+            logger.error("Error attaching file to vector store: %s", e)
+            logger.error("Exception type: %s", type(e).__name__)
             # Попробуем получить тело ответа если есть
             if hasattr(e, 'response') and hasattr(e.response, 'text'):
-                logger.error(f"Response body: {e.response.text}")
+                logger.error("Response body: %s", e.response.text)
             # Попробуем получить статус код и заголовки
             if hasattr(e, 'response') and hasattr(e.response, 'status_code'):
-                logger.error(f"Response status code: {e.response.status_code}")
+                logger.error("Response status code: %s", e.response.status_code)
             if hasattr(e, 'response') and hasattr(e.response, 'headers'):
-                logger.error(f"Response headers: {e.response.headers}")
+                logger.error("Response headers: %s", e.response.headers)
             # Для 500 ошибок добавим дополнительную информацию
             if hasattr(e, 'response') and hasattr(e.response, 'status_code') and e.response.status_code == 500:
                 logger.error("500 Internal Server Error - possible Yandex API issue")
                 logger.error("Request data that caused the error:")
-                logger.error(f"  vector_store_id: {vector_store_id}")
-                logger.error(f"  file_id: {file_id}")
-                logger.error(f"  attributes: {attributes}")
-                logger.error(f"  chunking_strategy: {chunking_strategy}")
+                logger.error("  vector_store_id: %s", vector_store_id)
+                logger.error("  file_id: %s", file_id)
+                logger.error("  attributes: %s", log_payload(attributes, sample=False))
+                logger.error("  chunking_strategy: %s", chunking_strategy)
             raise
 
     def retrieve_vector_store_file(self, vector_store_id: str, file_id: str) -> dict[str, Any]:
@@ -247,7 +253,7 @@ class YandexProvider(BaseProvider):
         return self._dump_page(page)
 
     def retrieve_vector_store_file_content(self, vector_store_id: str, file_id: str) -> list[dict[str, Any]]:
-        page = self._client.vector_stores.files.content(file_id, vector_store_id=vector_store_id)
+        page = self._upload_client.vector_stores.files.content(file_id, vector_store_id=vector_store_id)
         return self._dump_page(page)
 
     def create_vector_store_file_batch(
@@ -321,7 +327,7 @@ class YandexProvider(BaseProvider):
         return self._dump(item)
 
     def retrieve_file_content(self, file_id: str) -> bytes:
-        resp = self._client.files.content(file_id, extra_headers={"OpenAI-Beta": "assistants=v2"})
+        resp = self._upload_client.files.content(file_id, extra_headers={"OpenAI-Beta": "assistants=v2"})
         if isinstance(resp, (bytes, bytearray)):
             return bytes(resp)
         if hasattr(resp, "read"):
@@ -368,7 +374,7 @@ class YandexProvider(BaseProvider):
         mime_type = extension_to_mime.get(file_ext, 'text/plain')  # fallback to text/plain
         
         with open(local_path, "rb") as f:
-            created = self._client.files.create(
+            created = self._upload_client.files.create(
                 file=(Path(local_path).name, f, mime_type), 
                 purpose="fine-tune"
             )
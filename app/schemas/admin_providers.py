@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from schemas.providers import ProviderBreakerOut, ProviderLimiterOut
 
 
 class ProviderConnectionOut(BaseModel):
@@ -19,10 +21,28 @@ class ProviderConnectionOut(BaseModel):
     has_token: bool
     token_expires_at: datetime | None = None
 
+    rate_limit_per_minute: int | None = None
+    rate_limit_burst: int | None = None
+    max_concurrency: int | None = None
+    http_options: dict | None = None
+
     created_at: datetime
     updated_at: datetime
 
 
+class ProviderHttpOptionsIn(BaseModel):
+    # Не заданные поля — значения по умолчанию PROVIDER_HTTP_* (providers/http_transport.py)
+    http2: bool | None = None
+    max_connections: int | None = Field(default=None, ge=1)
+    max_keepalive_connections: int | None = Field(default=None, ge=0)
+    keepalive_expiry_seconds: float | None = Field(default=None, ge=0)
+    connect_timeout_seconds: float | None = Field(default=None, gt=0)
+    timeout_seconds: float | None = Field(default=None, gt=0)
+    search_timeout_seconds: float | None = Field(default=None, gt=0)
+    upload_timeout_seconds: float | None = Field(default=None, gt=0)
+    dns_cache_ttl_seconds: float | None = Field(default=None, ge=0)
+
+
 class ProviderConnectionCreateIn(BaseModel):
     base_url: str | None = None
     auth_type: str
@@ -33,6 +53,12 @@ class ProviderConnectionCreateIn(BaseModel):
 
     is_enabled: bool = True
 
+    # NULL — значения по умолчанию (PROVIDER_DEFAULT_*), 0 — без лимита
+    rate_limit_per_minute: int | None = Field(default=None, ge=0)
+    rate_limit_burst: int | None = Field(default=None, ge=0)
+    max_concurrency: int | None = Field(default=None, ge=0)
+    http_options: ProviderHttpOptionsIn | None = None
+
 
 class ProviderConnectionPatchIn(BaseModel):
     base_url: str | None = None
@@ -44,6 +70,11 @@ class ProviderConnectionPatchIn(BaseModel):
 
     is_enabled: bool | None = None
 
+    rate_limit_per_minute: int | None = Field(default=None, ge=0)
+    rate_limit_burst: int | None = Field(default=None, ge=0)
+    max_concurrency: int | None = Field(default=None, ge=0)
+    http_options: ProviderHttpOptionsIn | None = None
+
 
 class ProviderConnectionsListOut(BaseModel):
     items: list[ProviderConnectionOut]
@@ -53,6 +84,8 @@ class ProviderHealthOut(BaseModel):
     provider_type: str
     status: str
     detail: str | None = None
+    breaker: ProviderBreakerOut | None = None
+    limiter: ProviderLimiterOut | None = None
 
 
 class ProviderFileUploadOut(BaseModel):
@@ -86,6 +119,7 @@ class ProviderFileUploadPatchIn(BaseModel):
 
 class ProviderFileUploadsListOut(BaseModel):
     items: list[ProviderFileUploadOut]
+    next_cursor: str | None = None
 
 
 class VectorStoreCreateIn(BaseModel):
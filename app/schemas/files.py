@@ -13,6 +13,7 @@ class FileOut(BaseModel):
     file_type: str
     local_path: str
     size_bytes: int
+    content_sha256: str | None = None
 
     tags: dict | list | None = None
     notes: str | None = None
@@ -23,6 +24,7 @@ class FileOut(BaseModel):
 
 class FilesListOut(BaseModel):
     items: list[FileOut]
+    next_cursor: str | None = None
 
 
 class FilePatchIn(BaseModel):
@@ -52,6 +52,7 @@ class IndexPatchIn(BaseModel):
 
 class IndexesListOut(BaseModel):
     items: list[IndexOut]
+    next_cursor: str | None = None
 
 
 class IndexFileOut(BaseModel):
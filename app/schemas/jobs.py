@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class JobOut(BaseModel):
+    id: str
+    job_type: str
+    status: str
+
+    domain_id: str | None = None
+    index_id: str | None = None
+    provider_type: str | None = None
+    params: dict | None = None
+
+    attempts: int
+    max_attempts: int
+    cancel_requested: bool
+    progress: dict | None = None
+    result: dict | None = None
+    last_error: str | None = None
+
+    run_after: datetime
+    created_at: datetime
+    updated_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
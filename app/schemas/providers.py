@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -12,7 +14,28 @@ class ProvidersPublicListOut(BaseModel):
     items: list[ProviderPublicOut]
 
 
+class ProviderBreakerOut(BaseModel):
+    state: str
+    consecutive_failures: int
+    retry_after_seconds: float | None = None
+    last_error: str | None = None
+    last_failure_at: datetime | None = None
+
+
+class ProviderLimiterOut(BaseModel):
+    rate_limit_per_minute: int | None = None
+    rate_limit_burst: int | None = None
+    max_concurrency: int | None = None
+    nodes: int
+    in_flight: int
+    background_in_flight: int
+    tokens: float | None = None
+    waiting: dict[str, int]
+
+
 class ProviderHealthOut(BaseModel):
     provider_type: str
     status: str
     detail: str | None = None
+    breaker: ProviderBreakerOut | None = None
+    limiter: ProviderLimiterOut | None = None
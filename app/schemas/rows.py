@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+# Быстрые пути сериализации ORM-строк для списочных ручек: dict напрямую из атрибутов,
+# без model_validate на каждую строку. Состав полей должен совпадать с FileOut / IndexOut /
+# ProviderFileUploadOut — модели остаются в response_model для OpenAPI.
+
+from models.rag_file import RagFile
+from models.rag_index import RagIndex
+from models.rag_provider_file_upload import RagProviderFileUpload
+
+
+def file_row(rag_file: RagFile) -> dict:
+    return {
+        "id": rag_file.id,
+        "domain_id": rag_file.domain_id,
+        "file_name": rag_file.file_name,
+        "file_type": rag_file.file_type,
+        "local_path": rag_file.local_path,
+        "size_bytes": rag_file.size_bytes,
+        "content_sha256": rag_file.content_sha256,
+        "tags": rag_file.tags,
+        "notes": rag_file.notes,
+        "created_at": rag_file.created_at,
+        "updated_at": rag_file.updated_at,
+    }
+
+
+def index_row(rag_index: RagIndex) -> dict:
+    return {
+        "id": rag_index.id,
+        "domain_id": rag_index.domain_id,
+        "provider_type": rag_index.provider_type,
+        "external_id": rag_index.external_id,
+        "name": rag_index.name,
+        "description": rag_index.description,
+        "expires_after": rag_index.expires_after,
+        "file_ids": rag_index.file_ids,
+        "metadata": rag_index.metadata_,
+        "indexing_status": rag_index.indexing_status,
+        "indexed_at": rag_index.indexed_at,
+        "created_at": rag_index.created_at,
+        "updated_at": rag_index.updated_at,
+    }
+
+
+def provider_file_upload_row(upload: RagProviderFileUpload) -> dict:
+    return {
+        "id": upload.id,
+        "provider_id": upload.provider_id,
+        "local_file_id": upload.local_file_id,
+        "external_file_id": upload.external_file_id,
+        "external_uploaded_at": upload.external_uploaded_at,
+        "content_sha256": upload.content_sha256,
+        "status": upload.status,
+        "last_error": upload.last_error,
+        "raw_provider_json": upload.raw_provider_json,
+        "created_at": upload.created_at,
+        "updated_at": upload.updated_at,
+    }
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class UploadSessionCreateIn(BaseModel):
+    file_name: str
+    size_bytes: int = Field(ge=0)
+    file_type: str | None = Field(default=None)
+    tags: dict | list | None = Field(default=None)
+    notes: str | None = Field(default=None)
+
+    # По умолчанию — UPLOAD_CHUNK_SIZE_BYTES; все куски, кроме последнего, ровно этого размера
+    chunk_size: int | None = Field(default=None, gt=0)
+    # Если задан, при завершении сверяется с SHA-256 собранного файла
+    sha256: str | None = Field(default=None)
+
+
+class UploadSessionOut(BaseModel):
+    id: str
+    domain_id: str
+    file_id: str
+
+    file_name: str
+    file_type: str
+    size_bytes: int
+    chunk_size: int
+    chunks_total: int
+
+    status: str
+    received_chunks: list[int]
+    received_bytes: int
+
+    expected_sha256: str | None = None
+    content_sha256: str | None = None
+
+    created_at: datetime
+    updated_at: datetime
+    expires_at: datetime
+
+
+class UploadChunkOut(BaseModel):
+    session_id: str
+    chunk_index: int
+    offset: int
+    size_bytes: int
+    sha256: str
+    expires_at: datetime
@@ -1,18 +1,30 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+import hashlib
 import json
+import logging
 import os
 import shutil
 from pathlib import Path
+import threading
 from uuid import uuid4
 
-from fastapi import UploadFile
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from config import get_config
+from database import get_session_maker
 from models.rag_file import RagFile
-from models.rag_index import RagIndex
-from models.rag_index_file import RagIndexFile
+from services.index_membership_service import IndexMembershipService
+from utils.cursor import after_cursor_filter
+
+logger = logging.getLogger(__name__)
+
+_STREAM_BATCH_SIZE = 500
+
+_backfill_lock = threading.Lock()
+_backfill_running: set[str] = set()
 
 
 class FilesService:
@@ -38,42 +50,42 @@ class FilesService:
         path = Path(local_path)
         return path.parent.parent
 
-    def create_file(
-        self,
-        upload: UploadFile,
-        file_type: str | None,
-        tags: dict | list | None,
-        notes: str | None,
-        chunking_strategy: dict | None,
-    ) -> RagFile:
+    def new_upload_path(self, file_name: str | None) -> tuple[str, Path]:
+        # id и путь будущего файла; каталог создаётся сразу, запись в БД — после приёма содержимого
         file_id = str(uuid4())
-
-        original_name = upload.filename or "file"
-        safe_name = Path(original_name).name
-        detected_type = file_type or upload.content_type or "application/octet-stream"
-
+        safe_name = Path(file_name or "file").name or "file"
         path = self._make_file_path(file_id=file_id, file_name=safe_name)
         os.makedirs(path.parent, exist_ok=True)
+        return file_id, path
 
-        size_bytes = 0
-        try:
-            with open(path, "wb") as f:
-                while True:
-                    chunk = upload.file.read(1024 * 1024)
-                    if not chunk:
-                        break
-                    f.write(chunk)
-                    size_bytes += len(chunk)
-        finally:
-            upload.file.close()
+    def discard_upload_path(self, path: Path) -> None:
+        # Убрать недокачанный файл вместе с его каталогом (только внутри FILES_ROOT)
+        file_dir = self._get_file_dir_from_local_path(str(path))
+        files_root = Path(self._config.files_root).resolve()
+        resolved_dir = file_dir.resolve()
+        if resolved_dir == files_root or files_root not in resolved_dir.parents:
+            return
+        shutil.rmtree(file_dir, ignore_errors=True)
 
+    def add_uploaded_file(
+        self,
+        *,
+        file_id: str,
+        path: Path,
+        file_type: str | None,
+        size_bytes: int,
+        content_sha256: str | None,
+        tags: dict | list | None,
+        notes: str | None,
+    ) -> RagFile:
         rag_file = RagFile(
             id=file_id,
             domain_id=self._domain_id,
-            file_name=safe_name,
-            file_type=detected_type,
+            file_name=path.name,
+            file_type=file_type or "application/octet-stream",
             local_path=str(path),
             size_bytes=size_bytes,
+            content_sha256=content_sha256,
             tags=tags,
             notes=notes,
         )
@@ -83,16 +95,26 @@ class FilesService:
         self._db.refresh(rag_file)
         return rag_file
 
-    def list_files(self, skip: int = 0, limit: int = 100) -> list[RagFile]:
+    def _list_files_query(self, skip: int, limit: int, after: str | None):
+        q = self._db.query(RagFile).filter(RagFile.domain_id == self._domain_id)
+        if after:
+            q = q.filter(after_cursor_filter(RagFile.created_at, RagFile.id, after))
+
         return (
-            self._db.query(RagFile)
-            .filter(RagFile.domain_id == self._domain_id)
-            .order_by(RagFile.created_at.desc())
+            q.order_by(RagFile.created_at.desc(), RagFile.id.desc())
             .offset(skip)
             .limit(limit)
-            .all()
         )
 
+    def list_files(self, skip: int = 0, limit: int = 100, after: str | None = None) -> list[RagFile]:
+        return self._list_files_query(skip, limit, after).all()
+
+    def iter_files(self, skip: int = 0, limit: int = 100, after: str | None = None) -> Iterator[RagFile]:
+        # Запрос (и разбор курсора) выполняется сразу; строки читаются пачками,
+        # чтобы память не зависела от размера выборки
+        q = self._list_files_query(skip, limit, after)
+        return iter(q.yield_per(_STREAM_BATCH_SIZE))
+
     def get_file(self, file_id: str) -> RagFile | None:
         return (
             self._db.query(RagFile)
@@ -155,6 +177,7 @@ class FilesService:
         except Exception:
             pass
 
+        IndexMembershipService(self._db).remove_file(rag_file.id)
         self._db.delete(rag_file)
         self._db.commit()
         return True
@@ -196,39 +219,14 @@ class FilesService:
             moved_on_disk = True
 
         new_path = self._make_file_path_for_domain(new_domain_id, rag_file.id, rag_file.file_name)
-        detached_index_links = 0
-        indexes_file_ids_updated = 0
         try:
             rag_file.domain_id = new_domain_id
             rag_file.local_path = str(new_path)
 
-            index_ids = [
-                row[0]
-                for row in self._db.query(RagIndex.id)
-                .filter(RagIndex.domain_id == old_domain_id)
-                .all()
-            ]
-            if index_ids:
-                detached_index_links = (
-                    self._db.query(RagIndexFile)
-                    .filter(RagIndexFile.file_id == rag_file.id)
-                    .filter(RagIndexFile.index_id.in_(index_ids))
-                    .delete(synchronize_session=False)
-                )
-
-            indexes = (
-                self._db.query(RagIndex)
-                .filter(RagIndex.domain_id == old_domain_id)
-                .filter(RagIndex.file_ids.isnot(None))
-                .all()
+            # Затрагиваем только индексы старого домена, в которые файл действительно входит
+            detached_index_links, indexes_file_ids_updated = IndexMembershipService(self._db).remove_file(
+                rag_file.id, domain_id=old_domain_id
             )
-            for idx in indexes:
-                if not isinstance(idx.file_ids, list):
-                    continue
-                if rag_file.id not in idx.file_ids:
-                    continue
-                idx.file_ids = [x for x in idx.file_ids if x != rag_file.id]
-                indexes_file_ids_updated += 1
 
             self._db.commit()
             self._db.refresh(rag_file)
@@ -252,6 +250,44 @@ class FilesService:
         }
 
 
+def backfill_content_sha256(file_id: str) -> str | None:
+    # SHA-256 файла, загруженного до появления content_sha256: считается один раз, в фоне после
+    # первого скачивания. Повторный вызов для того же файла, пока идёт подсчёт, ничего не делает.
+    with _backfill_lock:
+        if file_id in _backfill_running:
+            return None
+        _backfill_running.add(file_id)
+
+    db = get_session_maker()()
+    try:
+        rag_file = db.get(RagFile, file_id)
+        if rag_file is None or rag_file.content_sha256:
+            return rag_file.content_sha256 if rag_file is not None else None
+        local_path = rag_file.local_path
+        # Транзакция не держится открытой, пока читается файл
+        db.rollback()
+
+        with open(local_path, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+
+        # Условие по local_path — на случай переименования во время подсчёта; updated_at не меняется
+        db.execute(
+            update(RagFile)
+            .where(RagFile.id == file_id, RagFile.local_path == local_path, RagFile.content_sha256.is_(None))
+            .values(content_sha256=digest, updated_at=RagFile.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return digest
+    except OSError as e:
+        logger.warning("Не удалось посчитать SHA-256 файла %s: %s", file_id, e)
+        return None
+    finally:
+        db.close()
+        with _backfill_lock:
+            _backfill_running.discard(file_id)
+
+
 def parse_tags(tags: str | None) -> dict | list | None:
     if tags is None or tags.strip() == "":
         return None
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import itertools
+import logging
+import threading
+
+from sqlalchemy import or_
+
+from config import get_config
+from database import get_session_maker
+from models.rag_index import RagIndex
+from models.rag_job import RagJob
+from services.jobs_service import ACTIVE_JOB_STATUSES
+from utils.metrics import callback_gauge
+
+logger = logging.getLogger(__name__)
+
+EVENT_SNAPSHOT = "index.snapshot"
+EVENT_INDEX_STATUS = "index.status"
+EVENT_INDEX_FILES = "index.files"
+EVENT_JOB = "job"
+
+# Запас на секундную точность DATETIME в MariaDB и расхождение часов между процессами
+_WATERMARK_MARGIN = timedelta(seconds=2)
+_QUEUE_SIZE = 256
+
+
+@dataclass(eq=False)
+class Subscription:
+    domain_id: str
+    index_id: str | None
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=_QUEUE_SIZE))
+
+    def matches(self, domain_id: str | None, index_id: str | None) -> bool:
+        if domain_id != self.domain_id:
+            return False
+        return self.index_id is None or self.index_id == index_id
+
+    def deliver(self, event: tuple[int, str, dict]) -> None:
+        # Вызывается из потока наблюдателя: сама постановка — в цикле событий подписчика
+        def _put() -> None:
+            if self.queue.full():
+                # Медленный клиент: теряем самое старое событие, а не блокируем остальных
+                self.queue.get_nowait()
+            self.queue.put_nowait(event)
+
+        try:
+            self.loop.call_soon_threadsafe(_put)
+        except RuntimeError:
+            # Цикл событий уже закрыт — подписчик отключился
+            pass
+
+
+def _file_counts(metadata: object) -> dict | None:
+    if not isinstance(metadata, dict):
+        return None
+    payload = metadata.get("provider_payload")
+    if not isinstance(payload, dict):
+        return None
+    counts = payload.get("file_counts")
+    return counts if isinstance(counts, dict) else None
+
+
+def index_snapshot(rag_index: RagIndex) -> dict:
+    return {
+        "index_id": rag_index.id,
+        "domain_id": rag_index.domain_id,
+        "indexing_status": rag_index.indexing_status,
+        "indexed_at": rag_index.indexed_at,
+        "file_counts": _file_counts(rag_index.metadata_),
+    }
+
+
+def job_snapshot(job: RagJob) -> dict:
+    return {
+        "job_id": job.id,
+        "job_type": job.job_type,
+        "index_id": job.index_id,
+        "domain_id": job.domain_id,
+        "status": job.status,
+        "progress": job.progress or {},
+        "attempts": job.attempts,
+        "last_error": job.last_error,
+    }
+
+
+def initial_events(db, *, domain_id: str, index_id: str | None) -> list[tuple[str, dict]]:
+    # Текущее состояние на момент подписки: для одного индекса — всегда, для домена — только
+    # индексы, статус которых ещё может измениться, плюс активные задачи
+    from services.index_status_poller import POLLED_STATUSES
+
+    q = db.query(RagIndex).filter(RagIndex.domain_id == domain_id)
+    if index_id is not None:
+        q = q.filter(RagIndex.id == index_id)
+    else:
+        q = q.filter(RagIndex.indexing_status.in_(POLLED_STATUSES))
+    events = [(EVENT_SNAPSHOT, index_snapshot(i)) for i in q.all()]
+
+    jq = db.query(RagJob).filter(RagJob.domain_id == domain_id).filter(RagJob.status.in_(ACTIVE_JOB_STATUSES))
+    if index_id is not None:
+        jq = jq.filter(RagJob.index_id == index_id)
+    events.extend((EVENT_JOB, job_snapshot(j)) for j in jq.order_by(RagJob.created_at.asc()).all())
+    return events
+
+
+class IndexEventsWatcher:
+    # Один наблюдатель на процесс: пока есть подписчики, раз в INDEX_EVENTS_POLL_MS читает из БД
+    # изменившиеся (по updated_at) индексы и задачи подписанных доменов/индексов и рассылает разницу.
+    # Источник — БД, поэтому видны изменения опроса статусов и воркеров из любых процессов;
+    # провайдер при этом не вызывается. notify() будит наблюдателя сразу после коммита в этом процессе.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscriptions: list[Subscription] = []
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._sequence = itertools.count(1)
+        self._index_state: dict[str, tuple] = {}
+        self._job_state: dict[str, tuple] = {}
+        self._watermark: datetime | None = None
+
+    def subscribe(self, domain_id: str, index_id: str | None) -> Subscription:
+        subscription = Subscription(domain_id=domain_id, index_id=index_id, loop=asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.append(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="index-events-watcher", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+        self._wakeup.set()
+
+    def subscribers_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        interval = max(0.05, get_config().index_events_poll_ms / 1000)
+        session_local = get_session_maker()
+        while True:
+            with self._lock:
+                subscriptions = list(self._subscriptions)
+                if not subscriptions:
+                    # Последний подписчик ушёл: состояние сбрасываем, следующий subscribe запустит поток заново
+                    self._thread = None
+                    self._index_state.clear()
+                    self._job_state.clear()
+                    self._watermark = None
+                    return
+
+            db = session_local()
+            try:
+                self._scan(db, subscriptions)
+            except Exception:
+                logger.exception("Наблюдатель событий индексов: ошибка чтения БД")
+            finally:
+                db.close()
+
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+
+    def _scan(self, db, subscriptions: list[Subscription]) -> None:
+        index_ids = {s.index_id for s in subscriptions if s.index_id is not None}
+        domain_ids = {s.domain_id for s in subscriptions if s.index_id is None}
+        started = datetime.utcnow()
+        watermark = self._watermark
+
+        scope_conditions = []
+        if index_ids:
+            scope_conditions.append(RagIndex.id.in_(index_ids))
+        if domain_ids:
+            scope_conditions.append(RagIndex.domain_id.in_(domain_ids))
+        q = db.query(RagIndex).filter(or_(*scope_conditions))
+        if watermark is not None:
+            q = q.filter(RagIndex.updated_at >= watermark - _WATERMARK_MARGIN)
+
+        events: list[tuple[str | None, str | None, str, dict]] = []
+        for rag_index in q.all():
+            snapshot = index_snapshot(rag_index)
+            state = (snapshot["indexing_status"], snapshot["indexed_at"], repr(snapshot["file_counts"]))
+            prev = self._index_state.get(rag_index.id)
+            self._index_state[rag_index.id] = state
+            if watermark is None:
+                continue
+            if prev is None:
+                # Индекс попал в выборку впервые (новая подписка или новый индекс домена) и недавно менялся
+                events.append((rag_index.domain_id, rag_index.id, EVENT_INDEX_STATUS, snapshot))
+                continue
+            if prev[:2] != state[:2]:
+                events.append((rag_index.domain_id, rag_index.id, EVENT_INDEX_STATUS, snapshot))
+            if prev[2] != state[2]:
+                events.append((rag_index.domain_id, rag_index.id, EVENT_INDEX_FILES, snapshot))
+
+        job_scope = []
+        if index_ids:
+            job_scope.append(RagJob.index_id.in_(index_ids))
+        if domain_ids:
+            job_scope.append(RagJob.domain_id.in_(domain_ids))
+        jq = db.query(RagJob).filter(or_(*job_scope))
+        if watermark is None:
+            jq = jq.filter(RagJob.status.in_(ACTIVE_JOB_STATUSES))
+        else:
+            jq = jq.filter(RagJob.updated_at >= watermark - _WATERMARK_MARGIN)
+
+        for job in jq.all():
+            snapshot = job_snapshot(job)
+            state = (job.status, repr(snapshot["progress"]), job.attempts)
+            prev = self._job_state.get(job.id)
+            self._job_state[job.id] = state
+            if watermark is None or prev == state:
+                continue
+            events.append((job.domain_id, job.index_id, EVENT_JOB, snapshot))
+            if job.status not in ACTIVE_JOB_STATUSES:
+                self._job_state.pop(job.id, None)
+
+        self._watermark = started
+        for domain_id, index_id, event, data in events:
+            self._dispatch(domain_id, index_id, event, data, subscriptions)
+
+    def _dispatch(
+        self,
+        domain_id: str | None,
+        index_id: str | None,
+        event: str,
+        data: dict,
+        subscriptions: list[Subscription],
+    ) -> None:
+        item = (next(self._sequence), event, data)
+        for subscription in subscriptions:
+            if subscription.matches(domain_id, index_id):
+                subscription.deliver(item)
+
+
+_watcher = IndexEventsWatcher()
+
+
+def get_index_events_watcher() -> IndexEventsWatcher:
+    return _watcher
+
+
+def notify_index_events() -> None:
+    _watcher.notify()
+
+
+callback_gauge("sse_subscribers", "Открытые SSE-подписки на события индексов", (), lambda: [((), _watcher.subscribers_count())])
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
 from models.rag_file import RagFile
@@ -9,6 +12,7 @@ from models.rag_provider_file_upload import RagProviderFileUpload
 from services.providers_connections_service import ProvidersConnectionsService
 
 _DEFAULT_LIST_LIMIT = 1000
+_STREAM_BATCH_SIZE = 500
 
 
 class IndexFilesProviderStatusService:
@@ -17,6 +21,11 @@ class IndexFilesProviderStatusService:
         self._domain_id = domain_id
 
     def list_provider_files(self, *, index_id: str) -> dict:
+        result, items = self.stream_provider_files(index_id=index_id)
+        result["items"] = list(items)
+        return result
+
+    def stream_provider_files(self, *, index_id: str) -> tuple[dict, Iterator[dict]]:
         rag_index = (
             self._db.query(RagIndex)
             .filter(RagIndex.domain_id == self._domain_id)
@@ -26,29 +35,6 @@ class IndexFilesProviderStatusService:
         if rag_index is None:
             raise ValueError("Индекс не найден")
 
-        rows = (
-            self._db.query(RagIndexFile.include_order, RagFile)
-            .join(RagFile, RagFile.id == RagIndexFile.file_id)
-            .filter(RagIndexFile.index_id == index_id)
-            .filter(RagFile.domain_id == self._domain_id)
-            .order_by(RagIndexFile.include_order.asc())
-            .all()
-        )
-
-        local_files = [rag_file for _, rag_file in rows]
-        local_file_ids = [f.id for f in local_files]
-
-        uploads: list[RagProviderFileUpload] = []
-        if local_file_ids:
-            uploads = (
-                self._db.query(RagProviderFileUpload)
-                .filter(RagProviderFileUpload.provider_id == rag_index.provider_type)
-                .filter(RagProviderFileUpload.local_file_id.in_(local_file_ids))
-                .all()
-            )
-
-        upload_by_local_file_id: dict[str, RagProviderFileUpload] = {u.local_file_id: u for u in uploads}
-
         provider_vector_store_files_by_external_file_id: dict[str, dict] = {}
         errors: list[str] = []
 
@@ -69,37 +55,81 @@ class IndexFilesProviderStatusService:
             except Exception as e:
                 errors.append(f"Ошибка получения списка файлов у провайдера: {e}")
 
-        result_items: list[dict] = []
-        for include_order, rag_file in rows:
-            upload = upload_by_local_file_id.get(rag_file.id)
-            provider_upload = None
-            provider_vector_store_file = None
-
-            if upload is not None:
-                provider_upload = {
-                    "status": upload.status,
-                    "last_error": upload.last_error,
-                    "external_file_id": upload.external_file_id,
-                }
+        result = {
+            "provider_type": rag_index.provider_type,
+            "vector_store_id": vector_store_id,
+            "items": [],
+            "errors": errors,
+        }
+        items = self._iter_items(
+            index_id=index_id,
+            provider_type=rag_index.provider_type,
+            provider_vector_store_files_by_external_file_id=provider_vector_store_files_by_external_file_id,
+        )
+        return result, items
+
+    def _iter_items(
+        self,
+        *,
+        index_id: str,
+        provider_type: str,
+        provider_vector_store_files_by_external_file_id: dict[str, dict],
+    ) -> Iterator[dict]:
+        # Читаем связи пачками по ключу (include_order, file_id): между пачками
+        # выполняется запрос загрузок, поэтому серверный курсор (yield_per) здесь не подходит
+        last_key: tuple[int, str] | None = None
+        while True:
+            q = (
+                self._db.query(RagIndexFile.include_order, RagFile)
+                .join(RagFile, RagFile.id == RagIndexFile.file_id)
+                .filter(RagIndexFile.index_id == index_id)
+                .filter(RagFile.domain_id == self._domain_id)
+            )
+            if last_key is not None:
+                q = q.filter(
+                    or_(
+                        RagIndexFile.include_order > last_key[0],
+                        and_(RagIndexFile.include_order == last_key[0], RagIndexFile.file_id > last_key[1]),
+                    )
+                )
+            batch = (
+                q.order_by(RagIndexFile.include_order.asc(), RagIndexFile.file_id.asc())
+                .limit(_STREAM_BATCH_SIZE)
+                .all()
+            )
+            if not batch:
+                break
+            last_key = (batch[-1][0], batch[-1][1].id)
+
+            uploads = (
+                self._db.query(RagProviderFileUpload)
+                .filter(RagProviderFileUpload.provider_id == provider_type)
+                .filter(RagProviderFileUpload.local_file_id.in_([rag_file.id for _, rag_file in batch]))
+                .all()
+            )
+            upload_by_local_file_id: dict[str, RagProviderFileUpload] = {u.local_file_id: u for u in uploads}
 
-                if upload.external_file_id:
-                    provider_vector_store_file = provider_vector_store_files_by_external_file_id.get(upload.external_file_id)
+            for include_order, rag_file in batch:
+                upload = upload_by_local_file_id.get(rag_file.id)
+                provider_upload = None
+                provider_vector_store_file = None
 
-            result_items.append(
-                {
+                if upload is not None:
+                    provider_upload = {
+                        "status": upload.status,
+                        "last_error": upload.last_error,
+                        "external_file_id": upload.external_file_id,
+                    }
+
+                    if upload.external_file_id:
+                        provider_vector_store_file = provider_vector_store_files_by_external_file_id.get(upload.external_file_id)
+
+                yield {
                     "include_order": include_order,
                     "file": rag_file,
                     "provider_upload": provider_upload,
                     "provider_vector_store_file": provider_vector_store_file,
                 }
-            )
-
-        return {
-            "provider_type": rag_index.provider_type,
-            "vector_store_id": vector_store_id,
-            "items": result_items,
-            "errors": errors,
-        }
 
     def _extract_provider_file_id(self, item: dict) -> str | None:
         file_id = item.get("file_id")
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from models.rag_file import RagFile
 from models.rag_index import RagIndex
 from models.rag_index_file import RagIndexFile
+from services.index_membership_service import IndexMembershipService
 from services.providers_connections_service import ProvidersConnectionsService
 from services.provider_file_uploads_service import ProviderFileUploadsService
 
 _INCLUDE_ORDER_START = 1
+_STREAM_BATCH_SIZE = 500
 
 
 class IndexFilesService:
@@ -101,6 +105,7 @@ class IndexFilesService:
             chunking_strategy=final_chunking_strategy,
         )
         self._db.add(link)
+        IndexMembershipService(self._db).refresh_file_ids([index_id])
         self._db.commit()
 
     def detach_file(self, index_id: str, file_id: str) -> bool:
@@ -118,6 +123,7 @@ class IndexFilesService:
             return False
 
         self._db.delete(link)
+        IndexMembershipService(self._db).refresh_file_ids([index_id])
         self._db.commit()
         return True
 
@@ -126,6 +132,16 @@ class IndexFilesService:
         if rag_index is None:
             return None
 
+        return list(self._iter_index_files(index_id))
+
+    def iter_files(self, index_id: str) -> Iterator[tuple[int, RagFile]] | None:
+        rag_index = self._get_index(index_id)
+        if rag_index is None:
+            return None
+
+        return self._iter_index_files(index_id)
+
+    def _iter_index_files(self, index_id: str) -> Iterator[tuple[int, RagFile]]:
         rows = (
             self._db.query(RagIndexFile.include_order, RagFile.id, RagFile.domain_id, RagFile.file_name, 
                           RagFile.file_type, RagFile.local_path, RagFile.size_bytes, RagFile.tags, 
@@ -135,10 +151,9 @@ class IndexFilesService:
             .filter(RagIndexFile.index_id == index_id)
             .filter(RagFile.domain_id == self._domain_id)
             .order_by(RagIndexFile.include_order.asc())
-            .all()
+            .yield_per(_STREAM_BATCH_SIZE)
         )
 
-        result = []
         for include_order, file_id, domain_id, file_name, file_type, local_path, size_bytes, tags, notes, created_at, updated_at, external_id, chunking_strategy in rows:
             rag_file = RagFile(
                 id=file_id,
@@ -157,6 +172,4 @@ class IndexFilesService:
                 rag_file.external_id = external_id
             if chunking_strategy:
                 rag_file.chunking_strategy = chunking_strategy
-            result.append((include_order, rag_file))
-        
-        return result
+            yield include_order, rag_file
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from sqlalchemy.orm import Session
+
+from models.rag_file import RagFile
+from models.rag_index import RagIndex
+from models.rag_index_file import RagIndexFile
+
+_INCLUDE_ORDER_START = 1
+
+
+class IndexMembershipService:
+    # Единственный источник правды о составе индекса — rag_index_files.
+    # rag_indexes.file_ids — производное поле, пересчитывается только для затронутых индексов.
+    # Методы не коммитят: транзакцией управляет вызывающий сервис.
+
+    def __init__(self, db: Session) -> None:
+        self._db = db
+
+    def index_ids_for_file(self, file_id: str, *, domain_id: str | None = None) -> list[str]:
+        q = self._db.query(RagIndexFile.index_id).filter(RagIndexFile.file_id == file_id)
+        if domain_id is not None:
+            q = q.join(RagIndex, RagIndex.id == RagIndexFile.index_id).filter(RagIndex.domain_id == domain_id)
+
+        return [row[0] for row in q.all()]
+
+    def remove_file(self, file_id: str, *, domain_id: str | None = None) -> tuple[int, int]:
+        index_ids = self.index_ids_for_file(file_id, domain_id=domain_id)
+        if not index_ids:
+            return 0, 0
+
+        deleted = (
+            self._db.query(RagIndexFile)
+            .filter(RagIndexFile.file_id == file_id)
+            .filter(RagIndexFile.index_id.in_(index_ids))
+            .delete(synchronize_session=False)
+        )
+        updated = self.refresh_file_ids(index_ids)
+        return int(deleted or 0), updated
+
+    def replace_files(self, index_id: str, file_ids: list[str], *, domain_id: str) -> None:
+        ordered_ids = list(dict.fromkeys(file_ids))
+
+        if ordered_ids:
+            known_ids = {
+                row[0]
+                for row in self._db.query(RagFile.id)
+                .filter(RagFile.domain_id == domain_id)
+                .filter(RagFile.id.in_(ordered_ids))
+                .all()
+            }
+            missing = [file_id for file_id in ordered_ids if file_id not in known_ids]
+            if missing:
+                raise ValueError(f"Файлы не найдены: {', '.join(missing)}")
+
+        links = {
+            link.file_id: link
+            for link in self._db.query(RagIndexFile).filter(RagIndexFile.index_id == index_id).all()
+        }
+
+        for file_id, link in links.items():
+            if file_id not in ordered_ids:
+                self._db.delete(link)
+
+        for order, file_id in enumerate(ordered_ids, start=_INCLUDE_ORDER_START):
+            link = links.get(file_id)
+            if link is None:
+                self._db.add(RagIndexFile(index_id=index_id, file_id=file_id, include_order=order))
+            elif link.include_order != order:
+                link.include_order = order
+
+        self.refresh_file_ids([index_id])
+
+    def refresh_file_ids(self, index_ids: Iterable[str]) -> int:
+        ids = sorted(set(index_ids))
+        if not ids:
+            return 0
+
+        # autoflush отключён — изменения связей должны попасть в БД до пересчёта
+        self._db.flush()
+
+        file_ids_by_index_id: dict[str, list[str]] = {index_id: [] for index_id in ids}
+        rows = (
+            self._db.query(RagIndexFile.index_id, RagIndexFile.file_id)
+            .filter(RagIndexFile.index_id.in_(ids))
+            .order_by(RagIndexFile.index_id, RagIndexFile.include_order, RagIndexFile.file_id)
+            .all()
+        )
+        for index_id, file_id in rows:
+            file_ids_by_index_id[index_id].append(file_id)
+
+        updated = 0
+        for rag_index in self._db.query(RagIndex).filter(RagIndex.id.in_(ids)).all():
+            file_ids = file_ids_by_index_id.get(rag_index.id, [])
+            if rag_index.file_ids != file_ids:
+                rag_index.file_ids = file_ids
+                updated += 1
+
+        return updated
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Callable
 import hashlib
 import logging
 from models.rag_index_file import RagIndexFile
@@ -8,9 +9,13 @@ from pathlib import Path
 from sqlalchemy.orm import Session
 
 from services.index_files_service import IndexFilesService
+from services.index_status_poller import schedule_status_poll
 from services.indexes_service import IndexesService
 from services.provider_file_uploads_service import ProviderFileUploadsService
 from services.providers_connections_service import ProvidersConnectionsService
+from utils.logger import log_payload
+from utils.metrics import count_items, timed_operation
+from utils.tracing import set_span_attributes, traced
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +28,8 @@ class IndexPublishService:
         self._db = db
         self._domain_id = domain_id
 
+    @timed_operation("publish")
+    @traced("publish")
     def publish(
         self,
         *,
@@ -30,29 +37,31 @@ class IndexPublishService:
         force_upload: bool = False,
         detach_extra: bool = True,
         dry_run: bool = False,
+        on_progress: Callable[..., None] | None = None,
     ) -> dict:
-        logger.info(f"Starting publish for index_id={index_id}, force_upload={force_upload}, detach_extra={detach_extra}, dry_run={dry_run}")
+        logger.info("Starting publish for index_id=%s, force_upload=%s, detach_extra=%s, dry_run=%s", index_id, force_upload, detach_extra, dry_run)
         
         indexes_service = IndexesService(db=self._db, domain_id=self._domain_id)
         rag_index = indexes_service.get_index(index_id)
         if rag_index is None:
             raise ValueError("Индекс не найден")
 
-        logger.info(f"Found index: {rag_index.id}, provider_type: {rag_index.provider_type}, external_id: {rag_index.external_id}")
+        logger.info("Found index: %s, provider_type: %s, external_id: %s", rag_index.id, rag_index.provider_type, rag_index.external_id)
+        set_span_attributes(index_id=rag_index.id, provider_type=rag_index.provider_type, dry_run=bool(dry_run))
 
         provider_type = rag_index.provider_type
         provider = ProvidersConnectionsService(db=self._db).get_provider(provider_type)
 
-        logger.info(f"Got provider: {type(provider).__name__}")
+        logger.info("Got provider: %s", type(provider).__name__)
 
         errors: list[str] = []
 
         had_external_id = bool(rag_index.external_id)
-        logger.info(f"had_external_id: {had_external_id}")
+        logger.info("had_external_id: %s", had_external_id)
 
         created_vector_store = False
         will_create_vector_store = (not had_external_id)
-        logger.info(f"will_create_vector_store: {will_create_vector_store}")
+        logger.info("will_create_vector_store: %s", will_create_vector_store)
 
         if not rag_index.external_id:
             logger.info("Creating new vector store...")
@@ -68,7 +77,7 @@ class IndexPublishService:
                     file_ids=None,
                     metadata=provider_metadata,
                 )
-                logger.info(f"Vector store created: {created}")
+                logger.info("Vector store created: %s", log_payload(created, sample=False))
                 vector_store_id = created.get("id")
                 if not vector_store_id:
                     raise ValueError("Провайдер не вернул id vector_store")
@@ -78,14 +87,14 @@ class IndexPublishService:
                 self._db.refresh(rag_index)
                 created_vector_store = True
         else:
-            logger.info(f"Using existing vector store: {rag_index.external_id}")
+            logger.info("Using existing vector store: %s", rag_index.external_id)
             vector_store_id = str(rag_index.external_id)
 
         logger.info("Getting index files service...")
         index_files_service = IndexFilesService(db=self._db, domain_id=self._domain_id)
         logger.info("Calling list_files...")
         rows = index_files_service.list_files(index_id=index_id)
-        logger.info(f"Got {len(rows) if rows else 0} files from list_files")
+        logger.info("Got %s files from list_files", len(rows) if rows else 0)
         if rows is None:
             raise ValueError("Индекс не найден")
 
@@ -98,28 +107,28 @@ class IndexPublishService:
         missing_upload_local_file_ids: list[str] = []
         upload_by_local_file_id: dict[str, object] = {}
 
-        logger.info(f"Processing files (dry_run={dry_run})...")
+        logger.info("Processing files (dry_run=%s)...", dry_run)
         if dry_run:
             logger.info("Processing files in dry_run mode...")
             for i, (_, rag_file) in enumerate(rows):
-                logger.info(f"Processing file {i+1}/{len(rows)}: {rag_file.id}")
+                logger.info("Processing file %s/%s: %s", i+1, len(rows), rag_file.id)
                 upload = self._get_existing_upload(
                     provider_type=provider_type,
                     local_file_id=rag_file.id,
                 )
                 if upload is None:
-                    logger.info(f"Upload not found for file {rag_file.id}")
+                    logger.info("Upload not found for file %s", rag_file.id)
                     missing_upload_local_file_ids.append(rag_file.id)
                     continue
 
                 if force_upload:
-                    logger.info(f"Force upload enabled for file {rag_file.id}")
+                    logger.info("Force upload enabled for file %s", rag_file.id)
                     missing_upload_local_file_ids.append(rag_file.id)
                     continue
 
                 sha256 = self._calc_sha256(Path(rag_file.local_path))
                 if upload.content_sha256 != sha256:
-                    logger.info(f"SHA256 mismatch for file {rag_file.id}")
+                    logger.info("SHA256 mismatch for file %s", rag_file.id)
                     missing_upload_local_file_ids.append(rag_file.id)
                     continue
 
@@ -130,7 +139,7 @@ class IndexPublishService:
         else:
             logger.info("Processing files in normal mode...")
             for i, (_, rag_file) in enumerate(rows):
-                logger.info(f"Processing file {i+1}/{len(rows)}: {rag_file.id}")
+                logger.info("Processing file %s/%s: %s", i+1, len(rows), rag_file.id)
                 upload = uploads_service.get_or_sync(
                     provider_type=provider_type,
                     local_file_id=rag_file.id,
@@ -141,6 +150,8 @@ class IndexPublishService:
                 upload_by_local_file_id[str(getattr(upload, "local_file_id", ""))] = upload
                 if upload.external_file_id:
                     desired_provider_file_ids.add(str(upload.external_file_id))
+                if on_progress is not None:
+                    on_progress(stage="upload", files_done=i + 1, files_total=len(rows))
 
         provider_vs_files: list[dict] = []
         if vector_store_id:
@@ -152,31 +163,31 @@ class IndexPublishService:
         existing_provider_file_ids: set[str] = set()
         vector_store_file_id_by_provider_file_id: dict[str, str] = {}
 
-        logger.info(f"Processing {len(provider_vs_files or [])} files from vector store {vector_store_id}")
+        logger.info("Processing %s files from vector store %s", len(provider_vs_files or []), vector_store_id)
         for i, item in enumerate(provider_vs_files or []):
-            logger.info(f"Processing vector store file {i+1}: {item}")
+            logger.info("Processing vector store file %s: %s", i+1, log_payload(item))
             if not isinstance(item, dict):
-                logger.warning(f"Skipping non-dict item: {item}")
+                logger.warning("Skipping non-dict item: %s", log_payload(item, sample=False))
                 continue
 
             vector_store_file_id = item.get("id")
             provider_file_id = self._extract_external_file_id(item)
-            logger.info(f"Extracted IDs: vector_store_file_id={vector_store_file_id}, provider_file_id={provider_file_id}")
+            logger.info("Extracted IDs: vector_store_file_id=%s, provider_file_id=%s", vector_store_file_id, provider_file_id)
 
             if (not provider_file_id) and vector_store_file_id:
                 # Fallback: используем vector_store_file_id как provider_file_id
                 provider_file_id = vector_store_file_id
-                logger.info(f"Using vector_store_file_id as provider_file_id fallback: {provider_file_id}")
+                logger.info("Using vector_store_file_id as provider_file_id fallback: %s", provider_file_id)
 
             if not provider_file_id:
-                logger.warning(f"No provider_file_id found for item: {item}")
+                logger.warning("No provider_file_id found for item: %s", log_payload(item, sample=False))
                 continue
 
             provider_file_id = str(provider_file_id)
             existing_provider_file_ids.add(provider_file_id)
             if vector_store_file_id:
                 vector_store_file_id_by_provider_file_id[provider_file_id] = str(vector_store_file_id)
-            logger.info(f"Added to existing_provider_file_ids: {provider_file_id}")
+            logger.info("Added to existing_provider_file_ids: %s", provider_file_id)
         chunking_by_provider_file_id: dict[str, dict] = {}
         
         # Получаем rag_index_files для доступа к chunking_strategy и external_id
@@ -206,11 +217,11 @@ class IndexPublishService:
             extra_provider_file_ids = existing_provider_file_ids - desired_provider_file_ids
 
         logger.info("File IDs analysis:")
-        logger.info(f"  desired_provider_file_ids: {sorted(desired_provider_file_ids)}")
-        logger.info(f"  existing_provider_file_ids: {sorted(existing_provider_file_ids)}")
-        logger.info(f"  missing_provider_file_ids: {sorted(missing_provider_file_ids)}")
-        logger.info(f"  extra_provider_file_ids: {sorted(extra_provider_file_ids)}")
-        logger.info(f"  detach_extra: {detach_extra}")
+        logger.info("  desired_provider_file_ids: %s", sorted(desired_provider_file_ids))
+        logger.info("  existing_provider_file_ids: %s", sorted(existing_provider_file_ids))
+        logger.info("  missing_provider_file_ids: %s", sorted(missing_provider_file_ids))
+        logger.info("  extra_provider_file_ids: %s", sorted(extra_provider_file_ids))
+        logger.info("  detach_extra: %s", detach_extra)
 
         desired_provider_file_ids_list = sorted(desired_provider_file_ids)
         existing_provider_file_ids_list = sorted(existing_provider_file_ids)
@@ -221,6 +232,12 @@ class IndexPublishService:
         attach_results: list[dict] = []
         if (not dry_run) and missing_provider_file_ids:
             for provider_file_id in sorted(missing_provider_file_ids):
+                if on_progress is not None:
+                    on_progress(
+                        stage="attach",
+                        attach_done=attached_count,
+                        attach_total=len(missing_provider_file_ids),
+                    )
                 try:
                     created = provider.attach_file_to_vector_store(
                         str(vector_store_id),
@@ -232,54 +249,74 @@ class IndexPublishService:
                     attached_count += 1
                 except Exception as e:
                     errors.append(f"Не удалось прикрепить файл provider_file_id={provider_file_id}: {e}")
+            if on_progress is not None:
+                on_progress(stage="attach", attach_done=attached_count, attach_total=len(missing_provider_file_ids))
 
         # Проверяем состояние vector store после прикрепления файлов
         if not dry_run and attached_count > 0:
-            logger.info(f"Checking vector store payload after attaching {attached_count} files...")
+            logger.info("Checking vector store payload after attaching %s files...", attached_count)
             try:
                 vector_store_payload = provider.retrieve_vector_store(str(vector_store_id))
-                logger.info(f"Vector store payload after attach: {vector_store_payload}")
+                logger.info("Vector store payload after attach: %s", log_payload(vector_store_payload, sample=False))
                 
                 # Также проверяем список файлов
                 files_list = provider.list_vector_store_files(str(vector_store_id), limit=1000)
                 if isinstance(files_list, list):
-                    logger.info(f"Files in vector store after attach: {len(files_list)} files")
+                    logger.info("Files in vector store after attach: %s files", len(files_list))
                     for i, file_info in enumerate(files_list):
                         if isinstance(file_info, dict):
                             file_id = file_info.get('id', 'unknown')
                             file_status = file_info.get('status', 'unknown')
-                            logger.info(f"  File {i+1}/{len(files_list)}: id={file_id}, status={file_status}")
+                            logger.info("  File %s/%s: id=%s, status=%s", i+1, len(files_list), file_id, file_status)
                 else:
-                    logger.warning(f"Unexpected files list response: {type(files_list)}")
+                    logger.warning("Unexpected files list response: %s", type(files_list))
             except Exception as e:
-                logger.error(f"Error checking vector store after attach: {e}")
+                logger.error("Error checking vector store after attach: %s", e)
 
         batch_payload: dict | None = None
 
         detached_count = 0
         if (not dry_run) and detach_extra:
-            logger.info(f"Starting detach process for {len(extra_provider_file_ids)} extra files")
+            logger.info("Starting detach process for %s extra files", len(extra_provider_file_ids))
             for provider_file_id in sorted(extra_provider_file_ids):
-                logger.info(f"Processing extra file: {provider_file_id}")
+                if on_progress is not None:
+                    on_progress(stage="detach", detach_done=detached_count, detach_total=len(extra_provider_file_ids))
+                logger.info("Processing extra file: %s", provider_file_id)
                 vector_store_file_id = vector_store_file_id_by_provider_file_id.get(provider_file_id)
-                logger.info(f"vector_store_file_id for {provider_file_id}: {vector_store_file_id}")
+                logger.info("vector_store_file_id for %s: %s", provider_file_id, vector_store_file_id)
                 if not vector_store_file_id:
-                    logger.warning(f"No vector_store_file_id found for provider_file_id={provider_file_id}")
+                    logger.warning("No vector_store_file_id found for provider_file_id=%s", provider_file_id)
                     continue
 
                 try:
-                    logger.info(f"Detaching file {provider_file_id} (vector_store_file_id: {vector_store_file_id}) from vector store {vector_store_id}")
+                    logger.info("Detaching file %s (vector_store_file_id: %s) from vector store %s", provider_file_id, vector_store_file_id, vector_store_id)
                     provider.detach_file_from_vector_store(str(vector_store_id), vector_store_file_id)
                     detached_count += 1
-                    logger.info(f"Successfully detached file {provider_file_id}")
+                    logger.info("Successfully detached file %s", provider_file_id)
                 except Exception as e:
-                    logger.error(f"Failed to detach file {provider_file_id}: {e}")
+                    logger.error("Failed to detach file %s: %s", provider_file_id, e)
                     errors.append(
                         f"Не удалось открепить файл provider_file_id={provider_file_id} vector_store_file_id={vector_store_file_id}: {e}"
                     )
-            logger.info(f"Detach process completed. Detached {detached_count} files")
+            if on_progress is not None:
+                on_progress(stage="detach", detach_done=detached_count, detach_total=len(extra_provider_file_ids))
+            logger.info("Detach process completed. Detached %s files", detached_count)
         else:
-            logger.info(f"Skipping detach process. dry_run={dry_run}, detach_extra={detach_extra}")
+            logger.info("Skipping detach process. dry_run=%s, detach_extra=%s", dry_run, detach_extra)
+
+        if (not dry_run) and attached_count > 0:
+            # Провайдер индексирует прикреплённые файлы асинхронно: до опроса статуса индекс — in_progress
+            rag_index.indexing_status = "in_progress"
+            schedule_status_poll(rag_index)
+            self._db.commit()
+
+        count_items(
+            "publish",
+            attached=attached_count,
+            detached=detached_count,
+            missing_uploads=len(set(missing_upload_local_file_ids)),
+            errors=len(errors),
+        )
 
         return {
             "rag_index": rag_index,
@@ -322,6 +359,7 @@ class IndexPublishService:
             .one_or_none()
         )
 
+    @traced("file.sha256")
     def _calc_sha256(self, path: Path) -> str:
         if not path.exists() or not path.is_file():
             raise ValueError("Файл отсутствует на диске")
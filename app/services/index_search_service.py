@@ -4,6 +4,8 @@ from sqlalchemy.orm import Session
 
 from models.rag_index import RagIndex
 from services.providers_connections_service import ProvidersConnectionsService
+from utils.metrics import timed_operation
+from utils.tracing import set_span_attributes, traced
 
 
 class IndexSearchService:
@@ -11,6 +13,8 @@ class IndexSearchService:
         self._db = db
         self._domain_id = domain_id
 
+    @timed_operation("search")
+    @traced("search")
     def search(
         self,
         *,
@@ -33,6 +37,8 @@ class IndexSearchService:
         if not rag_index.external_id:
             raise ValueError("У индекса нет external_id")
 
+        set_span_attributes(index_id=rag_index.id, provider_type=rag_index.provider_type)
+
         provider = ProvidersConnectionsService(db=self._db).get_provider(rag_index.provider_type)
         items = provider.search_vector_store(
             str(rag_index.external_id),
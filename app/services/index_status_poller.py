@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime, timedelta
+import logging
+import random
+import threading
+import time
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from config import get_config
+from database import get_session_maker
+from models.rag_index import RagIndex
+from providers.limiter import PRIORITY_BACKGROUND, limiter_nodes, provider_priority
+from services.index_events import notify_index_events
+from services.indexes_sync_service import IndexesSyncService
+from utils.metrics import count_items
+
+logger = logging.getLogger(__name__)
+
+# Статусы, которые ещё могут измениться у провайдера; completed/failed не опрашиваются
+POLLED_STATUSES = ("in_progress", "not_indexed")
+_TERMINAL_FILE_STATUSES = frozenset({"completed", "failed"})
+
+# Один опрос индекса — retrieve_vector_store + list_vector_store_files
+_PROVIDER_CALLS_PER_POLL = 2
+_BATCH_SIZE = 50
+_JITTER = 0.2
+
+
+class ProviderBudget:
+    # Токен-бакет на тип провайдера: budget_per_minute вызовов в минуту на все процессы.
+    # Опрос запущен в каждом воркере API и jobs_worker.py, поэтому бюджет делится на число живых узлов
+    # из rag_limiter_nodes (как лимиты ProviderGovernor); без координации через БД — бюджет на процесс.
+    def __init__(
+        self,
+        budget_per_minute: int,
+        clock: Callable[[], float] = time.monotonic,
+        nodes: Callable[[], int] = limiter_nodes,
+    ) -> None:
+        self._budget = float(max(1, budget_per_minute))
+        self._clock = clock
+        self._nodes = nodes
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def try_acquire(self, provider_type: str, cost: int) -> bool:
+        share = self._budget / max(1, self._nodes())
+        # Ёмкость не меньше стоимости одного опроса, иначе при многих узлах опрос не прошёл бы никогда
+        capacity = max(float(cost), share)
+        rate = share / 60.0
+        now = self._clock()
+        tokens, updated = self._buckets.get(provider_type, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens < cost:
+            self._buckets[provider_type] = (tokens, now)
+            return False
+        self._buckets[provider_type] = (tokens - cost, now)
+        return True
+
+
+def schedule_status_poll(rag_index: RagIndex, *, now: datetime | None = None) -> None:
+    # Опросить как можно скорее с минимальным интервалом (после публикации, смены статуса и т.п.);
+    # коммит — на стороне вызывающего
+    rag_index.status_poll_after = now or datetime.utcnow()
+    rag_index.status_poll_attempts = 0
+
+
+class IndexStatusPoller:
+    # Периодически синхронизирует статус индексов в POLLED_STATUSES:
+    # - интервал на индекс растёт экспоненциально (min·2^n, не больше max, ±20%), пока статус не меняется,
+    #   и сбрасывается на min при любом изменении;
+    # - вызовы ограничены бюджетом на тип провайдера (ProviderBudget);
+    # - опрос прекращается, как только все файлы vector store в конечном статусе.
+    # Захват индекса — условный UPDATE status_poll_after, поэтому несколько процессов не опрашивают один индекс.
+
+    def __init__(self, *, budget: ProviderBudget | None = None) -> None:
+        config = get_config()
+        self._min_interval = max(1, config.status_poll_min_interval_seconds)
+        self._max_interval = max(self._min_interval, config.status_poll_max_interval_seconds)
+        self._budget = budget or ProviderBudget(config.status_poller_provider_budget_per_minute)
+
+    def next_delay(self, attempts: int) -> float:
+        delay = min(self._max_interval, self._min_interval * (2 ** max(0, attempts)))
+        return delay * random.uniform(1 - _JITTER, 1 + _JITTER)
+
+    def run_once(self, db: Session, *, now: datetime | None = None) -> dict:
+        now = now or datetime.utcnow()
+        stats = {"polled": 0, "stopped": 0, "skipped_budget": 0, "errors": 0}
+
+        candidates = (
+            db.query(RagIndex.id, RagIndex.provider_type, RagIndex.status_poll_after)
+            .filter(RagIndex.external_id.isnot(None))
+            .filter(RagIndex.indexing_status.in_(POLLED_STATUSES))
+            .filter(or_(RagIndex.status_poll_after.is_(None), RagIndex.status_poll_after <= now))
+            .order_by(RagIndex.status_poll_after.asc())
+            .limit(_BATCH_SIZE)
+            .all()
+        )
+
+        exhausted: set[str] = set()
+        for index_id, provider_type, poll_after in candidates:
+            if provider_type in exhausted:
+                stats["skipped_budget"] += 1
+                continue
+            if not self._budget.try_acquire(provider_type, _PROVIDER_CALLS_PER_POLL):
+                exhausted.add(provider_type)
+                stats["skipped_budget"] += 1
+                continue
+
+            if not self._claim(db, index_id, poll_after, now=now):
+                continue
+
+            outcome = self._poll(db, index_id, now=now)
+            stats[outcome] += 1
+
+        if stats["polled"] or stats["stopped"]:
+            # Статусы в БД обновлены — SSE-подписчики этого процесса получают их сразу, не дожидаясь тика
+            notify_index_events()
+
+        count_items("status_poll", **stats)
+        return stats
+
+    def _claim(self, db: Session, index_id: str, poll_after: datetime | None, *, now: datetime) -> bool:
+        condition = RagIndex.status_poll_after.is_(None) if poll_after is None else RagIndex.status_poll_after == poll_after
+        res = db.execute(
+            update(RagIndex)
+            .where(RagIndex.id == index_id, condition)
+            .values(status_poll_after=now + timedelta(seconds=self._max_interval))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return res.rowcount == 1
+
+    def _poll(self, db: Session, index_id: str, *, now: datetime) -> str:
+        rag_index = db.get(RagIndex, index_id)
+        if rag_index is None:
+            return "errors"
+
+        try:
+            result = IndexesSyncService(db=db, domain_id=rag_index.domain_id)._sync_rag_index(rag_index, force=False)
+        except Exception as e:
+            db.rollback()
+            logger.warning("Опрос статуса индекса %s: ошибка: %s", index_id, e)
+            self._reschedule(db, rag_index, changed=False, now=now)
+            return "errors"
+
+        report = result.get("sync_report") or {}
+        file_statuses: dict = report.get("file_statuses") or {}
+        all_terminal = bool(file_statuses) and all(s in _TERMINAL_FILE_STATUSES for s in file_statuses)
+
+        if all_terminal or rag_index.indexing_status not in POLLED_STATUSES:
+            rag_index.status_poll_after = None
+            rag_index.status_poll_attempts = 0
+            db.commit()
+            logger.info("Опрос статуса индекса %s завершён: %s", index_id, rag_index.indexing_status)
+            return "stopped"
+
+        self._reschedule(db, rag_index, changed=bool(report.get("progress_changed")), now=now)
+        return "polled"
+
+    def _reschedule(self, db: Session, rag_index: RagIndex, *, changed: bool, now: datetime) -> None:
+        attempts = 0 if changed else (rag_index.status_poll_attempts or 0) + 1
+        rag_index.status_poll_attempts = attempts
+        rag_index.status_poll_after = now + timedelta(seconds=self.next_delay(attempts))
+        db.commit()
+
+
+_poller_stop = threading.Event()
+_poller_thread: threading.Thread | None = None
+
+
+def _poller_loop(tick_seconds: float) -> None:
+    poller = IndexStatusPoller()
+    session_local = get_session_maker()
+    logger.info("Фоновый опрос статусов индексов запущен (тик %.1f с)", tick_seconds)
+    while not _poller_stop.wait(tick_seconds):
+        db = session_local()
+        try:
+            with provider_priority(PRIORITY_BACKGROUND):
+                poller.run_once(db)
+        except Exception:
+            logger.exception("Фоновый опрос статусов индексов: ошибка")
+        finally:
+            db.close()
+
+
+def start_status_poller() -> None:
+    global _poller_thread
+
+    config = get_config()
+    if not config.status_poller_enabled or _poller_thread is not None:
+        return
+
+    _poller_stop.clear()
+    _poller_thread = threading.Thread(
+        target=_poller_loop,
+        args=(max(0.1, config.status_poller_tick_ms / 1000),),
+        name="index-status-poller",
+        daemon=True,
+    )
+    _poller_thread.start()
+
+
+def stop_status_poller(timeout: float = 10.0) -> None:
+    global _poller_thread
+
+    _poller_stop.set()
+    if _poller_thread is not None:
+        _poller_thread.join(timeout)
+        _poller_thread = None
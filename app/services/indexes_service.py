@@ -6,7 +6,9 @@ from sqlalchemy.orm import Session
 
 from models.rag_index import RagIndex
 from models.rag_index_file import RagIndexFile
+from services.index_membership_service import IndexMembershipService
 from services.providers_connections_service import ProvidersConnectionsService
+from utils.cursor import after_cursor_filter
 
 
 class IndexesService:
@@ -32,21 +34,30 @@ class IndexesService:
             name=name,
             description=description,
             expires_after=expires_after,
-            file_ids=file_ids or [],
+            file_ids=[],
             metadata_=metadata,
             indexing_status="not_indexed",
         )
 
         self._db.add(rag_index)
+        try:
+            if file_ids:
+                IndexMembershipService(self._db).replace_files(index_id, file_ids, domain_id=self._domain_id)
+        except Exception:
+            self._db.rollback()
+            raise
+
         self._db.commit()
         self._db.refresh(rag_index)
         return rag_index
 
-    def list_indexes(self, skip: int = 0, limit: int = 100) -> list[RagIndex]:
+    def list_indexes(self, skip: int = 0, limit: int = 100, after: str | None = None) -> list[RagIndex]:
+        q = self._db.query(RagIndex).filter(RagIndex.domain_id == self._domain_id)
+        if after:
+            q = q.filter(after_cursor_filter(RagIndex.created_at, RagIndex.id, after))
+
         return (
-            self._db.query(RagIndex)
-            .filter(RagIndex.domain_id == self._domain_id)
-            .order_by(RagIndex.created_at.desc())
+            q.order_by(RagIndex.created_at.desc(), RagIndex.id.desc())
             .offset(skip)
             .limit(limit)
             .all()
@@ -86,12 +97,16 @@ class IndexesService:
         if expires_after is not None:
             rag_index.expires_after = expires_after
 
-        if file_ids is not None:
-            rag_index.file_ids = file_ids or []
-
         if metadata is not None:
             rag_index.metadata_ = metadata
 
+        if file_ids is not None:
+            try:
+                IndexMembershipService(self._db).replace_files(index_id, file_ids, domain_id=self._domain_id)
+            except Exception:
+                self._db.rollback()
+                raise
+
         self._db.commit()
         self._db.refresh(rag_index)
         return rag_index
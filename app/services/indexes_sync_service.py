@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Callable
 import logging
 from datetime import datetime
 
@@ -7,6 +8,9 @@ from sqlalchemy.orm import Session
 
 from models.rag_index import RagIndex
 from services.providers_connections_service import ProvidersConnectionsService
+from utils.logger import log_payload
+from utils.metrics import timed_operation
+from utils.tracing import set_span_attributes, traced
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +24,7 @@ class IndexesSyncService:
         self._domain_id = domain_id
 
     def sync_index(self, *, index_id: str, force: bool = False) -> dict:
-        logger.info(f"Starting sync for index_id={index_id}, force={force}")
+        logger.info("Starting sync for index_id=%s, force=%s", index_id, force)
         
         rag_index = (
             self._db.query(RagIndex)
@@ -31,11 +35,17 @@ class IndexesSyncService:
         if rag_index is None:
             raise ValueError("Индекс не найден")
 
-        logger.info(f"Found index: {rag_index.id}, provider_type={rag_index.provider_type}, external_id={rag_index.external_id}, current_status={rag_index.indexing_status}")
+        logger.info("Found index: %s, provider_type=%s, external_id=%s, current_status=%s", rag_index.id, rag_index.provider_type, rag_index.external_id, rag_index.indexing_status)
 
         return self._sync_rag_index(rag_index, force=force)
 
-    def sync_domain_indexes(self, *, provider_type: str | None = None, force: bool = False) -> dict:
+    def sync_domain_indexes(
+        self,
+        *,
+        provider_type: str | None = None,
+        force: bool = False,
+        on_progress: Callable[..., None] | None = None,
+    ) -> dict:
         q = self._db.query(RagIndex).filter(RagIndex.domain_id == self._domain_id)
         if provider_type is not None:
             q = q.filter(RagIndex.provider_type == provider_type)
@@ -47,7 +57,9 @@ class IndexesSyncService:
         updated: list[RagIndex] = []
         errors: list[str] = []
 
-        for rag_index in items:
+        for i, rag_index in enumerate(items):
+            if on_progress is not None:
+                on_progress(indexes_done=i, indexes_total=len(items), errors=len(errors))
             try:
                 self._sync_rag_index(rag_index, force=force)
                 updated.append(rag_index)
@@ -59,7 +71,10 @@ class IndexesSyncService:
             "errors": errors,
         }
 
+    @timed_operation("index_sync")
+    @traced("index_sync")
     def _sync_rag_index(self, rag_index: RagIndex, *, force: bool) -> dict:
+        set_span_attributes(index_id=rag_index.id, provider_type=rag_index.provider_type, force=bool(force))
         if not rag_index.external_id:
             raise ValueError("У индекса нет external_id")
 
@@ -68,14 +83,17 @@ class IndexesSyncService:
             and _SYNC_SKIP_IF_DONE
             and rag_index.indexing_status in {"completed"}
         ):
-            logger.info(f"Skipping sync for completed index {rag_index.id}")
+            logger.info("Skipping sync for completed index %s", rag_index.id)
             report = {
                 "provider_type": rag_index.provider_type,
                 "vector_store_id": str(rag_index.external_id),
                 "provider_files_count": 0,
                 "aggregated_status": rag_index.indexing_status,
+                "file_statuses": {},
                 "forced": False,
                 "skipped": True,
+                "changed": False,
+                "progress_changed": False,
             }
             return {
                 "rag_index": rag_index,
@@ -85,139 +103,106 @@ class IndexesSyncService:
         provider_type = rag_index.provider_type
         vector_store_id = str(rag_index.external_id)
         
-        logger.info(f"Syncing index {rag_index.id} with provider {provider_type}, vector_store_id={vector_store_id}")
+        logger.info("Syncing index %s with provider %s, vector_store_id=%s", rag_index.id, provider_type, vector_store_id)
         
         provider = ProvidersConnectionsService(db=self._db).get_provider(provider_type)
         vector_store_payload = provider.retrieve_vector_store(vector_store_id)
         
-        logger.info(f"Retrieved vector store payload: {vector_store_payload}")
+        logger.info("Retrieved vector store payload: %s", log_payload(vector_store_payload, sample=False))
 
         provider_files: list[dict] = []
         try:
             items = provider.list_vector_store_files(vector_store_id, limit=_DEFAULT_LIST_LIMIT)
             if isinstance(items, list):
                 provider_files = [i for i in items if isinstance(i, dict)]
-                logger.info(f"Retrieved {len(provider_files)} files from vector store {vector_store_id}")
+                logger.info("Retrieved %s files from vector store %s", len(provider_files), vector_store_id)
                 
                 # Логируем каждый файл с его статусом
                 for i, file_info in enumerate(provider_files):
                     file_id = file_info.get('id', 'unknown')
                     file_status = file_info.get('status', 'unknown')
                     file_name = file_info.get('filename', 'unknown')
-                    logger.info(f"  File {i+1}/{len(provider_files)}: id={file_id}, name={file_name}, status={file_status}")
+                    logger.info("  File %s/%s: id=%s, name=%s, status=%s", i+1, len(provider_files), file_id, file_name, file_status)
             else:
-                logger.warning(f"Unexpected response type from list_vector_store_files: {type(items)}")
+                logger.warning("Unexpected response type from list_vector_store_files: %s", type(items))
         except Exception as e:
-            logger.error(f"Error retrieving files from vector store {vector_store_id}: {e}")
+            logger.error("Error retrieving files from vector store %s: %s", vector_store_id, e)
             provider_files = []
 
         next_status = self._aggregate_status(vector_store_payload, provider_files)
-        logger.info(f"Aggregated status for index {rag_index.id}: {rag_index.indexing_status} -> {next_status}")
+        logger.info("Aggregated status for index %s: %s -> %s", rag_index.id, rag_index.indexing_status, next_status)
 
         changed = False
+        # Прогресс индексации (статус или счётчики файлов) — в отличие от прочих полей payload вроде last_active_at
+        progress_changed = False
 
         if isinstance(vector_store_payload, dict):
             current_meta = dict(rag_index.metadata_) if isinstance(rag_index.metadata_, dict) else {}
+            prev_payload = current_meta.get("provider_payload")
+            if not isinstance(prev_payload, dict) or prev_payload.get("file_counts") != vector_store_payload.get("file_counts"):
+                progress_changed = True
             if current_meta.get("provider_payload") != vector_store_payload:
                 current_meta["provider_payload"] = vector_store_payload
                 rag_index.metadata_ = current_meta
                 changed = True
-                logger.info(f"Updated provider payload for index {rag_index.id}")
+                logger.info("Updated provider payload for index %s", rag_index.id)
 
             # Устанавливаем expires_after из payload провайдера если он еще не установлен
             provider_expires_after = vector_store_payload.get("expires_after")
             if provider_expires_after is not None and rag_index.expires_after is None:
                 rag_index.expires_after = provider_expires_after
                 changed = True
-                logger.info(f"Set expires_after for index {rag_index.id}: {provider_expires_after}")
+                logger.info("Set expires_after for index %s: %s", rag_index.id, provider_expires_after)
 
         prev_status = rag_index.indexing_status
         if rag_index.indexing_status != next_status:
             rag_index.indexing_status = next_status
             changed = True
-            logger.info(f"Status changed for index {rag_index.id}: {prev_status} -> {next_status}")
+            progress_changed = True
+            logger.info("Status changed for index %s: %s -> %s", rag_index.id, prev_status, next_status)
 
         if prev_status not in {"completed"} and next_status == "completed":
             rag_index.indexed_at = datetime.utcnow()
             changed = True
-            logger.info(f"Index {rag_index.id} completed indexing at {rag_index.indexed_at}")
+            logger.info("Index %s completed indexing at %s", rag_index.id, rag_index.indexed_at)
 
-        # Обновляем file_ids на основе файлов из vector store
-        current_file_ids = rag_index.file_ids or []
-        provider_file_ids = [file.get("id") for file in provider_files if file.get("id")]
-        
-        # Получаем current external_ids из текущих local file_ids
-        current_external_ids = []
-        if current_file_ids:
-            from models.rag_index_file import RagIndexFile
-            current_rag_index_files = (
-                self._db.query(RagIndexFile)
-                .filter(RagIndexFile.index_id == rag_index.id)
-                .filter(RagIndexFile.file_id.in_(current_file_ids))
-                .all()
-            )
-            current_external_ids = [rif.external_id for rif in current_rag_index_files if rif.external_id]
-        
-        # Сравниваем external_ids, а не local file_ids
-        if set(current_external_ids) != set(provider_file_ids):
-            logger.info(f"Provider file IDs changed for index {rag_index.id}: {len(current_external_ids)} -> {len(provider_file_ids)} files")
-            logger.info(f"Current external_ids: {current_external_ids}")
-            logger.info(f"Provider external_ids: {provider_file_ids}")
-            
-            # Получаем local file_ids из rag_index_files по external_id
-            from models.rag_index_file import RagIndexFile
-            rag_index_files = (
-                self._db.query(RagIndexFile)
-                .filter(RagIndexFile.index_id == rag_index.id)
-                .filter(RagIndexFile.external_id.in_(provider_file_ids))
-                .all()
-            )
-            
-            # Создаем映射 external_id -> local file_id
-            external_to_local = {rif.external_id: rif.file_id for rif in rag_index_files}
-            
-            # Формируем список локальных file_ids в том же порядке как provider_file_ids
-            local_file_ids = []
-            for external_id in provider_file_ids:
-                local_id = external_to_local.get(external_id)
-                if local_id:
-                    local_file_ids.append(local_id)
-                else:
-                    logger.warning(f"No local file_id found for external_id={external_id}")
-            
-            logger.info(f"Updating file_ids for index {rag_index.id}: {current_file_ids} -> {local_file_ids}")
-            rag_index.file_ids = local_file_ids
-            changed = True
-            logger.info(f"Updated file_ids for index {rag_index.id}: {len(local_file_ids)} local files")
-            
-            # Логируем сопоставление файлов
-            logger.info(f"Found {len(rag_index_files)} matching rag_index_files:")
-            for rif in rag_index_files:
-                logger.info(f"  local_file_id: {rif.file_id}, external_id: {rif.external_id}")
+        # Состав индекса (file_ids) по данным провайдера не переписываем:
+        # источник правды — rag_index_files, file_ids пересчитывается при изменении связей
 
         if changed:
             self._db.commit()
             self._db.refresh(rag_index)
-            logger.info(f"Committed changes for index {rag_index.id}")
+            logger.info("Committed changes for index %s", rag_index.id)
         else:
-            logger.info(f"No changes for index {rag_index.id}")
+            logger.info("No changes for index %s", rag_index.id)
 
         report = {
             "provider_type": provider_type,
             "vector_store_id": vector_store_id,
             "provider_files_count": len(provider_files),
             "aggregated_status": next_status,
+            "file_statuses": self._count_file_statuses(provider_files),
             "forced": bool(force),
             "skipped": False,
+            "changed": changed,
+            "progress_changed": progress_changed,
         }
 
-        logger.info(f"Sync completed for index {rag_index.id}: {report}")
+        logger.info("Sync completed for index %s: %s", rag_index.id, log_payload(report, sample=False))
 
         return {
             "rag_index": rag_index,
             "sync_report": report,
         }
 
+    def _count_file_statuses(self, provider_files: list[dict]) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for item in provider_files:
+            status = item.get("status")
+            key = self._normalize_status(status) if isinstance(status, str) and status else "unknown"
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
     def _aggregate_status(self, vector_store_payload: object, provider_files: list[dict]) -> str:
         file_statuses: list[str] = []
         for item in provider_files:
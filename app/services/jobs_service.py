@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import random
+from uuid import uuid4
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+
+from config import get_config
+from models.rag_job import RagJob
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_SUCCEEDED = "succeeded"
+JOB_STATUS_FAILED = "failed"
+JOB_STATUS_CANCELLED = "cancelled"
+
+ACTIVE_JOB_STATUSES = (JOB_STATUS_QUEUED, JOB_STATUS_RUNNING)
+
+_CLAIM_CANDIDATES = 10
+
+
+class JobsService:
+    # Очередь задач в таблице rag_jobs. Захват — оптимистичный: условный UPDATE по (status, lease_owner),
+    # выигрывает тот воркер, у которого rowcount == 1. Работает одинаково на SQLite и MariaDB.
+
+    def __init__(self, db: Session) -> None:
+        self._db = db
+        self._config = get_config()
+
+    def enqueue(
+        self,
+        job_type: str,
+        *,
+        domain_id: str | None,
+        index_id: str | None = None,
+        provider_type: str | None = None,
+        params: dict | None = None,
+    ) -> RagJob:
+        # Повторная постановка той же операции, пока предыдущая не завершена, возвращает активную задачу
+        existing = (
+            self._db.query(RagJob)
+            .filter(RagJob.job_type == job_type)
+            .filter(RagJob.domain_id == domain_id if domain_id is not None else RagJob.domain_id.is_(None))
+            .filter(RagJob.index_id == index_id if index_id is not None else RagJob.index_id.is_(None))
+            .filter(
+                RagJob.provider_type == provider_type if provider_type is not None else RagJob.provider_type.is_(None)
+            )
+            .filter(RagJob.status.in_(ACTIVE_JOB_STATUSES))
+            .filter(RagJob.cancel_requested.is_(False))
+            .order_by(RagJob.created_at.desc())
+            .first()
+        )
+        if existing is not None and (existing.params or {}) == (params or {}):
+            return existing
+
+        now = datetime.utcnow()
+        job = RagJob(
+            id=str(uuid4()),
+            job_type=job_type,
+            domain_id=domain_id,
+            index_id=index_id,
+            provider_type=provider_type,
+            params=params or {},
+            status=JOB_STATUS_QUEUED,
+            attempts=0,
+            max_attempts=max(1, self._config.jobs_max_attempts),
+            run_after=now,
+            cancel_requested=False,
+            progress={},
+            created_at=now,
+            updated_at=now,
+        )
+        self._db.add(job)
+        self._db.commit()
+        self._db.refresh(job)
+        return job
+
+    def get_job(self, job_id: str, *, domain_id: str | None = None) -> RagJob | None:
+        q = self._db.query(RagJob).filter(RagJob.id == job_id)
+        if domain_id is not None:
+            q = q.filter(RagJob.domain_id == domain_id)
+        return q.one_or_none()
+
+    def request_cancel(self, job_id: str, *, domain_id: str | None = None) -> RagJob | None:
+        job = self.get_job(job_id, domain_id=domain_id)
+        if job is None:
+            return None
+
+        now = datetime.utcnow()
+        if job.status == JOB_STATUS_QUEUED:
+            # Ещё не захвачена: отменяем сразу (условие на статус — на случай гонки с воркером)
+            res = self._db.execute(
+                update(RagJob)
+                .where(RagJob.id == job.id, RagJob.status == JOB_STATUS_QUEUED)
+                .values(status=JOB_STATUS_CANCELLED, cancel_requested=True, finished_at=now, updated_at=now)
+            )
+            if res.rowcount != 1:
+                self._db.execute(
+                    update(RagJob).where(RagJob.id == job.id).values(cancel_requested=True, updated_at=now)
+                )
+        elif job.status == JOB_STATUS_RUNNING:
+            # Выполняющуюся задачу останавливает воркер на ближайшей контрольной точке
+            self._db.execute(update(RagJob).where(RagJob.id == job.id).values(cancel_requested=True, updated_at=now))
+        self._db.commit()
+        self._db.refresh(job)
+        return job
+
+    def claim_next(self, worker_id: str, *, lease_seconds: int) -> RagJob | None:
+        now = datetime.utcnow()
+        candidates = (
+            self._db.query(RagJob.id, RagJob.status, RagJob.lease_owner)
+            .filter(
+                or_(
+                    and_(RagJob.status == JOB_STATUS_QUEUED, RagJob.run_after <= now),
+                    # Воркер пропал, не продлив lease — задачу забирает другой
+                    and_(RagJob.status == JOB_STATUS_RUNNING, RagJob.lease_expires_at < now),
+                )
+            )
+            .order_by(RagJob.run_after.asc(), RagJob.created_at.asc())
+            .limit(_CLAIM_CANDIDATES)
+            .all()
+        )
+
+        for job_id, status, lease_owner in candidates:
+            conditions = [RagJob.id == job_id, RagJob.status == status]
+            if status == JOB_STATUS_RUNNING:
+                conditions.append(RagJob.lease_owner == lease_owner)
+                conditions.append(RagJob.lease_expires_at < now)
+
+            res = self._db.execute(
+                update(RagJob)
+                .where(*conditions)
+                .values(
+                    status=JOB_STATUS_RUNNING,
+                    lease_owner=worker_id,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    heartbeat_at=now,
+                    attempts=RagJob.attempts + 1,
+                    started_at=now,
+                    updated_at=now,
+                )
+            )
+            self._db.commit()
+            if res.rowcount != 1:
+                continue
+
+            job = self._db.get(RagJob, job_id)
+            if job is None:
+                continue
+            self._db.refresh(job)
+
+            if job.cancel_requested:
+                self.finish(job, worker_id, status=JOB_STATUS_CANCELLED, progress=job.progress)
+                continue
+            if job.attempts > job.max_attempts:
+                self.finish(
+                    job,
+                    worker_id,
+                    status=JOB_STATUS_FAILED,
+                    error="Превышено число попыток (воркер не продлил lease)",
+                    progress=job.progress,
+                )
+                continue
+            return job
+
+        return None
+
+    def heartbeat(self, job_id: str, worker_id: str, *, lease_seconds: int, progress: dict | None) -> bool | None:
+        # -> cancel_requested; None — lease потерян (задачу забрал другой воркер или она завершена)
+        now = datetime.utcnow()
+        values: dict = {
+            "lease_expires_at": now + timedelta(seconds=lease_seconds),
+            "heartbeat_at": now,
+            "updated_at": now,
+        }
+        if progress is not None:
+            values["progress"] = progress
+
+        res = self._db.execute(
+            update(RagJob)
+            .where(RagJob.id == job_id, RagJob.lease_owner == worker_id, RagJob.status == JOB_STATUS_RUNNING)
+            .values(**values)
+        )
+        self._db.commit()
+        if res.rowcount != 1:
+            return None
+
+        cancel_requested = self._db.query(RagJob.cancel_requested).filter(RagJob.id == job_id).scalar()
+        return bool(cancel_requested)
+
+    def finish(
+        self,
+        job: RagJob,
+        worker_id: str,
+        *,
+        status: str,
+        result: dict | None = None,
+        error: str | None = None,
+        progress: dict | None = None,
+    ) -> bool:
+        now = datetime.utcnow()
+        res = self._db.execute(
+            update(RagJob)
+            .where(RagJob.id == job.id, RagJob.lease_owner == worker_id, RagJob.status == JOB_STATUS_RUNNING)
+            .values(
+                status=status,
+                result=result,
+                last_error=error,
+                progress=progress,
+                lease_owner=None,
+                lease_expires_at=None,
+                finished_at=now,
+                updated_at=now,
+            )
+        )
+        self._db.commit()
+        return res.rowcount == 1
+
+    def retry_later(self, job: RagJob, worker_id: str, *, error: str, progress: dict | None = None) -> bool:
+        # Экспоненциальная задержка с полным джиттером: [base*2^(n-1)/2, base*2^(n-1)], не больше max
+        base = max(1, self._config.jobs_retry_backoff_seconds)
+        cap = max(base, self._config.jobs_retry_backoff_max_seconds)
+        delay = min(cap, base * (2 ** max(0, job.attempts - 1)))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+
+        now = datetime.utcnow()
+        res = self._db.execute(
+            update(RagJob)
+            .where(RagJob.id == job.id, RagJob.lease_owner == worker_id, RagJob.status == JOB_STATUS_RUNNING)
+            .values(
+                status=JOB_STATUS_QUEUED,
+                last_error=error,
+                progress=progress,
+                lease_owner=None,
+                lease_expires_at=None,
+                run_after=now + timedelta(seconds=delay),
+                updated_at=now,
+            )
+        )
+        self._db.commit()
+        return res.rowcount == 1
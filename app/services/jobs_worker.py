@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from config import get_config
+from database import get_session_maker
+from models.rag_job import RagJob
+from providers.limiter import PRIORITY_BACKGROUND, provider_priority
+from services.index_events import notify_index_events
+from services.index_publish_service import IndexPublishService
+from services.indexes_sync_service import IndexesSyncService
+from services.jobs_service import (
+    JOB_STATUS_CANCELLED,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_SUCCEEDED,
+    JobsService,
+)
+from services.provider_sync_service import ProviderSyncService
+from utils.json_response import dumps
+from utils.metrics import track_operation
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE_PUBLISH = "publish"
+JOB_TYPE_REINDEX = "reindex"
+JOB_TYPE_INDEXES_SYNC = "indexes_sync"
+JOB_TYPE_PROVIDER_SYNC = "provider_sync"
+
+
+class JobCancelledError(Exception):
+    pass
+
+
+class JobContext:
+    # Прогресс и признак отмены выполняющейся задачи. Обработчик обновляет счётчики через report(),
+    # в БД их пишет поток heartbeat (не чаще интервала heartbeat), отмену он же и выставляет.
+
+    def __init__(self, job_id: str, progress: dict | None = None) -> None:
+        self.job_id = job_id
+        self._lock = threading.Lock()
+        self._progress: dict = dict(progress or {})
+        self._dirty = False
+        self._cancelled = threading.Event()
+
+    def report(self, **counters) -> None:
+        with self._lock:
+            self._progress.update(counters)
+            self._dirty = True
+        self.check_cancelled()
+
+    def check_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise JobCancelledError("Задача отменена")
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def progress_snapshot(self, *, only_dirty: bool = False) -> dict | None:
+        with self._lock:
+            if only_dirty and not self._dirty:
+                return None
+            self._dirty = False
+            return dict(self._progress)
+
+
+def _publish_result(result: dict) -> dict:
+    # Тот же состав, что у IndexPublishOut: ORM-объекты (индекс, загрузки) в результат задачи не попадают
+    result = dict(result)
+    result.pop("rag_index", None)
+    result.pop("uploads", None)
+    return result
+
+
+def _run_publish(db: Session, job: RagJob, ctx: JobContext) -> dict:
+    params = job.params or {}
+    result = IndexPublishService(db=db, domain_id=str(job.domain_id)).publish(
+        index_id=str(job.index_id),
+        force_upload=bool(params.get("force_upload", False)),
+        detach_extra=bool(params.get("detach_extra", True)),
+        dry_run=bool(params.get("dry_run", False)),
+        on_progress=ctx.report,
+    )
+    return _publish_result(result)
+
+
+def _run_reindex(db: Session, job: RagJob, ctx: JobContext) -> dict:
+    params = job.params or {}
+    result = IndexPublishService(db=db, domain_id=str(job.domain_id)).publish(
+        index_id=str(job.index_id),
+        force_upload=bool(params.get("force_upload", False)),
+        detach_extra=True,
+        dry_run=False,
+        on_progress=ctx.report,
+    )
+    return _publish_result(result)
+
+
+def _run_indexes_sync(db: Session, job: RagJob, ctx: JobContext) -> dict:
+    params = job.params or {}
+    result = IndexesSyncService(db=db, domain_id=str(job.domain_id)).sync_domain_indexes(
+        provider_type=job.provider_type,
+        force=bool(params.get("force", False)),
+        on_progress=ctx.report,
+    )
+    items = result.get("items") or []
+    errors = result.get("errors") or []
+    ctx.report(indexes_done=len(items) + len(errors), errors=len(errors))
+    return {"index_ids": [i.id for i in items], "errors": list(errors)}
+
+
+def _run_provider_sync(db: Session, job: RagJob, ctx: JobContext) -> dict:
+    # В rag_jobs.result — счётчики и ошибки отчёта: строки по каждому файлу на больших синхронизациях
+    # раздували бы JSON без предела. Пофайловые итоги отдаёт NDJSON-поток синхронной ручки.
+    report, file_results = ProviderSyncService(db=db).stream_sync(provider_type=str(job.provider_type))
+    files_done = 0
+    for files_done, _ in enumerate(file_results, start=1):
+        ctx.report(files_done=files_done)
+    report["files_done"] = files_done
+    return report
+
+
+JOB_HANDLERS: dict[str, Callable[[Session, RagJob, JobContext], dict]] = {
+    JOB_TYPE_PUBLISH: _run_publish,
+    JOB_TYPE_REINDEX: _run_reindex,
+    JOB_TYPE_INDEXES_SYNC: _run_indexes_sync,
+    JOB_TYPE_PROVIDER_SYNC: _run_provider_sync,
+}
+
+# Ошибки входных данных повторять бессмысленно
+_NON_RETRYABLE_ERRORS = (ValueError, LookupError, NotImplementedError)
+
+
+def _json_safe(value: dict) -> dict:
+    return json.loads(dumps(value))
+
+
+def _default_worker_id(name: str) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{name}"
+
+
+@contextmanager
+def _jobs_service() -> Iterator[JobsService]:
+    # Короткая сессия на одну операцию с очередью: соединение не держится, пока выполняется задача
+    db = get_session_maker()()
+    try:
+        yield JobsService(db=db)
+    finally:
+        db.close()
+
+
+class JobWorker:
+    def __init__(
+        self,
+        name: str,
+        *,
+        stop_event: threading.Event | None = None,
+        wakeup_event: threading.Event | None = None,
+    ) -> None:
+        config = get_config()
+        self.worker_id = _default_worker_id(name)
+        self._stop = stop_event or threading.Event()
+        self._wakeup = wakeup_event or threading.Event()
+        self._lease_seconds = max(3, config.jobs_lease_seconds)
+        self._poll_interval = max(0.05, config.jobs_poll_interval_ms / 1000)
+        self._progress_flush_interval = max(0.1, config.jobs_progress_flush_ms / 1000)
+
+    def run(self) -> None:
+        logger.info("Воркер задач %s запущен", self.worker_id)
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception:
+                logger.exception("Воркер задач %s: ошибка цикла", self.worker_id)
+                processed = False
+            if not processed:
+                self._wakeup.wait(self._poll_interval)
+                self._wakeup.clear()
+        logger.info("Воркер задач %s остановлен", self.worker_id)
+
+    def run_once(self) -> bool:
+        # Сессия захвата закрывается до выполнения (задача остаётся отсоединённым объектом с загруженными
+        # полями): иначе второе соединение пула простаивало бы в открытой транзакции всю публикацию
+        with _jobs_service() as jobs:
+            job = jobs.claim_next(self.worker_id, lease_seconds=self._lease_seconds)
+        if job is None:
+            return False
+        self._execute(job)
+        return True
+
+    def _execute(self, job: RagJob) -> None:
+        logger.info(
+            "Задача %s (%s) взята воркером %s, попытка %s/%s",
+            job.id,
+            job.job_type,
+            self.worker_id,
+            job.attempts,
+            job.max_attempts,
+        )
+        ctx = JobContext(job.id, job.progress)
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop,
+            args=(job.id, ctx, done),
+            name=f"job-heartbeat-{job.id}",
+            daemon=True,
+        )
+        heartbeat.start()
+
+        handler_db = get_session_maker()()
+        try:
+            handler = JOB_HANDLERS.get(job.job_type)
+            if handler is None:
+                raise ValueError(f"Неизвестный тип задачи: {job.job_type}")
+
+            with track_operation(f"job_{job.job_type}"), provider_priority(PRIORITY_BACKGROUND):
+                result = handler(handler_db, job, ctx)
+        except JobCancelledError:
+            handler_db.rollback()
+            logger.info("Задача %s отменена", job.id)
+            self._finish(job, ctx, done, heartbeat, status=JOB_STATUS_CANCELLED)
+        except _NON_RETRYABLE_ERRORS as e:
+            handler_db.rollback()
+            logger.warning("Задача %s завершилась ошибкой: %s", job.id, e)
+            self._finish(job, ctx, done, heartbeat, status=JOB_STATUS_FAILED, error=str(e))
+        except Exception as e:
+            handler_db.rollback()
+            logger.exception("Задача %s: ошибка выполнения", job.id)
+            self._stop_heartbeat(done, heartbeat)
+            error = f"{type(e).__name__}: {e}"
+            with _jobs_service() as jobs:
+                if job.attempts < job.max_attempts:
+                    jobs.retry_later(job, self.worker_id, error=error, progress=ctx.progress_snapshot())
+                else:
+                    jobs.finish(
+                        job, self.worker_id, status=JOB_STATUS_FAILED, error=error, progress=ctx.progress_snapshot()
+                    )
+            notify_index_events()
+        else:
+            self._finish(job, ctx, done, heartbeat, status=JOB_STATUS_SUCCEEDED, result=_json_safe(result))
+            logger.info("Задача %s выполнена", job.id)
+        finally:
+            self._stop_heartbeat(done, heartbeat)
+            handler_db.close()
+
+    def _finish(
+        self,
+        job: RagJob,
+        ctx: JobContext,
+        done: threading.Event,
+        heartbeat: threading.Thread,
+        *,
+        status: str,
+        result: dict | None = None,
+        error: str | None = None,
+    ) -> None:
+        self._stop_heartbeat(done, heartbeat)
+        with _jobs_service() as jobs:
+            finished = jobs.finish(
+                job, self.worker_id, status=status, result=result, error=error, progress=ctx.progress_snapshot()
+            )
+        if not finished:
+            logger.warning("Задача %s: lease потерян, результат не записан", job.id)
+        notify_index_events()
+
+    @staticmethod
+    def _stop_heartbeat(done: threading.Event, heartbeat: threading.Thread) -> None:
+        done.set()
+        if heartbeat.is_alive():
+            heartbeat.join()
+
+    def _heartbeat_loop(self, job_id: str, ctx: JobContext, done: threading.Event) -> None:
+        # Lease продлевается раз в lease/3; изменившийся прогресс пишется чаще (JOBS_PROGRESS_FLUSH_MS),
+        # чтобы SSE-подписчики видели его без задержки в десятки секунд
+        interval = self._lease_seconds / 3
+        tick = min(interval, self._progress_flush_interval)
+        last_heartbeat = time.monotonic()
+        session_local = get_session_maker()
+        while not done.wait(tick):
+            progress = ctx.progress_snapshot(only_dirty=True)
+            if progress is None and time.monotonic() - last_heartbeat < interval:
+                continue
+
+            db = session_local()
+            try:
+                cancel_requested = JobsService(db=db).heartbeat(
+                    job_id,
+                    self.worker_id,
+                    lease_seconds=self._lease_seconds,
+                    progress=progress,
+                )
+            except Exception:
+                logger.exception("Задача %s: ошибка heartbeat", job_id)
+                continue
+            finally:
+                db.close()
+            last_heartbeat = time.monotonic()
+            if progress is not None:
+                notify_index_events()
+
+            if cancel_requested is None:
+                logger.warning("Задача %s: lease потерян воркером %s, выполнение прерывается", job_id, self.worker_id)
+                ctx.cancel()
+                return
+            if cancel_requested:
+                ctx.cancel()
+
+
+_embedded_stop = threading.Event()
+_embedded_wakeup = threading.Event()
+_embedded_threads: list[threading.Thread] = []
+
+
+def notify_workers() -> None:
+    # Задача поставлена в этом процессе — будим встроенных воркеров, не дожидаясь интервала опроса
+    _embedded_wakeup.set()
+
+
+def start_embedded_workers(count: int) -> None:
+    if count <= 0 or _embedded_threads:
+        return
+
+    _embedded_stop.clear()
+    for i in range(count):
+        worker = JobWorker(f"embedded-{i}", stop_event=_embedded_stop, wakeup_event=_embedded_wakeup)
+        thread = threading.Thread(target=worker.run, name=f"jobs-worker-{i}", daemon=True)
+        thread.start()
+        _embedded_threads.append(thread)
+
+
+def stop_embedded_workers(timeout: float = 10.0) -> None:
+    _embedded_stop.set()
+    _embedded_wakeup.set()
+    deadline = time.monotonic() + timeout
+    for thread in _embedded_threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    _embedded_threads.clear()
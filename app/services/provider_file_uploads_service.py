@@ -11,6 +11,9 @@ from sqlalchemy.orm import Session
 from models.rag_file import RagFile
 from models.rag_provider_file_upload import RagProviderFileUpload
 from services.providers_connections_service import ProvidersConnectionsService
+from utils.cursor import after_cursor_filter
+from utils.logger import log_payload
+from utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +22,19 @@ class ProviderFileUploadsService:
     def __init__(self, db: Session) -> None:
         self._db = db
 
-    def list_uploads(self, provider_type: str, skip: int = 0, limit: int = 100) -> list[RagProviderFileUpload]:
+    def list_uploads(
+        self,
+        provider_type: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: str | None = None,
+    ) -> list[RagProviderFileUpload]:
+        q = self._db.query(RagProviderFileUpload).filter(RagProviderFileUpload.provider_id == provider_type)
+        if after:
+            q = q.filter(after_cursor_filter(RagProviderFileUpload.created_at, RagProviderFileUpload.id, after))
+
         return (
-            self._db.query(RagProviderFileUpload)
-            .filter(RagProviderFileUpload.provider_id == provider_type)
-            .order_by(RagProviderFileUpload.created_at.desc())
+            q.order_by(RagProviderFileUpload.created_at.desc(), RagProviderFileUpload.id.desc())
             .offset(skip)
             .limit(limit)
             .all()
@@ -44,6 +55,7 @@ class ProviderFileUploadsService:
 
         return q.order_by(RagProviderFileUpload.created_at.desc()).all()
 
+    @traced("upload.get_or_sync")
     def get_or_sync(
         self,
         provider_type: str,
@@ -51,13 +63,13 @@ class ProviderFileUploadsService:
         force: bool = False,
         meta: dict | None = None,
     ) -> RagProviderFileUpload:
-        logger.info(f"get_or_sync called: provider_type={provider_type}, local_file_id={local_file_id}, force={force}")
+        logger.info("get_or_sync called: provider_type=%s, local_file_id=%s, force=%s", provider_type, local_file_id, force)
         
         rag_file = self._get_local_file(local_file_id)
-        logger.info(f"Got local file: {rag_file.file_name}, path: {rag_file.local_path}")
+        logger.info("Got local file: %s, path: %s", rag_file.file_name, rag_file.local_path)
         
         sha256 = self._calc_sha256(Path(rag_file.local_path))
-        logger.info(f"Calculated SHA256: {sha256}")
+        logger.info("Calculated SHA256: %s", sha256)
 
         upload = (
             self._db.query(RagProviderFileUpload)
@@ -66,7 +78,7 @@ class ProviderFileUploadsService:
             .one_or_none()
         )
 
-        logger.info(f"Existing upload found: {upload is not None}")
+        logger.info("Existing upload found: %s", upload is not None)
 
         if (
             upload is not None
@@ -98,18 +110,18 @@ class ProviderFileUploadsService:
 
         logger.info("Getting provider...")
         provider = ProvidersConnectionsService(db=self._db).get_provider(provider_type)
-        logger.info(f"Got provider: {type(provider).__name__}")
+        logger.info("Got provider: %s", type(provider).__name__)
 
         try:
-            logger.info(f"Calling provider.create_file for {rag_file.local_path}")
+            logger.info("Calling provider.create_file for %s", rag_file.local_path)
             created = provider.create_file(local_path=rag_file.local_path, meta=meta)
-            logger.info(f"Provider response: {created}")
+            logger.info("Provider response: %s", log_payload(created, sample=False))
             
             external_file_id = created.get("id") or created.get("file_id")
             if not external_file_id:
                 raise ValueError("Провайдер не вернул идентификатор файла")
 
-            logger.info(f"Got external_file_id: {external_file_id}")
+            logger.info("Got external_file_id: %s", external_file_id)
             upload.external_file_id = str(external_file_id)
             upload.external_uploaded_at = datetime.utcnow()
             upload.raw_provider_json = created
@@ -120,10 +132,10 @@ class ProviderFileUploadsService:
             self._db.refresh(upload)
             return upload
         except Exception as e:
-            logger.error(f"Error in provider.create_file: {e}")
-            logger.error(f"Exception type: {type(e).__name__}")
+            logger.error("Error in provider.create_file: %s", e)
+            logger.error("Exception type: %s", type(e).__name__)
             import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.error("Traceback: %s", traceback.format_exc())
             
             upload.status = "failed"
             upload.last_error = str(e)
@@ -167,6 +179,7 @@ class ProviderFileUploadsService:
             raise ValueError("Локальный файл не найден")
         return rag_file
 
+    @traced("file.sha256")
     def _calc_sha256(self, path: Path) -> str:
         if not path.exists() or not path.is_file():
             raise ValueError("Файл отсутствует на диске")
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
 from datetime import datetime
 import hashlib
-import json
 import logging
 import mimetypes
 from pathlib import Path
@@ -15,12 +15,28 @@ from models.rag_file import RagFile
 from models.rag_index import RagIndex
 from models.rag_index_file import RagIndexFile
 from models.rag_provider_file_upload import RagProviderFileUpload
+from providers.base import BaseProvider
+from services.index_membership_service import IndexMembershipService
 from services.providers_connections_service import ProvidersConnectionsService
+from utils.logger import log_payload
+from utils.metrics import count_items, track_operation
+from utils.tracing import traced
 
 
 _DEFAULT_LIST_LIMIT = 1000
 _CHUNK_SIZE_BYTES = 1024 * 1024
 _EMPTY_CONTENT_SHA256 = hashlib.sha256(b"").hexdigest()
+_REPORT_COUNTERS = (
+    "indexes_created",
+    "indexes_updated",
+    "indexes_detached",
+    "files_created",
+    "files_kept",
+    "index_files_created",
+    "index_files_deleted",
+    "provider_uploads_created",
+    "provider_uploads_deleted",
+)
 
 
 logger = logging.getLogger(__name__)
@@ -31,12 +47,6 @@ class ProviderSyncService:
         self._db = db
         self._config = get_config()
 
-    def _dump_payload(self, payload: object) -> str:
-        try:
-            return json.dumps(payload, ensure_ascii=False, default=str)
-        except Exception:
-            return str(payload)
-
     def _redact_headers(self, headers: dict | None) -> dict:
         if not headers:
             return {}
@@ -96,20 +106,24 @@ class ProviderSyncService:
             "provider_sync http_error event=%s provider=%s payload=%s request=%s response=%s error=%s",
             event,
             provider_type,
-            self._dump_payload(payload),
-            self._dump_payload(req_info) if req_info is not None else None,
-            self._dump_payload(resp_info) if resp_info is not None else None,
+            log_payload(payload, sample=False),
+            log_payload(req_info, sample=False) if req_info is not None else None,
+            log_payload(resp_info, sample=False) if resp_info is not None else None,
             repr(error),
         )
 
+    @traced("provider_sync")
     def sync(self, provider_type: str) -> dict:
+        report, file_results = self.stream_sync(provider_type)
+        report["file_results"].extend(file_results)
+        return report
+
+    def stream_sync(self, provider_type: str) -> tuple[dict, Iterator[dict]]:
+        # Синхронизация выполняется по мере чтения генератора результатов по файлам;
+        # счётчики отчёта окончательно заполнены только после его исчерпания.
         default_domain_id = self._config.default_domain_id
         provider = ProvidersConnectionsService(db=self._db).get_provider(provider_type)
 
-        domains_used: set[str] = set()
-        vector_store_domain_by_id: dict[str, str] = {}
-        vector_store_files_by_id: dict[str, list[dict]] = {}
-
         report: dict = {
             "provider_type": provider_type,
             "domain_id": default_domain_id,
@@ -128,6 +142,24 @@ class ProviderSyncService:
             "files_byte_mismatches": [],
             "errors": [],
         }
+        return report, self._iter_sync(provider_type, provider, report)
+
+    def _iter_sync(self, provider_type: str, provider: BaseProvider, report: dict) -> Iterator[dict]:
+        with track_operation("provider_sync"):
+            yield from self._iter_sync_files(provider_type, provider, report)
+
+        count_items(
+            "provider_sync",
+            **{key: report[key] for key in _REPORT_COUNTERS},
+            errors=len(report["errors"]),
+        )
+
+    def _iter_sync_files(self, provider_type: str, provider: BaseProvider, report: dict) -> Iterator[dict]:
+        default_domain_id = self._config.default_domain_id
+
+        domains_used: set[str] = set()
+        vector_store_domain_by_id: dict[str, str] = {}
+        vector_store_files_by_id: dict[str, list[dict]] = {}
 
         vector_stores = provider.list_vector_stores(limit=_DEFAULT_LIST_LIMIT)
         provider_vs_ids: set[str] = set()
@@ -150,7 +182,7 @@ class ProviderSyncService:
                         "provider_sync retrieve_vector_store provider=%s vector_store_id=%s payload=%s",
                         provider_type,
                         vs_id,
-                        self._dump_payload(vs_detail),
+                        log_payload(vs_detail),
                     )
             except Exception as e:
                 logger.warning(
@@ -187,7 +219,7 @@ class ProviderSyncService:
                             "provider_sync list_vector_store_files provider=%s vector_store_id=%s payload=%s",
                             provider_type,
                             vs_id,
-                            self._dump_payload(items),
+                            log_payload(items),
                         )
                         if isinstance(items, list):
                             vector_store_files_by_id[vs_id] = items
@@ -399,7 +431,7 @@ class ProviderSyncService:
                             "provider_sync retrieve_vector_store provider=%s vector_store_id=%s payload=%s",
                             provider_type,
                             vs_id,
-                            self._dump_payload(vs_detail),
+                            log_payload(vs_detail),
                         )
             except Exception as e:
                 logger.warning(
@@ -421,7 +453,7 @@ class ProviderSyncService:
                         "provider_sync list_vector_store_files provider=%s vector_store_id=%s payload=%s",
                         provider_type,
                         vs_id,
-                        self._dump_payload(items),
+                        log_payload(items),
                     )
                     if isinstance(items, list):
                         vector_store_files_by_id[vs_id] = items
@@ -444,7 +476,7 @@ class ProviderSyncService:
                             provider_type,
                             vs_id,
                             str(vector_store_file_id),
-                            self._dump_payload(vs_file),
+                            log_payload(vs_file),
                         )
                         vector_store_file_meta = vs_file if isinstance(vs_file, dict) else None
                         extracted = self._extract_external_file_id(vs_file)
@@ -592,7 +624,6 @@ class ProviderSyncService:
                             file_type=file_type,
                             local_path=str(local_path),
                             size_bytes=len(provider_bytes) if provider_bytes is not None else 0,
-                            chunking_strategy=None,
                             tags=None,
                             notes=None,
                         )
@@ -681,22 +712,20 @@ class ProviderSyncService:
                         if changed:
                             self._db.commit()
 
-                    report["file_results"].append(
-                        {
-                            "vector_store_id": vs_id,
-                            "external_file_id": external_file_id,
-                            "local_file_id": rag_file.id,
-                            "action": action,
-                            "local_sha256": local_sha256,
-                            "provider_sha256": provider_sha256,
-                            "byte_mismatch": bool(
-                                local_sha256 is not None
-                                and provider_sha256 is not None
-                                and local_sha256 != provider_sha256
-                            ),
-                            "content_available": bool(provider_bytes is not None),
-                        }
-                    )
+                    yield {
+                        "vector_store_id": vs_id,
+                        "external_file_id": external_file_id,
+                        "local_file_id": rag_file.id,
+                        "action": action,
+                        "local_sha256": local_sha256,
+                        "provider_sha256": provider_sha256,
+                        "byte_mismatch": bool(
+                            local_sha256 is not None
+                            and provider_sha256 is not None
+                            and local_sha256 != provider_sha256
+                        ),
+                        "content_available": bool(provider_bytes is not None),
+                    }
 
                 except Exception as e:
                     report["errors"].append(
@@ -724,9 +753,7 @@ class ProviderSyncService:
                     )
                     report["index_files_deleted"] += int(deleted or 0)
 
-                    if rag_index.file_ids != local_file_ids_for_index:
-                        rag_index.file_ids = local_file_ids_for_index
-
+                    IndexMembershipService(self._db).refresh_file_ids([rag_index.id])
                     self._db.commit()
                 except Exception as e:
                     report["errors"].append(f"vector_store={vs_id}: ошибка финализации rag_index_files/file_ids: {e}")
@@ -741,7 +768,6 @@ class ProviderSyncService:
                 )
 
         report["domains_used"] = sorted(domains_used)
-        return report
 
     def _extract_external_file_id(self, obj: dict | None) -> str | None:
         if not obj or not isinstance(obj, dict):
@@ -859,11 +885,13 @@ class ProviderSyncService:
         guessed, _ = mimetypes.guess_type(file_name)
         return guessed or "application/octet-stream"
 
+    @traced("file.sha256")
     def _calc_sha256_bytes(self, data: bytes) -> str:
         h = hashlib.sha256()
         h.update(data)
         return h.hexdigest()
 
+    @traced("file.sha256")
     def _calc_sha256_file(self, path: Path) -> str:
         if not path.exists() or not path.is_file():
             raise ValueError("Файл отсутствует на диске")
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from config import get_config
 from models.rag_provider_connection import RagProviderConnection
 from providers.base import BaseProvider
+from providers.limiter import configure_provider_limits
 from providers.registry import ensure_providers_loaded, get_provider_factory
 from utils.crypto import decrypt_json, encrypt_json
 
@@ -39,6 +40,10 @@ class ProvidersConnectionsService:
         token: dict | None,
         token_expires_at: datetime | None,
         is_enabled: bool,
+        rate_limit_per_minute: int | None = None,
+        rate_limit_burst: int | None = None,
+        max_concurrency: int | None = None,
+        http_options: dict | None = None,
     ) -> RagProviderConnection:
         conn = self.get_connection(provider_type)
         if conn is None:
@@ -49,6 +54,10 @@ class ProvidersConnectionsService:
         conn.auth_type = auth_type
         conn.is_enabled = is_enabled
         conn.token_expires_at = token_expires_at
+        conn.rate_limit_per_minute = rate_limit_per_minute
+        conn.rate_limit_burst = rate_limit_burst
+        conn.max_concurrency = max_concurrency
+        conn.http_options = http_options or None
 
         key = self._get_secrets_key()
 
@@ -73,6 +82,10 @@ class ProvidersConnectionsService:
         token: dict | None,
         token_expires_at: datetime | None,
         is_enabled: bool | None,
+        rate_limit_per_minute: int | None = None,
+        rate_limit_burst: int | None = None,
+        max_concurrency: int | None = None,
+        http_options: dict | None = None,
     ) -> RagProviderConnection | None:
         conn = self.get_connection(provider_type)
         if conn is None:
@@ -90,6 +103,18 @@ class ProvidersConnectionsService:
         if token_expires_at is not None:
             conn.token_expires_at = token_expires_at
 
+        if rate_limit_per_minute is not None:
+            conn.rate_limit_per_minute = rate_limit_per_minute
+
+        if rate_limit_burst is not None:
+            conn.rate_limit_burst = rate_limit_burst
+
+        if max_concurrency is not None:
+            conn.max_concurrency = max_concurrency
+
+        if http_options is not None:
+            conn.http_options = http_options or None
+
         if credentials is not None or token is not None:
             key = self._get_secrets_key()
             if credentials is not None:
@@ -130,7 +155,15 @@ class ProvidersConnectionsService:
         if factory is None:
             raise ValueError("Неизвестный provider_type")
 
-        return factory(conn, credentials, token)
+        provider = factory(conn, credentials, token)
+        provider.provider_type = provider_type
+        configure_provider_limits(
+            provider_type,
+            rate_limit_per_minute=conn.rate_limit_per_minute,
+            rate_limit_burst=conn.rate_limit_burst,
+            max_concurrency=conn.max_concurrency,
+        )
+        return provider
 
     def _get_secrets_key(self) -> str:
         if not self._config.provider_secrets_key:
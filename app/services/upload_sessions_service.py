@@ -0,0 +1,527 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import os
+from pathlib import Path
+import re
+import shutil
+import threading
+from uuid import uuid4
+
+import anyio.to_thread
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import get_config
+from database import get_session_maker
+from models.rag_file import RagFile
+from models.rag_upload_chunk import RagUploadChunk
+from models.rag_upload_session import RagUploadSession
+from utils.file_sink import FileSink
+from utils.metrics import count_items, timed_operation
+
+logger = logging.getLogger(__name__)
+
+SESSION_NOT_FOUND = "Сессия загрузки не найдена"
+SESSION_COMPLETED = "Сессия загрузки уже завершена"
+SESSION_COMPLETING = "Сессия загрузки завершается"
+CHUNKS_MISSING = "Загружены не все куски файла"
+SHA256_MISMATCH = "SHA-256 файла не совпадает с ожидаемым"
+
+# Сессии, которые ещё не стали файлом; по истечении срока сборщик удаляет их вместе с файлом на диске
+_UNFINISHED_STATUSES = ("open", "completing")
+
+_IO_BLOCK_SIZE = 1024 * 1024
+# Верхняя граница size_bytes при любом UPLOAD_MAX_FILE_BYTES — BIGINT в rag_files
+_MAX_SIZE_BYTES = 2**63 - 1
+_GC_BATCH_SIZE = 100
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+@dataclass(frozen=True)
+class ChunkTarget:
+    session_id: str
+    chunk_index: int
+    local_path: str
+    offset: int
+    size: int
+
+
+def chunks_total(size_bytes: int, chunk_size: int) -> int:
+    return (size_bytes + chunk_size - 1) // chunk_size
+
+
+class _PrefixHasher:
+    # SHA-256 непрерывного префикса файла: куски приходят в любом порядке и параллельно,
+    # а хеш считается по порядку — досчитывается, как только закрывается очередной разрыв
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.sha = hashlib.sha256()
+        self.offset = 0
+
+    def advance(self, path: str, upto: int) -> None:
+        # Вызывается под self.lock
+        if self.offset >= upto:
+            return
+        with open(path, "rb") as f:
+            f.seek(self.offset)
+            while self.offset < upto:
+                data = f.read(min(_IO_BLOCK_SIZE, upto - self.offset))
+                if not data:
+                    break
+                self.sha.update(data)
+                self.offset += len(data)
+
+
+class _PrefixHashers:
+    # Состояние hashlib нельзя сохранить в БД, поэтому оно живёт в процессе, принимающем куски.
+    # Если куски одной сессии попали в разные процессы, завершение досчитает хеш с нуля.
+    def __init__(self, max_entries: int = 256) -> None:
+        self._lock = threading.Lock()
+        self._items: OrderedDict[str, _PrefixHasher] = OrderedDict()
+        self._max_entries = max_entries
+
+    def get(self, session_id: str) -> _PrefixHasher:
+        with self._lock:
+            hasher = self._items.get(session_id)
+            if hasher is None:
+                hasher = _PrefixHasher()
+                self._items[session_id] = hasher
+                while len(self._items) > self._max_entries:
+                    self._items.popitem(last=False)
+            self._items.move_to_end(session_id)
+            return hasher
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            self._items.pop(session_id, None)
+
+
+_hashers = _PrefixHashers()
+
+
+async def write_chunk(target: ChunkTarget, stream: AsyncIterator[bytes]) -> str:
+    # Тело куска пишется сразу в итоговый файл со смещения куска, без промежуточного файла;
+    # запись и хеширование — в потоках пула, цикл событий не ждёт диск. Возвращает SHA-256 куска.
+    try:
+        sink = await FileSink.open(
+            target.local_path,
+            offset=target.offset,
+            buffer_size=get_config().upload_write_buffer_bytes,
+        )
+    except FileNotFoundError as e:
+        raise ValueError(SESSION_NOT_FOUND) from e
+
+    received = 0
+    try:
+        async for part in stream:
+            received += len(part)
+            if received > target.size:
+                raise ValueError(f"Кусок {target.chunk_index} больше ожидаемых {target.size} байт")
+            await sink.write(part)
+        await sink.close()
+    except BaseException:
+        await sink.abort()
+        raise
+
+    if sink.size != target.size:
+        raise ValueError(f"Кусок {target.chunk_index}: получено {sink.size} байт из {target.size}")
+    return sink.sha256
+
+
+class UploadSessionsService:
+    # Возобновляемая загрузка: создать сессию -> PUT кусков (в любом порядке, параллельно) -> завершить.
+    # Файл создаётся сразу в раскладке FilesService нужного размера, куски пишутся по своим смещениям;
+    # запись rag_files появляется только при завершении.
+
+    def __init__(self, db: Session, domain_id: str) -> None:
+        self._db = db
+        self._domain_id = domain_id
+        self._config = get_config()
+
+    def _make_file_path(self, file_id: str, file_name: str) -> Path:
+        return Path(self._config.files_root) / self._domain_id / file_id / "original" / Path(file_name).name
+
+    def _expires_at(self, now: datetime) -> datetime:
+        return now + timedelta(seconds=max(60, self._config.upload_session_ttl_seconds))
+
+    def create_session(
+        self,
+        *,
+        file_name: str,
+        size_bytes: int,
+        file_type: str | None,
+        tags: dict | list | None,
+        notes: str | None,
+        chunk_size: int | None,
+        sha256: str | None,
+    ) -> RagUploadSession:
+        safe_name = Path(file_name or "").name
+        if not safe_name:
+            raise ValueError("file_name обязателен")
+        if size_bytes < 0:
+            raise ValueError("size_bytes не может быть отрицательным")
+        max_file_bytes = self._config.upload_max_file_bytes
+        if max_file_bytes > 0 and size_bytes > max_file_bytes:
+            raise ValueError(f"Размер файла больше допустимых {max_file_bytes} байт")
+        if size_bytes > _MAX_SIZE_BYTES:
+            raise ValueError(f"Размер файла больше допустимых {_MAX_SIZE_BYTES} байт")
+
+        chunk_size = chunk_size or self._config.upload_chunk_size_bytes
+        max_chunk = max(1, self._config.upload_chunk_max_bytes)
+        if chunk_size <= 0 or chunk_size > max_chunk:
+            raise ValueError(f"chunk_size должен быть от 1 до {max_chunk} байт")
+
+        expected_sha256 = sha256.strip().lower() if sha256 else None
+        if expected_sha256 is not None and not _SHA256_RE.match(expected_sha256):
+            raise ValueError("sha256 должен быть hex-строкой из 64 символов")
+
+        file_id = str(uuid4())
+        path = self._make_file_path(file_id, safe_name)
+        try:
+            os.makedirs(path.parent, exist_ok=True)
+            # Файл итогового размера сразу (разреженный, где ФС это умеет) — куски пишутся по смещениям
+            with open(path, "wb") as f:
+                f.truncate(size_bytes)
+        except (OSError, OverflowError) as e:
+            # Сессии ещё нет — сборщик этот каталог не найдёт, убираем сразу
+            _remove_file_dir(str(path))
+            logger.warning("Не удалось создать файл сессии загрузки %s: %s", path, e)
+            raise ValueError(f"Не удалось создать файл размером {size_bytes} байт") from e
+
+        now = datetime.utcnow()
+        session = RagUploadSession(
+            id=str(uuid4()),
+            domain_id=self._domain_id,
+            file_id=file_id,
+            file_name=safe_name,
+            file_type=file_type or "application/octet-stream",
+            local_path=str(path),
+            size_bytes=size_bytes,
+            chunk_size=chunk_size,
+            tags=tags,
+            notes=notes,
+            expected_sha256=expected_sha256,
+            status="open",
+            created_at=now,
+            updated_at=now,
+            expires_at=self._expires_at(now),
+        )
+        self._db.add(session)
+        try:
+            self._db.commit()
+        except Exception:
+            self._db.rollback()
+            _remove_file_dir(str(path))
+            raise
+        self._db.refresh(session)
+        return session
+
+    def get_session(self, session_id: str) -> RagUploadSession | None:
+        return (
+            self._db.query(RagUploadSession)
+            .filter(RagUploadSession.domain_id == self._domain_id)
+            .filter(RagUploadSession.id == session_id)
+            .one_or_none()
+        )
+
+    def received_chunks(self, session_id: str) -> list[int]:
+        rows = (
+            self._db.query(RagUploadChunk.chunk_index)
+            .filter(RagUploadChunk.session_id == session_id)
+            .order_by(RagUploadChunk.chunk_index.asc())
+            .all()
+        )
+        return [chunk_index for (chunk_index,) in rows]
+
+    def chunk_target(self, session_id: str, chunk_index: int) -> ChunkTarget:
+        session = self.get_session(session_id)
+        if session is None:
+            raise ValueError(SESSION_NOT_FOUND)
+        if session.status == "completed":
+            raise ValueError(SESSION_COMPLETED)
+        if session.status != "open":
+            raise ValueError(SESSION_COMPLETING)
+
+        total = chunks_total(session.size_bytes, session.chunk_size)
+        if chunk_index < 0 or chunk_index >= total:
+            raise ValueError(f"Номер куска должен быть от 0 до {total - 1}" if total else "У пустого файла нет кусков")
+
+        # Повторный PUT принятого куска пишет поверх его байтов до проверки размера и X-Chunk-Sha256:
+        # запись куска и префикс хеша сбрасываются заранее, и любой сбой оставляет кусок непринятым
+        res = self._db.execute(
+            delete(RagUploadChunk)
+            .where(RagUploadChunk.session_id == session.id, RagUploadChunk.chunk_index == chunk_index)
+            .execution_options(synchronize_session=False)
+        )
+        self._db.commit()
+        if res.rowcount:
+            _hashers.discard(session.id)
+            # Завершение, захватившее сессию до удаления, могло уже посчитать этот кусок — тогда не пишем
+            status = self._db.scalar(select(RagUploadSession.status).where(RagUploadSession.id == session.id))
+            if status is None:
+                raise ValueError(SESSION_NOT_FOUND)
+            if status == "completed":
+                raise ValueError(SESSION_COMPLETED)
+            if status != "open":
+                raise ValueError(SESSION_COMPLETING)
+
+        offset = chunk_index * session.chunk_size
+        return ChunkTarget(
+            session_id=session.id,
+            chunk_index=chunk_index,
+            local_path=session.local_path,
+            offset=offset,
+            size=min(session.chunk_size, session.size_bytes - offset),
+        )
+
+    def record_chunk(self, target: ChunkTarget, sha256: str) -> RagUploadSession:
+        now = datetime.utcnow()
+        chunk = self._db.get(RagUploadChunk, (target.session_id, target.chunk_index))
+        if chunk is None:
+            self._db.add(
+                RagUploadChunk(
+                    session_id=target.session_id,
+                    chunk_index=target.chunk_index,
+                    size_bytes=target.size,
+                    sha256=sha256,
+                    created_at=now,
+                )
+            )
+            try:
+                self._db.commit()
+            except IntegrityError:
+                # Тот же кусок параллельно принят другим запросом
+                self._db.rollback()
+                chunk = self._db.get(RagUploadChunk, (target.session_id, target.chunk_index))
+
+        if chunk is not None and chunk.sha256 != sha256:
+            # Кусок переписан другим содержимым — посчитанный префикс хеша больше не годится
+            _hashers.discard(target.session_id)
+            chunk.sha256 = sha256
+            chunk.created_at = now
+
+        self._db.execute(
+            update(RagUploadSession)
+            .where(RagUploadSession.id == target.session_id)
+            .values(updated_at=now, expires_at=self._expires_at(now))
+            .execution_options(synchronize_session=False)
+        )
+        self._db.commit()
+
+        session = self.get_session(target.session_id)
+        if session is None:
+            raise ValueError(SESSION_NOT_FOUND)
+        self._advance_hash(session, blocking=False)
+        return session
+
+    def _contiguous_bytes(self, session: RagUploadSession) -> int:
+        received = 0
+        for chunk_index in self.received_chunks(session.id):
+            if chunk_index != received:
+                break
+            received += 1
+        return min(received * session.chunk_size, session.size_bytes)
+
+    def _advance_hash(self, session: RagUploadSession, *, blocking: bool) -> _PrefixHasher | None:
+        # Без blocking досчёт берёт тот запрос, который первым застал хешер свободным; остальные не ждут
+        hasher = _hashers.get(session.id)
+        if not hasher.lock.acquire(blocking=blocking):
+            return None
+        try:
+            hasher.advance(session.local_path, self._contiguous_bytes(session))
+        finally:
+            hasher.lock.release()
+        return hasher
+
+    @timed_operation("upload_complete")
+    def complete(self, session_id: str) -> RagFile:
+        session = self.get_session(session_id)
+        if session is None:
+            raise ValueError(SESSION_NOT_FOUND)
+        if session.status == "completed":
+            rag_file = self._db.get(RagFile, session.file_id)
+            if rag_file is None:
+                raise ValueError(SESSION_NOT_FOUND)
+            return rag_file
+
+        # Захват условным UPDATE: параллельные завершения одной сессии не создают файл дважды
+        res = self._db.execute(
+            update(RagUploadSession)
+            .where(RagUploadSession.id == session.id, RagUploadSession.status == "open")
+            .values(status="completing")
+            .execution_options(synchronize_session=False)
+        )
+        self._db.commit()
+        if res.rowcount != 1:
+            raise ValueError(SESSION_COMPLETING)
+
+        try:
+            if len(self.received_chunks(session.id)) != chunks_total(session.size_bytes, session.chunk_size):
+                raise ValueError(CHUNKS_MISSING)
+
+            hasher = self._advance_hash(session, blocking=True)
+            if hasher is None or hasher.offset != session.size_bytes:
+                raise ValueError(f"Файл на диске короче {session.size_bytes} байт")
+            content_sha256 = hasher.sha.hexdigest()
+            if session.expected_sha256 and content_sha256 != session.expected_sha256:
+                raise ValueError(SHA256_MISMATCH)
+
+            rag_file = RagFile(
+                id=session.file_id,
+                domain_id=session.domain_id,
+                file_name=session.file_name,
+                file_type=session.file_type,
+                local_path=session.local_path,
+                size_bytes=session.size_bytes,
+                content_sha256=content_sha256,
+                tags=session.tags,
+                notes=session.notes,
+            )
+            self._db.add(rag_file)
+            self._db.execute(delete(RagUploadChunk).where(RagUploadChunk.session_id == session.id))
+            self._db.execute(
+                update(RagUploadSession)
+                .where(RagUploadSession.id == session.id)
+                .values(status="completed", content_sha256=content_sha256)
+                .execution_options(synchronize_session=False)
+            )
+            self._db.commit()
+        except BaseException:
+            self._db.rollback()
+            self._db.execute(
+                update(RagUploadSession)
+                .where(RagUploadSession.id == session.id, RagUploadSession.status == "completing")
+                .values(status="open")
+                .execution_options(synchronize_session=False)
+            )
+            self._db.commit()
+            if session.expected_sha256:
+                # Несовпадение могло дать переписанное содержимое — следующая попытка считает заново
+                _hashers.discard(session.id)
+            raise
+
+        _hashers.discard(session.id)
+        self._db.refresh(rag_file)
+        logger.info("Загрузка %s завершена: file_id=%s, %s байт", session.id, rag_file.id, rag_file.size_bytes)
+        return rag_file
+
+    def abort(self, session_id: str) -> bool:
+        session = self.get_session(session_id)
+        if session is None:
+            return False
+        if session.status == "completed":
+            raise ValueError(SESSION_COMPLETED)
+        if session.status != "open":
+            raise ValueError(SESSION_COMPLETING)
+        return _remove_unfinished_session(self._db, session, condition=RagUploadSession.status == "open")
+
+
+def _remove_file_dir(local_path: str) -> None:
+    # Каталог файла (<FILES_ROOT>/<domain>/<file_id>) — только внутри FILES_ROOT
+    files_root = Path(get_config().files_root).resolve()
+    file_dir = Path(local_path).parent.parent.resolve()
+    if file_dir == files_root or files_root not in file_dir.parents:
+        logger.warning("Каталог сессии загрузки вне FILES_ROOT, не удаляется: %s", file_dir)
+        return
+    shutil.rmtree(file_dir, ignore_errors=True)
+
+
+def _remove_unfinished_session(db: Session, session: RagUploadSession, *, condition) -> bool:
+    # Условное удаление: кусок, продливший сессию между выборкой и удалением, её сохраняет
+    session_id, local_path = session.id, session.local_path
+    res = db.execute(
+        delete(RagUploadSession)
+        .where(RagUploadSession.id == session_id, condition)
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount != 1:
+        db.rollback()
+        return False
+    db.execute(delete(RagUploadChunk).where(RagUploadChunk.session_id == session_id))
+    db.commit()
+    _hashers.discard(session_id)
+    _remove_file_dir(local_path)
+    return True
+
+
+def collect_expired_upload_sessions(db: Session, *, now: datetime | None = None) -> dict:
+    # Брошенные сессии удаляются вместе с недописанным файлом; у завершённых — только запись сессии
+    now = now or datetime.utcnow()
+    stats = {"aborted": 0, "completed": 0}
+
+    expired = (
+        db.query(RagUploadSession)
+        .filter(RagUploadSession.expires_at <= now)
+        .order_by(RagUploadSession.expires_at.asc())
+        .limit(_GC_BATCH_SIZE)
+        .all()
+    )
+    for session in expired:
+        if session.status in _UNFINISHED_STATUSES:
+            condition = (RagUploadSession.status.in_(_UNFINISHED_STATUSES)) & (RagUploadSession.expires_at <= now)
+            if _remove_unfinished_session(db, session, condition=condition):
+                stats["aborted"] += 1
+        else:
+            db.execute(
+                delete(RagUploadSession)
+                .where(RagUploadSession.id == session.id)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            stats["completed"] += 1
+
+    if stats["aborted"]:
+        logger.info("Удалено брошенных сессий загрузки: %s", stats["aborted"])
+    count_items("upload_sessions_gc", **stats)
+    return stats
+
+
+_gc_stop = threading.Event()
+_gc_thread: threading.Thread | None = None
+
+
+def _gc_loop(interval_seconds: float) -> None:
+    session_local = get_session_maker()
+    while not _gc_stop.wait(interval_seconds):
+        db = session_local()
+        try:
+            # Пачками, пока есть что удалять
+            while not _gc_stop.is_set() and any(collect_expired_upload_sessions(db).values()):
+                pass
+        except Exception:
+            logger.exception("Сборка брошенных сессий загрузки: ошибка")
+        finally:
+            db.close()
+
+
+def start_upload_sessions_gc() -> None:
+    global _gc_thread
+
+    config = get_config()
+    if config.upload_sessions_gc_interval_seconds <= 0 or _gc_thread is not None:
+        return
+
+    _gc_stop.clear()
+    _gc_thread = threading.Thread(
+        target=_gc_loop,
+        args=(float(config.upload_sessions_gc_interval_seconds),),
+        name="upload-sessions-gc",
+        daemon=True,
+    )
+    _gc_thread.start()
+
+
+def stop_upload_sessions_gc(timeout: float = 10.0) -> None:
+    global _gc_thread
+
+    _gc_stop.set()
+    if _gc_thread is not None:
+        _gc_thread.join(timeout)
+        _gc_thread = None
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{item_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at_str, item_id = raw.split("|", 1)
+        created_at = datetime.fromisoformat(created_at_str)
+    except (ValueError, UnicodeError, binascii.Error) as e:
+        raise ValueError("Некорректный курсор") from e
+
+    if not item_id:
+        raise ValueError("Некорректный курсор")
+    return created_at, item_id
+
+
+def after_cursor_filter(created_at_column, id_column, cursor: str):
+    # Условие «строго после курсора» для сортировки (created_at DESC, id DESC).
+    # Развёрнутая форма через OR, а не сравнение кортежей: так MariaDB использует индекс.
+    created_at, item_id = decode_cursor(cursor)
+    return or_(
+        created_at_column < created_at,
+        and_(created_at_column == created_at, id_column < item_id),
+    )
+
+
+def next_cursor(items: list, limit: int) -> str | None:
+    if limit <= 0 or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+# Отдача файла с диска: сильный ETag из SHA-256 содержимого, условные запросы (304),
+# Range и multipart/byteranges (206) из FileResponse Starlette, нулевое копирование там, где его даёт сервер:
+# http.response.pathsend — файл целиком, http.response.zerocopysend (os.sendfile) — файл и диапазон.
+# Без расширений файл читается в потоках пула блоками download_chunk_size_bytes.
+
+from email.utils import parsedate_to_datetime
+import os
+
+import anyio.to_thread
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+_ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+# Заголовки, которые повторяются в ответе 304 (RFC 9110, 15.4.5)
+_NOT_MODIFIED_HEADERS = ("etag", "last-modified", "cache-control", "vary")
+
+
+def _opaque_tag(tag: str) -> str:
+    # Слабое сравнение (для If-None-Match): префикс W/ не учитывается
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+class ContentFileResponse(FileResponse):
+    def __init__(
+        self,
+        path: str,
+        *,
+        stat_result: os.stat_result,
+        content_sha256: str | None,
+        chunk_size: int,
+        filename: str | None = None,
+        media_type: str | None = None,
+        background: BackgroundTask | None = None,
+    ) -> None:
+        # Без хеша остаётся ETag Starlette из mtime и размера — слабый, он не подходит для If-Range
+        headers = {"cache-control": "private, no-cache"}
+        if content_sha256:
+            headers["etag"] = f'"{content_sha256}"'
+        super().__init__(
+            path,
+            headers=headers,
+            media_type=media_type,
+            filename=filename,
+            stat_result=stat_result,
+            background=background,
+        )
+        if not content_sha256:
+            self.headers["etag"] = "W/" + self.headers["etag"]
+        self.chunk_size = max(64 * 1024, chunk_size)
+        self._zerocopy = False
+
+    def is_not_modified(self, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            # Если есть If-None-Match, If-Modified-Since не проверяется
+            etag = _opaque_tag(self.headers["etag"])
+            return any(tag.strip() == "*" or _opaque_tag(tag) == etag for tag in if_none_match.split(","))
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since and self.stat_result is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return int(self.stat_result.st_mtime) <= since.timestamp()
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and self.status_code == 200 and self.is_not_modified(Headers(scope=scope)):
+            headers = {name: self.headers[name] for name in _NOT_MODIFIED_HEADERS if name in self.headers}
+            await Response(status_code=304, headers=headers, background=self.background)(scope, receive, send)
+            return
+
+        self._zerocopy = _ZEROCOPY_EXTENSION in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _handle_simple(self, send: Send, send_header_only: bool, send_pathsend: bool) -> None:
+        if send_header_only or send_pathsend or not self._zerocopy:
+            await super()._handle_simple(send, send_header_only, send_pathsend)
+            return
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await self._send_zerocopy(send, 0, self.stat_result.st_size)
+
+    async def _handle_single_range(
+        self, send: Send, start: int, end: int, file_size: int, send_header_only: bool
+    ) -> None:
+        if send_header_only or not self._zerocopy:
+            await super()._handle_single_range(send, start, end, file_size, send_header_only)
+            return
+        headers = MutableHeaders(raw=list(self.raw_headers))
+        headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": headers.raw})
+        await self._send_zerocopy(send, start, end - start)
+
+    async def _send_zerocopy(self, send: Send, offset: int, count: int) -> None:
+        # Сервер сам вызывает os.sendfile по дескриптору: данные не проходят через Python
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            await send(
+                {
+                    "type": _ZEROCOPY_EXTENSION,
+                    "file": file,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": False,
+                }
+            )
+        finally:
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(file.close)
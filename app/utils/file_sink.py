@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+# Потоковая запись тела запроса в файл из асинхронного обработчика: куски, пришедшие из сокета,
+# копятся без склейки и уходят на диск одним writev в потоке пула, там же обновляется SHA-256.
+# Цикл событий не ждёт диск, а данные копируются только ядром — из буфера запроса в page cache.
+
+import hashlib
+import os
+
+import anyio.to_thread
+
+# writev принимает не больше IOV_MAX буферов за вызов (обычно 1024)
+_MAX_PARTS_PER_WRITE = 512
+
+
+def _writev_all(fd: int, parts: list[memoryview]) -> None:
+    # Частичная запись возможна и для обычных файлов (диск заполнен, сигнал) — дописываем остаток
+    if not hasattr(os, "writev"):
+        for part in parts:
+            while part:
+                part = part[os.write(fd, part):]
+        return
+
+    while parts:
+        written = os.writev(fd, parts)
+        while parts and written >= len(parts[0]):
+            written -= len(parts[0])
+            parts.pop(0)
+        if written:
+            parts[0] = parts[0][written:]
+
+
+class FileSink:
+    # Открывается через FileSink.open (в потоке пула), пишется через write, закрывается через close.
+    # size и sha256 доступны после close; abort закрывает файл без досылки буфера.
+
+    def __init__(self, fd: int, *, buffer_size: int, trim_on_close: bool) -> None:
+        self._fd = fd
+        self._buffer_size = max(64 * 1024, buffer_size)
+        self._trim_on_close = trim_on_close
+        self._parts: list[memoryview] = []
+        self._pending = 0
+        self._sha = hashlib.sha256()
+        self._closed = False
+        self.size = 0
+
+    @classmethod
+    async def open(
+        cls,
+        path: str,
+        *,
+        offset: int | None = None,
+        buffer_size: int,
+        preallocate: int = 0,
+    ) -> FileSink:
+        # offset=None — новый файл (с предвыделением места, если задано),
+        # иначе существующий файл открывается на запись с указанного смещения
+        fd = await anyio.to_thread.run_sync(_open_fd, path, offset, preallocate)
+        # Новый файл при закрытии обрезается до записанного — и после предвыделения, и после его сбоя;
+        # существующий (кусок возобновляемой загрузки) не трогается
+        return cls(fd, buffer_size=buffer_size, trim_on_close=offset is None)
+
+    @property
+    def sha256(self) -> str:
+        return self._sha.hexdigest()
+
+    @property
+    def pending(self) -> int:
+        # Принято, но ещё не записано на диск
+        return self._pending
+
+    async def write(self, data: bytes | bytearray | memoryview) -> None:
+        if not data:
+            return
+        # Изменяемые буферы могут переиспользоваться вызывающим — их приходится копировать
+        if isinstance(data, bytearray):
+            data = bytes(data)
+        view = data if isinstance(data, memoryview) else memoryview(data)
+        self._parts.append(view)
+        self._pending += len(view)
+        if self._pending >= self._buffer_size or len(self._parts) >= _MAX_PARTS_PER_WRITE:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._parts:
+            return
+        parts, size = self._parts, self._pending
+        self._parts, self._pending = [], 0
+        await anyio.to_thread.run_sync(self._write_parts, parts)
+        self.size += size
+
+    def _write_parts(self, parts: list[memoryview]) -> None:
+        for part in parts:
+            self._sha.update(part)
+        _writev_all(self._fd, parts)
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        try:
+            await self.flush()
+        finally:
+            self._closed = True
+            await anyio.to_thread.run_sync(self._close_fd, self.size)
+
+    async def abort(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._parts, self._pending = [], 0
+        # Недописанный файл тоже обрезается: предвыделенное место освобождается сразу,
+        # даже если вызывающий удалит файл позже
+        await anyio.to_thread.run_sync(self._close_fd, self.size)
+
+    def _close_fd(self, size: int) -> None:
+        try:
+            # Место предвыделялось по верхней оценке (Content-Length с разметкой multipart) или
+            # posix_fallocate упал на полпути — файл всегда равен записанному
+            if self._trim_on_close:
+                os.ftruncate(self._fd, size)
+        finally:
+            os.close(self._fd)
+
+
+def _open_fd(path: str, offset: int | None, preallocate: int) -> int:
+    if offset is not None:
+        fd = os.open(path, os.O_WRONLY | getattr(os, "O_BINARY", 0))
+        os.lseek(fd, offset, os.SEEK_SET)
+        return fd
+
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    if preallocate > 0 and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, preallocate)
+        except OSError:
+            # ФС без поддержки предвыделения или нет места под оценку — пишем без него;
+            # частично выделенное место уберёт ftruncate при закрытии
+            pass
+    return fd
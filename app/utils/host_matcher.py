@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from functools import lru_cache
+import ipaddress
+
+_DEFAULT_CACHE_SIZE = 4096
+
+
+class HostMatcher:
+    # Список разрешённых хостов, скомпилированный один раз:
+    # - точные значения (имена хостов и отдельные IP) — множество;
+    # - CIDR-диапазоны — по каждой длине префикса множество префиксов (IP >> (bits - prefixlen)).
+    # Проверка адреса — не больше одного поиска в множестве на каждую встречающуюся длину префикса,
+    # т.е. O(длины префикса) независимо от размера списка. Решения кешируются (LRU).
+
+    def __init__(self, entries: Iterable[str], *, cache_size: int = _DEFAULT_CACHE_SIZE) -> None:
+        self._exact: set[str] = set()
+        prefixes: dict[int, dict[int, set[int]]] = {4: {}, 6: {}}
+
+        for raw in entries:
+            entry = raw.strip().lower()
+            if not entry:
+                continue
+
+            if "/" in entry:
+                try:
+                    network = ipaddress.ip_network(entry, strict=False)
+                except ValueError as e:
+                    raise ValueError(f"Некорректный CIDR в списке хостов: {raw}") from e
+                shift = network.max_prefixlen - network.prefixlen
+                prefixes[network.version].setdefault(network.prefixlen, set()).add(
+                    int(network.network_address) >> shift
+                )
+                continue
+
+            self._exact.add(_normalize_ip(entry) or entry)
+
+        # Сначала более длинные префиксы — чаще всего это точечные диапазоны
+        self._prefixes: dict[int, list[tuple[int, frozenset[int]]]] = {
+            version: [
+                (
+                    (32 if version == 4 else 128) - prefixlen,
+                    frozenset(values),
+                )
+                for prefixlen, values in sorted(by_len.items(), reverse=True)
+            ]
+            for version, by_len in prefixes.items()
+        }
+
+        self._match_cached = lru_cache(maxsize=cache_size)(self._match)
+
+    def __bool__(self) -> bool:
+        return bool(self._exact or self._prefixes[4] or self._prefixes[6])
+
+    def matches(self, host: str | None) -> bool:
+        if not host:
+            return False
+        return self._match_cached(host.strip().lower())
+
+    def cache_stats(self) -> tuple[int, int, int]:
+        info = self._match_cached.cache_info()
+        return info.hits, info.misses, info.currsize
+
+    def _match(self, host: str) -> bool:
+        if host in self._exact:
+            return True
+
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+
+        if str(address) in self._exact:
+            return True
+
+        value = int(address)
+        for shift, values in self._prefixes[address.version]:
+            if (value >> shift) in values:
+                return True
+
+        return False
+
+
+def _normalize_ip(value: str) -> str | None:
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    return str(address)
+
+
+def split_host_header(host: str | None) -> str | None:
+    if not host:
+        return None
+
+    host = host.strip()
+    if host.startswith("["):
+        # IPv6: [::1]:8000
+        end = host.find("]")
+        return host[1:end] if end > 0 else host
+
+    if host.count(":") == 1:
+        return host.split(":", 1)[0]
+    return host
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal
+import json
+from typing import Any
+from uuid import UUID
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson опционален
+    orjson = None
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z) if orjson is not None else 0
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    # Ответ по умолчанию для приложения: orjson (если установлен), иначе стандартный json.
+    # Помимо готовых к JSON значений принимает datetime/UUID/Decimal — для быстрых путей из ORM-строк.
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
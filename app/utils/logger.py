@@ -1,12 +1,25 @@
+import atexit
+from datetime import datetime, timezone
+import itertools
 import logging
+from logging.handlers import QueueHandler, QueueListener
 import os
 from pathlib import Path
+import queue
 
 from config import Config
+from utils.json_response import dumps
 from utils.request_context import get_request_id
 
 
 _log_record_factory_configured = False
+_queue_listener: QueueListener | None = None
+
+_payload_max_chars = 2000
+_payload_sample_every = 1
+_payload_counter = itertools.count()
+
+SAMPLED_OUT = "<sampled>"
 
 
 def _configure_log_record_factory() -> None:
@@ -26,12 +39,101 @@ def _configure_log_record_factory() -> None:
     _log_record_factory_configured = True
 
 
+# Стандартные атрибуты LogRecord; всё остальное (extra=...) JSON-форматтер выводит как поля
+_STANDARD_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    # Одна запись — один JSON-объект в строке (LOG_FORMAT=json)
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, object] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc_info"] = record.exc_text
+        return dumps(data).decode("utf-8")
+
+
+def _make_formatter(log_format: str) -> logging.Formatter:
+    if log_format.strip().lower() == "json":
+        return JsonFormatter()
+    return logging.Formatter(log_format)
+
+
+class LazyPayload:
+    # Payload провайдера для подстановки в %s: сериализуется только при фактической записи
+    # (уровень включён) и обрезается до LOG_PAYLOAD_MAX_CHARS символов.
+    __slots__ = ("_payload", "_max_chars")
+
+    def __init__(self, payload: object, max_chars: int) -> None:
+        self._payload = payload
+        self._max_chars = max_chars
+
+    def __str__(self) -> str:
+        try:
+            text = dumps(self._payload).decode("utf-8")
+        except Exception:
+            text = str(self._payload)
+        if self._max_chars > 0 and len(text) > self._max_chars:
+            return f"{text[: self._max_chars]}...(+{len(text) - self._max_chars} chars)"
+        return text
+
+    __repr__ = __str__
+
+
+def log_payload(payload: object, *, sample: bool = True) -> LazyPayload | str:
+    # sample=True — для массовых INFO-логов (по каждому vector store / файлу): при
+    # LOG_PAYLOAD_SAMPLE_EVERY=N тело пишется только для каждого N-го вызова, строка лога остаётся.
+    if sample and _payload_sample_every > 1 and next(_payload_counter) % _payload_sample_every:
+        return SAMPLED_OUT
+    return LazyPayload(payload, _payload_max_chars)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # Стандартный QueueHandler.prepare форматирует сообщение в потоке запроса. Если среди аргументов
+    # есть LazyPayload, рендеринг переносится в поток QueueListener; остальные записи готовятся как обычно
+    # (аргументы могут меняться после вызова логгера).
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if isinstance(args, tuple) and any(isinstance(arg, LazyPayload) for arg in args):
+            if record.exc_info and not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+            return record
+        return super().prepare(record)
+
+
+def stop_logging() -> None:
+    global _queue_listener
+
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
 def configure_logging(config: Config) -> logging.Logger:
+    global _queue_listener, _payload_max_chars, _payload_sample_every
+
     _configure_log_record_factory()
+    stop_logging()
+
+    _payload_max_chars = config.log_payload_max_chars
+    _payload_sample_every = max(1, config.log_payload_sample_every)
 
     handlers: list[logging.Handler] = []
 
-    formatter = logging.Formatter(config.log_format)
+    formatter = _make_formatter(config.log_format)
 
     if config.log_file:
         log_path = Path(config.log_file)
@@ -52,7 +154,17 @@ def configure_logging(config: Config) -> logging.Logger:
     for handler in list(root_logger.handlers):
         root_logger.removeHandler(handler)
 
-    for handler in handlers:
-        root_logger.addHandler(handler)
+    if config.log_queue_enabled and handlers:
+        # Поток запроса только кладёт запись в очередь; запись в файл/консоль — в потоке QueueListener
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        root_logger.addHandler(_DeferredQueueHandler(log_queue))
+        _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _queue_listener.start()
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
 
     return logging.getLogger("vector-stores")
+
+
+atexit.register(stop_logging)
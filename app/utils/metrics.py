@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+import functools
+import math
+import threading
+import time
+
+# Минимальный реестр метрик в текстовом формате Prometheus (exposition format 0.0.4).
+# Значения хранятся в памяти процесса: при нескольких воркерах uvicorn каждый отдаёт свои.
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICS_PREFIX = "vector_stores_"
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LONG_OPERATION_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0)
+
+Sample = tuple[str, dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape_label_value(str(v))}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = METRICS_PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], object] = {}
+
+    def _child(self, labelvalues: tuple[str, ...]):
+        raise NotImplementedError
+
+    def labels(self, *labelvalues: object):
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name}: ожидается {len(self.labelnames)} меток")
+        key = tuple("" if v is None else str(v) for v in labelvalues)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._child(key)
+                    self._children[key] = child
+        return child
+
+    def samples(self) -> Iterator[Sample]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def _child(self, labelvalues: tuple[str, ...]) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterator[Sample]:
+        for key, child in list(self._children.items()):
+            yield self.name + "_total", dict(zip(self.labelnames, key)), child.value
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_upper_bounds", "bucket_counts", "count", "sum")
+
+    def __init__(self, upper_bounds: tuple[float, ...]) -> None:
+        self._lock = threading.Lock()
+        self._upper_bounds = upper_bounds
+        self.bucket_counts = [0] * len(upper_bounds)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            for i, bound in enumerate(self._upper_bounds):
+                if value <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        bounds = sorted(float(b) for b in buckets)
+        if not bounds or not math.isinf(bounds[-1]):
+            bounds.append(math.inf)
+        self._upper_bounds = tuple(bounds)
+
+    def _child(self, labelvalues: tuple[str, ...]) -> _HistogramChild:
+        return _HistogramChild(self._upper_bounds)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[Sample]:
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            with child._lock:
+                bucket_counts = list(child.bucket_counts)
+                count = child.count
+                total = child.sum
+
+            cumulative = 0
+            for bound, bucket_count in zip(self._upper_bounds, bucket_counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield self.name + "_count", labels, count
+            yield self.name + "_sum", labels, total
+
+
+class CallbackGauge(_Metric):
+    # Значения вычисляются в момент выдачи /metrics (состояние пула БД, размеры кешей и т.п.)
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str],
+        callback: Callable[[], Iterable[tuple[tuple[str, ...], float]]],
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._callback = callback
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in self._callback():
+            yield self.name, dict(zip(self.labelnames, key)), float(value)
+
+
+class CallbackCounter(CallbackGauge):
+    metric_type = "counter"
+
+    def samples(self) -> Iterator[Sample]:
+        for name, labels, value in super().samples():
+            yield name + "_total", labels, value
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                # Сбой одного источника (например, БД недоступна) не должен ломать всю выдачу
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Iterable[str] = (),
+    buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def callback_gauge(
+    name: str,
+    documentation: str,
+    labelnames: Iterable[str],
+    callback: Callable[[], Iterable[tuple[tuple[str, ...], float]]],
+) -> CallbackGauge:
+    return REGISTRY.register(CallbackGauge(name, documentation, labelnames, callback))
+
+
+def callback_counter(
+    name: str,
+    documentation: str,
+    labelnames: Iterable[str],
+    callback: Callable[[], Iterable[tuple[tuple[str, ...], float]]],
+) -> CallbackCounter:
+    return REGISTRY.register(CallbackCounter(name, documentation, labelnames, callback))
+
+
+# Общие метрики приложения
+
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса по шаблону маршрута",
+    ("method", "route", "status"),
+)
+
+PROVIDER_CALL_SECONDS = histogram(
+    "provider_call_duration_seconds",
+    "Время вызова метода провайдера",
+    ("provider_type", "method"),
+)
+
+PROVIDER_CALL_ERRORS = counter(
+    "provider_call_errors",
+    "Ошибки вызовов методов провайдера",
+    ("provider_type", "method", "error"),
+)
+
+OPERATION_SECONDS = histogram(
+    "operation_duration_seconds",
+    "Длительность операций публикации/синхронизации/поиска",
+    ("operation", "outcome"),
+    buckets=LONG_OPERATION_BUCKETS,
+)
+
+OPERATION_ITEMS = counter(
+    "operation_items",
+    "Количество обработанных элементов в операциях публикации/синхронизации",
+    ("operation", "kind"),
+)
+
+_caches: dict[str, Callable[[], tuple[int, int, int]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], tuple[int, int, int]]) -> None:
+    # stats() -> (hits, misses, size); доля попаданий считается в Prometheus: hits / (hits + misses)
+    _caches[name] = stats
+
+
+def _cache_samples(index: int):
+    for name, stats in list(_caches.items()):
+        yield (name,), stats()[index]
+
+
+callback_counter("cache_hits", "Попадания в кеши приложения", ("cache",), lambda: _cache_samples(0))
+callback_counter("cache_misses", "Промахи кешей приложения", ("cache",), lambda: _cache_samples(1))
+callback_gauge("cache_size", "Текущий размер кешей приложения", ("cache",), lambda: _cache_samples(2))
+
+
+@contextmanager
+def track_operation(operation: str):
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        OPERATION_SECONDS.labels(operation, outcome).observe(time.perf_counter() - started)
+
+
+def timed_operation(operation: str):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track_operation(operation):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count_items(operation: str, **counts: int) -> None:
+    for kind, value in counts.items():
+        if value:
+            OPERATION_ITEMS.labels(operation, kind).inc(value)
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
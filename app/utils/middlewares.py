@@ -1,73 +1,234 @@
 import logging
+import time
 from uuid import uuid4
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.responses import JSONResponse
-
-from utils.request_context import get_request_id, reset_request_id, set_request_id
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.host_matcher import HostMatcher, split_host_header
+from utils.metrics import HTTP_REQUEST_SECONDS, register_cache
+from utils.request_context import (
+    get_request_id,
+    reset_request_id,
+    reset_request_stats,
+    set_request_id,
+    start_request_stats,
+)
+from utils.tracing import (
+    format_server_timing,
+    get_tracer,
+    parse_traceparent,
+    reset_request_timings,
+    start_request_timings,
+)
 
 
 _request_logger = logging.getLogger("vector-stores.request")
 
 
-class RequestIdMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request_id = request.headers.get("X-Request-Id") or str(uuid4())
+# Чистые ASGI middleware (без BaseHTTPMiddleware): не создают отдельных задач и потоков памяти
+# на каждый запрос и не ломают StreamingResponse / BackgroundTasks.
+
+
+class RequestIdMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = headers.get("x-request-id") or str(uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        started = time.perf_counter()
+        status_code: int | str = "unknown"
+        response_bytes = 0
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = MutableHeaders(scope=message)
+                response_headers["X-Request-Id"] = request_id
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            elif message["type"] == "http.response.zerocopysend":
+                response_bytes += message.get("count") or 0
+            await send(message)
 
         token = set_request_id(request_id)
+        stats, stats_token = start_request_stats()
         try:
-            request.state.request_id = request_id
-            response = await call_next(request)
-            response.headers["X-Request-Id"] = request_id
+            await self.app(scope, receive, send_with_request_id)
+            duration_ms = (time.perf_counter() - started) * 1000
+            route = getattr(scope.get("route"), "path", None)
+            # Поля access-лога доступны форматтеру как атрибуты записи (LOG_FORMAT=json выводит их все)
             _request_logger.info(
-                "%s %s -> %s",
-                request.method,
-                request.url.path,
-                getattr(response, "status_code", "unknown"),
+                "%s %s -> %s %.1fms",
+                scope["method"],
+                scope["path"],
+                status_code,
+                duration_ms,
+                extra={
+                    "http_method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 3),
+                    "bytes": response_bytes,
+                    "domain_id": headers.get("x-domain-id"),
+                    "provider_ms": round(stats.provider_ms, 3),
+                    "provider_calls": stats.provider_calls,
+                    "db_ms": round(stats.db_ms, 3),
+                    "db_queries": stats.db_queries,
+                },
             )
-            return response
         finally:
+            reset_request_stats(stats_token)
             reset_request_id(token)
 
 
-class AllowHostsMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, allow_hosts: list[str] | None = None):
-        super().__init__(app)
-        self._allow_hosts = [h.strip() for h in (allow_hosts or []) if h.strip()]
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-    def _get_client_ip(self, request: Request) -> str | None:
-        x_forwarded_for = request.headers.get("x-forwarded-for")
-        if x_forwarded_for:
-            first = x_forwarded_for.split(",", 1)[0].strip()
-            if first:
-                return first
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Шаблон маршрута, а не фактический путь — иначе кардинальность меток не ограничена
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route_path, status_code).observe(
+                time.perf_counter() - started
+            )
 
-        x_real_ip = request.headers.get("x-real-ip")
+
+class TracingMiddleware:
+    # Корневой спан запроса + заголовок Server-Timing с самыми долгими фазами (по именам спанов).
+    # Должен стоять внутри RequestIdMiddleware, чтобы спаны получили request_id.
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True, server_timing_limit: int = 5) -> None:
+        self.app = app
+        self._server_timing = server_timing
+        self._server_timing_limit = server_timing_limit
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, parent_span_id = parse_traceparent(Headers(scope=scope).get("traceparent"))
+        timings, timings_token = start_request_timings()
+
+        try:
+            with get_tracer().start_as_current_span(
+                f'{scope["method"]} {scope["path"]}',
+                {"http.method": scope["method"], "http.target": scope["path"]},
+                trace_id=trace_id,
+                parent_span_id=parent_span_id,
+            ) as span:
+
+                async def send_with_server_timing(message: Message) -> None:
+                    if message["type"] == "http.response.start":
+                        span.set_attribute("http.status_code", message["status"])
+                        if self._server_timing:
+                            value = f"app;dur={span.duration_ms:.1f}"
+                            phases = format_server_timing(timings, limit=self._server_timing_limit)
+                            if phases:
+                                value = f"{value}, {phases}"
+                            MutableHeaders(scope=message).append("Server-Timing", value)
+                    await send(message)
+
+                await self.app(scope, receive, send_with_server_timing)
+
+                route = scope.get("route")
+                route_path = getattr(route, "path", None)
+                if route_path:
+                    span.name = f'{scope["method"]} {route_path}'
+                    span.set_attribute("http.route", route_path)
+        finally:
+            reset_request_timings(timings_token)
+
+
+class AllowHostsMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        allow_hosts: list[str] | None = None,
+        trusted_proxies: list[str] | None = None,
+    ) -> None:
+        self.app = app
+        self._allow_hosts = HostMatcher(allow_hosts or [])
+        self._trusted_proxies = HostMatcher(trusted_proxies) if trusted_proxies else None
+
+        register_cache("allow_hosts", self._allow_hosts.cache_stats)
+        if self._trusted_proxies is not None:
+            register_cache("trusted_proxies", self._trusted_proxies.cache_stats)
+
+    def _get_client_ip(self, scope: Scope, headers: Headers) -> str | None:
+        client = scope.get("client")
+        peer_ip = client[0] if client else None
+
+        if self._trusted_proxies is not None and not self._trusted_proxies.matches(peer_ip):
+            # Прямое подключение не от доверенного прокси — заголовкам не верим
+            return peer_ip
+
+        x_forwarded_for = headers.get("x-forwarded-for")
+        if x_forwarded_for:
+            hops = [hop.strip() for hop in x_forwarded_for.split(",") if hop.strip()]
+            if hops:
+                if self._trusted_proxies is None:
+                    return hops[0]
+                # Идём справа налево, пропуская доверенные прокси: первый недоверенный — клиент
+                for hop in reversed(hops):
+                    if not self._trusted_proxies.matches(hop):
+                        return hop
+                return hops[0]
+
+        x_real_ip = headers.get("x-real-ip")
         if x_real_ip:
             x_real_ip = x_real_ip.strip()
             if x_real_ip:
                 return x_real_ip
 
-        return request.client.host if request.client else None
-
-    async def dispatch(self, request: Request, call_next):
-        if not self._allow_hosts:
-            return await call_next(request)
+        return peer_ip
 
-        client_host = self._get_client_ip(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._allow_hosts:
+            await self.app(scope, receive, send)
+            return
 
-        header_host = request.headers.get("host")
-        if header_host and ":" in header_host:
-            header_host = header_host.split(":", 1)[0]
+        headers = Headers(scope=scope)
+        client_host = self._get_client_ip(scope, headers)
+        header_host = split_host_header(headers.get("host"))
 
-        if client_host not in self._allow_hosts and header_host not in self._allow_hosts:
-            return JSONResponse(
+        if not self._allow_hosts.matches(client_host) and not self._allow_hosts.matches(header_host):
+            response = JSONResponse(
                 status_code=403,
                 content={
                     "detail": "Host not allowed",
                     "request_id": get_request_id(),
                 },
             )
+            await response(scope, receive, send)
+            return
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
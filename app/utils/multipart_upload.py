@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+# Разбор multipart/form-data по мере чтения тела запроса: единственная файловая часть пишется
+# сразу в итоговый файл (FileSink), без SpooledTemporaryFile, который использует Starlette.
+# Обычные поля формы собираются в память с ограничением размера.
+
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+
+try:
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # pragma: no cover - старые версии python-multipart
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from utils.file_sink import FileSink
+
+FILE_TOO_LARGE = "Файл больше допустимого размера"
+
+_MAX_FIELD_BYTES = 1024 * 1024
+_MAX_FIELDS = 100
+
+# (имя файла, Content-Type части) -> открытый FileSink
+OpenSink = Callable[[str, str | None], Awaitable[FileSink]]
+
+
+@dataclass
+class StreamedUpload:
+    fields: dict[str, str] = field(default_factory=dict)
+    filename: str | None = None
+    content_type: str | None = None
+    sink: FileSink | None = None
+
+
+@dataclass
+class _Part:
+    name: str = ""
+    filename: str | None = None
+    content_type: str | None = None
+    is_file: bool = False
+    data: bytearray = field(default_factory=bytearray)
+
+
+def _decode(value: bytes) -> str:
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return value.decode("latin-1")
+
+
+class _Collector:
+    # Колбэки парсера синхронные, а запись файла — асинхронная, поэтому колбэки только
+    # складывают события, а разбирает их цикл чтения после каждого parser.write()
+    def __init__(self, file_field: str) -> None:
+        self.file_field = file_field
+        self.fields: dict[str, str] = {}
+        self.events: list[tuple[str, object]] = []
+        self._part = _Part()
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+        self._file_seen = False
+
+    def on_part_begin(self) -> None:
+        self._part = _Part()
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise ValueError("В части multipart нет имени поля (Content-Disposition name)")
+        part = self._part
+        part.name = _decode(options[b"name"])
+        if part.name == self.file_field:
+            if self._file_seen:
+                raise ValueError(f"Поле {self.file_field} передано больше одного раза")
+            self._file_seen = True
+            part.is_file = True
+            part.filename = _decode(options[b"filename"]) if b"filename" in options else None
+            content_type = self._headers.get(b"content-type")
+            part.content_type = _decode(content_type).strip() if content_type else None
+            self.events.append(("file_begin", part))
+        elif len(self.fields) >= _MAX_FIELDS:
+            raise ValueError("Слишком много полей формы")
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._part.is_file:
+            # Парсер отдаёт срезы неизменяемых кусков запроса (bytes) — берём их без копирования;
+            # изменяемый буфер мог бы переиспользоваться, поэтому его срез копируется
+            chunk = memoryview(data)[start:end] if isinstance(data, bytes) else bytes(data[start:end])
+            self.events.append(("file_data", chunk))
+            return
+        if len(self._part.data) + (end - start) > _MAX_FIELD_BYTES:
+            raise ValueError(f"Поле {self._part.name} больше {_MAX_FIELD_BYTES // 1024} КиБ")
+        self._part.data += data[start:end]
+
+    def on_part_end(self) -> None:
+        if not self._part.is_file:
+            self.fields[self._part.name] = _decode(bytes(self._part.data))
+
+    def on_end(self) -> None:
+        pass
+
+
+async def receive_multipart_file(
+    content_type: str | None,
+    stream: AsyncIterator[bytes],
+    open_sink: OpenSink,
+    *,
+    file_field: str = "file",
+    max_file_bytes: int = 0,
+) -> StreamedUpload:
+    # Возвращает поля формы и закрытый FileSink с размером и SHA-256 файла.
+    # max_file_bytes > 0 — предел размера файла (ValueError(FILE_TOO_LARGE), как только он превышен).
+    # Ошибки разметки и лимитов — ValueError; при любой ошибке открытый файл закрывается,
+    # а удалить его (путь выбирал open_sink) должен вызывающий.
+    media_type, params = parse_options_header(content_type or "")
+    if media_type != b"multipart/form-data":
+        raise ValueError("Ожидается multipart/form-data")
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise ValueError("В multipart/form-data не указан boundary")
+
+    collector = _Collector(file_field)
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_part_begin": collector.on_part_begin,
+            "on_part_data": collector.on_part_data,
+            "on_part_end": collector.on_part_end,
+            "on_header_field": collector.on_header_field,
+            "on_header_value": collector.on_header_value,
+            "on_header_end": collector.on_header_end,
+            "on_headers_finished": collector.on_headers_finished,
+            "on_end": collector.on_end,
+        },
+    )
+
+    result = StreamedUpload()
+    try:
+        async for chunk in stream:
+            try:
+                parser.write(chunk)
+            except FormParserError as e:
+                raise ValueError("Некорректные данные multipart/form-data") from e
+            for kind, payload in collector.events:
+                if kind == "file_begin":
+                    result.filename = payload.filename
+                    result.content_type = payload.content_type
+                    result.sink = await open_sink(payload.filename or "file", payload.content_type)
+                else:
+                    if max_file_bytes > 0 and result.sink.size + result.sink.pending + len(payload) > max_file_bytes:
+                        raise ValueError(FILE_TOO_LARGE)
+                    await result.sink.write(payload)
+            collector.events.clear()
+        try:
+            parser.finalize()
+        except FormParserError as e:
+            raise ValueError("Некорректные данные multipart/form-data") from e
+
+        if result.sink is None:
+            raise ValueError(f"Поле {file_field} обязательно")
+        await result.sink.close()
+    except BaseException:
+        if result.sink is not None:
+            await result.sink.abort()
+        raise
+
+    result.fields = collector.fields
+    return result
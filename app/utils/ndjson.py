@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+import logging
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from utils.json_response import dumps
+from utils.request_context import get_request_id
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+logger = logging.getLogger("vector-stores.ndjson")
+
+
+def wants_ndjson(request: Request) -> bool:
+    accept = request.headers.get("accept") or ""
+    for part in accept.split(","):
+        media_type = part.split(";", 1)[0].strip().lower()
+        if media_type == NDJSON_MEDIA_TYPE:
+            return True
+    return False
+
+
+def _dump_row(row: object) -> bytes:
+    if isinstance(row, BaseModel):
+        return row.model_dump_json().encode("utf-8")
+    return dumps(row)
+
+
+def _iter_lines(rows: Iterable[object]) -> Iterator[bytes]:
+    try:
+        for row in rows:
+            yield _dump_row(row) + b"\n"
+    except Exception as e:
+        # Заголовки уже отправлены — сообщаем об ошибке последней строкой потока
+        logger.exception("Ошибка формирования NDJSON потока")
+        yield _dump_row({"type": "error", "detail": str(e), "request_id": get_request_id()}) + b"\n"
+
+
+def ndjson_response(rows: Iterable[object]) -> StreamingResponse:
+    return StreamingResponse(_iter_lines(rows), media_type=NDJSON_MEDIA_TYPE)
@@ -13,3 +13,31 @@ def set_request_id(request_id: str) -> Token[str]:
 
 def reset_request_id(token: Token[str]) -> None:
     _request_id_var.reset(token)
+
+
+class RequestStats:
+    # Накопленное за запрос время внешних вызовов (провайдер, БД) для access-лога.
+    # Объект изменяемый: контекст копируется в пул потоков, но ссылается на тот же экземпляр.
+    __slots__ = ("provider_ms", "provider_calls", "db_ms", "db_queries")
+
+    def __init__(self) -> None:
+        self.provider_ms = 0.0
+        self.provider_calls = 0
+        self.db_ms = 0.0
+        self.db_queries = 0
+
+
+_request_stats_var: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def get_request_stats() -> RequestStats | None:
+    return _request_stats_var.get()
+
+
+def start_request_stats() -> tuple[RequestStats, Token]:
+    stats = RequestStats()
+    return stats, _request_stats_var.set(stats)
+
+
+def reset_request_stats(token: Token) -> None:
+    _request_stats_var.reset(token)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+from utils.json_response import dumps
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def format_sse(event: str, data: object, *, event_id: str | int | None = None) -> bytes:
+    # data — одна строка JSON (dumps не вставляет переводов строк), поэтому одно поле data:
+    parts = []
+    if event_id is not None:
+        parts.append(f"id: {event_id}\n".encode("utf-8"))
+    parts.append(f"event: {event}\n".encode("utf-8"))
+    parts.append(b"data: " + dumps(data) + b"\n\n")
+    return b"".join(parts)
+
+
+def format_sse_comment(text: str) -> bytes:
+    return f": {text}\n\n".encode("utf-8")
+
+
+def sse_response(events: AsyncIterator[bytes]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type=SSE_MEDIA_TYPE,
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx: не буферизовать поток
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+from utils.request_context import get_request_id
+
+# Лёгкая трассировка с API в духе OpenTelemetry (tracer.start_as_current_span, span.set_attribute,
+# span.record_exception) без зависимости от SDK. Завершённые спаны выгружаются экспортёром
+# (консоль/файл, JSON Lines), а длительности по именам спанов копятся на запрос для Server-Timing.
+
+logger = logging.getLogger("vector-stores.tracing")
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+_request_timings: ContextVar[dict[str, list[float]] | None] = ContextVar("request_timings", default=None)
+
+STATUS_UNSET = "UNSET"
+STATUS_OK = "OK"
+STATUS_ERROR = "ERROR"
+
+
+def _new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def _new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "start_time_ns",
+        "end_time_ns",
+        "attributes",
+        "events",
+        "status",
+        "status_description",
+    )
+
+    def __init__(self, name: str, *, trace_id: str, parent_span_id: str | None, attributes: dict | None) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_span_id = parent_span_id
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: int | None = None
+        self.attributes: dict[str, Any] = dict(attributes or {})
+        self.events: list[dict] = []
+        self.status = STATUS_UNSET
+        self.status_description: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: dict[str, Any]) -> None:
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, attributes: dict | None = None) -> None:
+        self.events.append({"name": name, "timestamp_ns": time.time_ns(), "attributes": dict(attributes or {})})
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.add_event(
+            "exception",
+            {"exception.type": type(exception).__name__, "exception.message": str(exception)},
+        )
+
+    def set_status(self, status: str, description: str | None = None) -> None:
+        self.status = status
+        self.status_description = description
+
+    def is_recording(self) -> bool:
+        return self.end_time_ns is None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_time_ns if self.end_time_ns is not None else time.time_ns()
+        return (end - self.start_time_ns) / 1_000_000
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "context": {"trace_id": self.trace_id, "span_id": self.span_id},
+            "parent_id": self.parent_span_id,
+            "start_time_ns": self.start_time_ns,
+            "end_time_ns": self.end_time_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"status_code": self.status, "description": self.status_description},
+        }
+
+
+class SpanExporter:
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+
+class ConsoleSpanExporter(SpanExporter):
+    def export(self, span: Span) -> None:
+        logger.info("span %s", json.dumps(span.to_dict(), ensure_ascii=False, default=str))
+
+
+class FileSpanExporter(SpanExporter):
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self._exporter: SpanExporter | None = None
+
+    def set_exporter(self, exporter: SpanExporter | None) -> None:
+        self._exporter = exporter
+
+    @contextmanager
+    def start_as_current_span(
+        self,
+        name: str,
+        attributes: dict | None = None,
+        *,
+        trace_id: str | None = None,
+        parent_span_id: str | None = None,
+    ) -> Iterator[Span]:
+        parent = _current_span.get()
+        if parent is not None:
+            trace_id = parent.trace_id
+            parent_span_id = parent.span_id
+
+        span = Span(
+            name,
+            trace_id=trace_id or _new_trace_id(),
+            parent_span_id=parent_span_id,
+            attributes=attributes,
+        )
+        request_id = get_request_id()
+        if request_id != "-":
+            span.attributes.setdefault("request_id", request_id)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            span.set_status(STATUS_ERROR, str(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time_ns = time.time_ns()
+            if span.status == STATUS_UNSET:
+                span.set_status(STATUS_OK)
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        timings = _request_timings.get()
+        if timings is not None:
+            entry = timings.get(span.name)
+            if entry is None:
+                timings[span.name] = [span.duration_ms, 1]
+            else:
+                entry[0] += span.duration_ms
+                entry[1] += 1
+
+        exporter = self._exporter
+        if exporter is None:
+            return
+        try:
+            exporter.export(span)
+        except Exception:
+            logger.exception("Ошибка экспорта спана %s", span.name)
+
+
+_tracer = Tracer()
+
+
+def get_tracer(_name: str | None = None) -> Tracer:
+    return _tracer
+
+
+def get_current_span() -> Span | None:
+    return _current_span.get()
+
+
+def set_span_attributes(**attributes: Any) -> None:
+    span = _current_span.get()
+    if span is not None:
+        span.set_attributes(attributes)
+
+
+def traced(name: str):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _tracer.start_as_current_span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def configure_tracing(exporter: str | None, file_path: str | None = None) -> None:
+    kind = (exporter or "none").strip().lower()
+    if kind == "console":
+        _tracer.set_exporter(ConsoleSpanExporter())
+    elif kind == "file":
+        if not file_path:
+            raise ValueError("TRACING_FILE обязателен для TRACING_EXPORTER=file")
+        _tracer.set_exporter(FileSpanExporter(file_path))
+    elif kind == "none":
+        _tracer.set_exporter(None)
+    else:
+        raise ValueError(f"Неизвестный TRACING_EXPORTER: {exporter}")
+
+
+def start_request_timings() -> tuple[dict[str, list[float]], object]:
+    timings: dict[str, list[float]] = {}
+    return timings, _request_timings.set(timings)
+
+
+def reset_request_timings(token) -> None:
+    _request_timings.reset(token)
+
+
+def parse_traceparent(value: str | None) -> tuple[str | None, str | None]:
+    # W3C Trace Context: 00-<trace_id 32 hex>-<parent_id 16 hex>-<flags>
+    if not value:
+        return None, None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None, None
+    return parts[1], parts[2]
+
+
+def format_server_timing(timings: dict[str, list[float]], *, limit: int, exclude: str | None = None) -> str:
+    items = [(name, total, count) for name, (total, count) in timings.items() if name != exclude]
+    items.sort(key=lambda item: item[1], reverse=True)
+    parts = []
+    for name, total, count in items[:limit]:
+        metric = "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in name)
+        parts.append(f'{metric};dur={total:.1f};desc="x{int(count)}"')
+    return ", ".join(parts)
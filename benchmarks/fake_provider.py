@@ -0,0 +1,729 @@
+from __future__ import annotations
+
+# Локальный OpenAI-совместимый провайдер (Files + Vector Stores) для бенчмарков и нагрузочных тестов.
+# Реализует эндпоинты, которые вызывают providers/openai, providers/sentralix и providers/yandex,
+# и особенности Yandex: 404 на retrieve файла индекса в статусе in_progress, только purpose="fine-tune".
+# Задержки, ошибки и лимит частоты настраиваются (FakeProviderSettings, POST /_fake/settings);
+# случайность — из random.Random(seed), поэтому прогоны воспроизводимы.
+#
+# Запуск:
+#   - в процессе, без сокетов: install_in_process(app) — запросы провайдеров на base_url уходят прямо в ASGI;
+#   - в потоке на localhost: with FakeProviderServer(app) as server: ... server.base_url (нужен uvicorn);
+#   - отдельным процессом: python benchmarks/fake_provider.py --port 8100 --latency-ms 50 --yandex
+
+import argparse
+import asyncio
+from collections import deque
+from dataclasses import asdict, dataclass, field, fields
+from functools import lru_cache
+import itertools
+import random
+import re
+import threading
+import time
+from typing import Any
+
+import anyio.from_thread
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.responses import JSONResponse, Response
+import httpx
+
+IN_PROCESS_BASE_URL = "http://fake-provider.local"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class FakeProviderSettings:
+    # Задержка каждого ответа: latency_ms ± latency_jitter_ms; operation_latency_ms — добавка по операции
+    # (ключи — имена операций, например "vector_stores.search", "files.create")
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    operation_latency_ms: dict[str, float] = field(default_factory=dict)
+    # Доля запросов, на которые отвечается error_status (operation_error_rate — по операции)
+    error_rate: float = 0.0
+    operation_error_rate: dict[str, float] = field(default_factory=dict)
+    error_status: int = 500
+    # Больше rate_limit_per_minute запросов за скользящую минуту — 429 с Retry-After; 0 — без лимита
+    rate_limit_per_minute: int = 0
+    # Сколько файл индекса остаётся in_progress и доля файлов, завершающихся failed
+    processing_ms: float = 0.0
+    file_failure_rate: float = 0.0
+    search_max_results: int = 10
+    # Максимум элементов на страницу листинга (у OpenAI — 100); провайдеры не листают страницы,
+    # поэтому бенчмарки на больших объёмах поднимают предел
+    max_page_size: int = 100
+    yandex: bool = False
+    seed: int = 0
+
+    def update(self, values: dict) -> None:
+        known = {f.name for f in fields(self)}
+        for key, value in values.items():
+            if key in known:
+                setattr(self, key, value)
+
+
+class FakeProviderError(Exception):
+    def __init__(self, status_code: int, message: str, *, headers: dict | None = None, code: str | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.headers = headers or {}
+        self.code = code
+
+
+def _error_type(status_code: int) -> str:
+    if status_code == 429:
+        return "rate_limit_error"
+    if status_code >= 500:
+        return "server_error"
+    return "invalid_request_error"
+
+
+def _now() -> int:
+    return int(time.time())
+
+
+def _tokens(text: str) -> set[str]:
+    return {t.lower() for t in _TOKEN_RE.findall(text)}
+
+
+@lru_cache(maxsize=200_000)
+def _content_tokens(content: bytes) -> tuple[str, frozenset[str]]:
+    # Содержимое файла неизменно — разбор на слова не повторяется на каждый поиск
+    text = content[:4096].decode("utf-8", errors="ignore")
+    return text, frozenset(_tokens(text))
+
+
+class FakeProviderState:
+    # Хранилище в памяти; все изменения под одним lock — обработчики синхронные и короткие
+
+    def __init__(self, settings: FakeProviderSettings) -> None:
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._rng = random.Random(self.settings.seed)
+        self._ids = itertools.count(1)
+        self.files: dict[str, dict] = {}
+        self.contents: dict[str, bytes] = {}
+        self.vector_stores: dict[str, dict] = {}
+        # vector_store_id -> file_id -> запись файла индекса (с внутренними полями _ready_at/_final_status)
+        self.vs_files: dict[str, dict[str, dict]] = {}
+        self.batches: dict[str, dict] = {}
+        self.calls: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self._recent: deque[float] = deque()
+
+    def next_id(self, prefix: str) -> str:
+        return f"{prefix}-{next(self._ids):08d}"
+
+    # Вход каждого запроса: учёт, лимит частоты, инъекция ошибок; -> задержка ответа в секундах
+    def enter(self, operation: str) -> float:
+        s = self.settings
+        with self.lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+
+            if s.rate_limit_per_minute > 0:
+                now = time.monotonic()
+                while self._recent and self._recent[0] <= now - 60:
+                    self._recent.popleft()
+                if len(self._recent) >= s.rate_limit_per_minute:
+                    retry_after = max(0.001, self._recent[0] + 60 - now)
+                    self.errors[operation] = self.errors.get(operation, 0) + 1
+                    raise FakeProviderError(
+                        429,
+                        "Rate limit exceeded",
+                        headers={"retry-after": str(max(1, round(retry_after))), "retry-after-ms": str(int(retry_after * 1000))},
+                    )
+                self._recent.append(now)
+
+            rate = s.operation_error_rate.get(operation, s.error_rate)
+            if rate > 0 and self._rng.random() < rate:
+                self.errors[operation] = self.errors.get(operation, 0) + 1
+                headers = {"retry-after": "1"} if s.error_status in (429, 503) else None
+                raise FakeProviderError(s.error_status, f"Injected error for {operation}", headers=headers)
+
+            delay_ms = s.latency_ms + s.operation_latency_ms.get(operation, 0.0)
+            if s.latency_jitter_ms:
+                delay_ms += self._rng.uniform(-s.latency_jitter_ms, s.latency_jitter_ms)
+        return max(0.0, delay_ms) / 1000
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "calls": dict(self.calls),
+                "errors": dict(self.errors),
+                "files": len(self.files),
+                "vector_stores": len(self.vector_stores),
+                "vector_store_files": sum(len(v) for v in self.vs_files.values()),
+            }
+
+    # --- файлы индекса ---
+
+    def new_vs_file(self, vector_store_id: str, file_id: str, attributes: dict | None, chunking_strategy: dict | None) -> dict:
+        s = self.settings
+        failed = s.file_failure_rate > 0 and self._rng.random() < s.file_failure_rate
+        return {
+            "id": file_id,
+            "object": "vector_store.file",
+            "created_at": _now(),
+            "vector_store_id": vector_store_id,
+            "status": "in_progress",
+            "usage_bytes": len(self.contents.get(file_id, b"")),
+            "last_error": None,
+            "attributes": attributes or {},
+            "chunking_strategy": chunking_strategy or {"type": "static", "static": {"max_chunk_size_tokens": 800, "chunk_overlap_tokens": 400}},
+            "_ready_at": time.monotonic() + s.processing_ms / 1000,
+            "_final_status": "failed" if failed else "completed",
+        }
+
+    @staticmethod
+    def settle(item: dict) -> dict:
+        if item["status"] == "in_progress" and time.monotonic() >= item["_ready_at"]:
+            item["status"] = item["_final_status"]
+            if item["status"] == "failed":
+                item["last_error"] = {"code": "server_error", "message": "Injected processing failure"}
+        return item
+
+    @staticmethod
+    def public(item: dict) -> dict:
+        return {k: v for k, v in item.items() if not k.startswith("_")}
+
+    def file_counts(self, items: list[dict]) -> dict:
+        counts = {"in_progress": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        for item in items:
+            self.settle(item)
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        counts["total"] = len(items)
+        return counts
+
+    def vector_store_out(self, vs: dict) -> dict:
+        items = list(self.vs_files.get(vs["id"], {}).values())
+        counts = self.file_counts(items)
+        return {
+            **vs,
+            "status": "in_progress" if counts["in_progress"] else "completed",
+            "file_counts": counts,
+            "usage_bytes": sum(i["usage_bytes"] for i in items),
+        }
+
+
+def _page(items: list[dict], *, limit: int, after: str | None, before: str | None, order: str, max_limit: int) -> dict:
+    items = sorted(items, key=lambda i: (i["created_at"], i["id"]), reverse=order == "desc")
+    if after is not None:
+        ids = [i["id"] for i in items]
+        items = items[ids.index(after) + 1 :] if after in ids else []
+    if before is not None:
+        ids = [i["id"] for i in items]
+        items = items[: ids.index(before)] if before in ids else items
+    limit = max(1, min(limit, max_limit))
+    data = items[:limit]
+    return {
+        "object": "list",
+        "data": data,
+        "first_id": data[0]["id"] if data else None,
+        "last_id": data[-1]["id"] if data else None,
+        "has_more": len(items) > limit,
+    }
+
+
+def create_fake_provider_app(settings: FakeProviderSettings | None = None) -> FastAPI:
+    state = FakeProviderState(settings or FakeProviderSettings())
+    app = FastAPI(title="fake-openai-vector-stores", openapi_url=None, docs_url=None, redoc_url=None)
+    app.state.fake = state
+
+    @app.exception_handler(FakeProviderError)
+    async def _fake_error(_request: Request, exc: FakeProviderError) -> JSONResponse:
+        return JSONResponse(
+            status_code=exc.status_code,
+            headers=exc.headers,
+            content={"error": {"message": exc.message, "type": _error_type(exc.status_code), "code": exc.code, "param": None}},
+        )
+
+    async def enter(operation: str) -> None:
+        delay = state.enter(operation)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def page(items: list[dict], *, limit: int, after: str | None, before: str | None, order: str) -> dict:
+        return _page(items, limit=limit, after=after, before=before, order=order, max_limit=state.settings.max_page_size)
+
+    def not_found(what: str, object_id: str) -> FakeProviderError:
+        return FakeProviderError(404, f"No {what} found with id '{object_id}'.", code="not_found")
+
+    def get_vs(vector_store_id: str) -> dict:
+        vs = state.vector_stores.get(vector_store_id)
+        if vs is None:
+            raise not_found("vector store", vector_store_id)
+        return vs
+
+    # --- служебные ручки стенда ---
+
+    @app.get("/_fake/stats")
+    async def fake_stats() -> dict:
+        return state.stats()
+
+    @app.post("/_fake/settings")
+    async def fake_settings(request: Request) -> dict:
+        with state.lock:
+            state.settings.update(await request.json())
+            return asdict(state.settings)
+
+    @app.post("/_fake/reset")
+    async def fake_reset() -> dict:
+        with state.lock:
+            state.reset()
+        return {"ok": True}
+
+    # --- модели (healthcheck) ---
+
+    @app.get("/v1/models")
+    async def list_models() -> dict:
+        await enter("models.list")
+        return {"object": "list", "data": [{"id": "fake-embedding", "object": "model", "created": 0, "owned_by": "fake"}]}
+
+    # --- файлы ---
+
+    @app.post("/v1/files")
+    async def create_file(file: UploadFile = File(...), purpose: str = Form(...)) -> dict:
+        await enter("files.create")
+        if state.settings.yandex and purpose != "fine-tune":
+            raise FakeProviderError(400, f"Unsupported purpose '{purpose}'")
+        content = await file.read()
+        with state.lock:
+            file_id = state.next_id("file")
+            item = {
+                "id": file_id,
+                "object": "file",
+                "bytes": len(content),
+                "created_at": _now(),
+                "filename": file.filename or file_id,
+                "purpose": purpose,
+                "status": "processed",
+            }
+            state.files[file_id] = item
+            state.contents[file_id] = content
+        return item
+
+    @app.get("/v1/files")
+    async def list_files(limit: int = 20, after: str | None = None, order: str = "desc") -> dict:
+        await enter("files.list")
+        with state.lock:
+            return page(list(state.files.values()), limit=limit, after=after, before=None, order=order)
+
+    @app.get("/v1/files/{file_id}")
+    async def retrieve_file(file_id: str) -> dict:
+        await enter("files.retrieve")
+        with state.lock:
+            item = state.files.get(file_id)
+            if item is None:
+                raise not_found("file", file_id)
+            return item
+
+    @app.get("/v1/files/{file_id}/content")
+    async def retrieve_file_content(file_id: str) -> Response:
+        await enter("files.content")
+        with state.lock:
+            content = state.contents.get(file_id)
+        if content is None:
+            raise not_found("file", file_id)
+        return Response(content=content, media_type="application/octet-stream")
+
+    @app.delete("/v1/files/{file_id}")
+    async def delete_file(file_id: str) -> dict:
+        await enter("files.delete")
+        with state.lock:
+            if state.files.pop(file_id, None) is None:
+                raise not_found("file", file_id)
+            state.contents.pop(file_id, None)
+        return {"id": file_id, "object": "file", "deleted": True}
+
+    # --- индексы ---
+
+    @app.post("/v1/vector_stores")
+    async def create_vector_store(request: Request) -> dict:
+        await enter("vector_stores.create")
+        body = await request.json()
+        with state.lock:
+            vs_id = state.next_id("vs")
+            vs = {
+                "id": vs_id,
+                "object": "vector_store",
+                "created_at": _now(),
+                "name": body.get("name") or "",
+                "description": body.get("description"),
+                "metadata": body.get("metadata") or {},
+                "expires_after": body.get("expires_after"),
+                "expires_at": None,
+                "last_active_at": _now(),
+            }
+            state.vector_stores[vs_id] = vs
+            state.vs_files[vs_id] = {}
+            for file_id in body.get("file_ids") or []:
+                state.vs_files[vs_id][file_id] = state.new_vs_file(vs_id, file_id, None, body.get("chunking_strategy"))
+            return state.vector_store_out(vs)
+
+    @app.get("/v1/vector_stores")
+    async def list_vector_stores(limit: int = 20, after: str | None = None, before: str | None = None, order: str = "desc") -> dict:
+        await enter("vector_stores.list")
+        with state.lock:
+            items = [state.vector_store_out(vs) for vs in state.vector_stores.values()]
+            return page(items, limit=limit, after=after, before=before, order=order)
+
+    @app.get("/v1/vector_stores/{vector_store_id}")
+    async def retrieve_vector_store(vector_store_id: str) -> dict:
+        await enter("vector_stores.retrieve")
+        with state.lock:
+            return state.vector_store_out(get_vs(vector_store_id))
+
+    @app.post("/v1/vector_stores/{vector_store_id}")
+    async def update_vector_store(vector_store_id: str, request: Request) -> dict:
+        await enter("vector_stores.update")
+        body = await request.json()
+        with state.lock:
+            vs = get_vs(vector_store_id)
+            for key in ("name", "metadata", "expires_after"):
+                if key in body:
+                    vs[key] = body[key]
+            return state.vector_store_out(vs)
+
+    @app.delete("/v1/vector_stores/{vector_store_id}")
+    async def delete_vector_store(vector_store_id: str) -> dict:
+        await enter("vector_stores.delete")
+        with state.lock:
+            get_vs(vector_store_id)
+            del state.vector_stores[vector_store_id]
+            state.vs_files.pop(vector_store_id, None)
+        return {"id": vector_store_id, "object": "vector_store.deleted", "deleted": True}
+
+    @app.post("/v1/vector_stores/{vector_store_id}/search")
+    async def search_vector_store(vector_store_id: str, request: Request) -> dict:
+        await enter("vector_stores.search")
+        body = await request.json()
+        query = body.get("query") or ""
+        query_tokens = _tokens(" ".join(query) if isinstance(query, list) else str(query))
+        limit = max(1, min(int(body.get("max_num_results") or state.settings.search_max_results), 50))
+        with state.lock:
+            get_vs(vector_store_id)
+            candidates = [
+                (file_id, item["attributes"])
+                for file_id, item in state.vs_files[vector_store_id].items()
+                if state.settle(item)["status"] == "completed"
+            ]
+            results = []
+            for file_id, attributes in candidates:
+                text, tokens = _content_tokens(state.contents.get(file_id, b""))
+                score = len(query_tokens & tokens) / len(query_tokens) if query_tokens else 0.0
+                if score > 0:
+                    filename = state.files.get(file_id, {}).get("filename", file_id)
+                    results.append((score, file_id, filename, attributes, text[:500]))
+        results.sort(key=lambda r: (-r[0], r[1]))
+        data = [
+            {
+                "file_id": file_id,
+                "filename": filename,
+                "score": round(score, 4),
+                "attributes": attributes,
+                "content": [{"type": "text", "text": text}],
+            }
+            for score, file_id, filename, attributes, text in results[:limit]
+        ]
+        return {"object": "vector_store.search_results.page", "search_query": query, "data": data, "has_more": False, "next_page": None}
+
+    # --- файлы индекса ---
+
+    @app.post("/v1/vector_stores/{vector_store_id}/files")
+    async def attach_file(vector_store_id: str, request: Request) -> dict:
+        await enter("vector_stores.files.create")
+        body = await request.json()
+        file_id = body.get("file_id")
+        with state.lock:
+            get_vs(vector_store_id)
+            if file_id not in state.files:
+                raise not_found("file", str(file_id))
+            item = state.new_vs_file(vector_store_id, file_id, body.get("attributes"), body.get("chunking_strategy"))
+            state.vs_files[vector_store_id][file_id] = item
+            return state.public(item)
+
+    @app.get("/v1/vector_stores/{vector_store_id}/files")
+    async def list_vs_files(
+        vector_store_id: str,
+        limit: int = 20,
+        after: str | None = None,
+        before: str | None = None,
+        order: str = "desc",
+        filter: str | None = None,
+    ) -> dict:
+        await enter("vector_stores.files.list")
+        with state.lock:
+            get_vs(vector_store_id)
+            items = [state.public(state.settle(i)) for i in state.vs_files[vector_store_id].values()]
+            if filter:
+                items = [i for i in items if i["status"] == filter]
+            return page(items, limit=limit, after=after, before=before, order=order)
+
+    @app.get("/v1/vector_stores/{vector_store_id}/files/{file_id}")
+    async def retrieve_vs_file(vector_store_id: str, file_id: str) -> dict:
+        await enter("vector_stores.files.retrieve")
+        with state.lock:
+            get_vs(vector_store_id)
+            item = state.vs_files[vector_store_id].get(file_id)
+            if item is None:
+                raise not_found("file", file_id)
+            state.settle(item)
+            if state.settings.yandex and item["status"] == "in_progress":
+                # Как у Yandex: файл в обработке не отдаётся
+                raise not_found("file", file_id)
+            return state.public(item)
+
+    @app.post("/v1/vector_stores/{vector_store_id}/files/{file_id}")
+    async def update_vs_file(vector_store_id: str, file_id: str, request: Request) -> dict:
+        await enter("vector_stores.files.update")
+        body = await request.json()
+        with state.lock:
+            get_vs(vector_store_id)
+            item = state.vs_files[vector_store_id].get(file_id)
+            if item is None:
+                raise not_found("file", file_id)
+            item["attributes"] = body.get("attributes") or {}
+            return state.public(state.settle(item))
+
+    @app.delete("/v1/vector_stores/{vector_store_id}/files/{file_id}")
+    async def detach_file(vector_store_id: str, file_id: str) -> dict:
+        await enter("vector_stores.files.delete")
+        with state.lock:
+            get_vs(vector_store_id)
+            if state.vs_files[vector_store_id].pop(file_id, None) is None:
+                raise not_found("file", file_id)
+        return {"id": file_id, "object": "vector_store.file.deleted", "deleted": True}
+
+    @app.get("/v1/vector_stores/{vector_store_id}/files/{file_id}/content")
+    async def vs_file_content(vector_store_id: str, file_id: str) -> dict:
+        await enter("vector_stores.files.content")
+        with state.lock:
+            get_vs(vector_store_id)
+            if file_id not in state.vs_files[vector_store_id]:
+                raise not_found("file", file_id)
+            text = state.contents.get(file_id, b"").decode("utf-8", errors="ignore")
+        return {"object": "vector_store.file_content.page", "data": [{"type": "text", "text": text}], "has_more": False, "next_page": None}
+
+    # --- пакеты файлов ---
+
+    def batch_out(batch: dict) -> dict:
+        items = [state.vs_files[batch["vector_store_id"]][f] for f in batch["_file_ids"] if f in state.vs_files[batch["vector_store_id"]]]
+        counts = state.file_counts(items)
+        status = batch["_status"] or ("in_progress" if counts["in_progress"] else "completed")
+        return {**state.public(batch), "status": status, "file_counts": counts}
+
+    def get_batch(vector_store_id: str, batch_id: str) -> dict:
+        get_vs(vector_store_id)
+        batch = state.batches.get(batch_id)
+        if batch is None or batch["vector_store_id"] != vector_store_id:
+            raise not_found("file batch", batch_id)
+        return batch
+
+    @app.post("/v1/vector_stores/{vector_store_id}/file_batches")
+    async def create_batch(vector_store_id: str, request: Request) -> dict:
+        await enter("vector_stores.file_batches.create")
+        body = await request.json()
+        entries = [{"file_id": f, "attributes": body.get("attributes")} for f in body.get("file_ids") or []]
+        entries += [
+            {"file_id": f.get("file_id"), "attributes": f.get("attributes", body.get("attributes"))}
+            for f in body.get("files") or []
+        ]
+        with state.lock:
+            get_vs(vector_store_id)
+            for entry in entries:
+                if entry["file_id"] not in state.files:
+                    raise not_found("file", str(entry["file_id"]))
+            for entry in entries:
+                state.vs_files[vector_store_id][entry["file_id"]] = state.new_vs_file(
+                    vector_store_id, entry["file_id"], entry["attributes"], body.get("chunking_strategy")
+                )
+            batch_id = state.next_id("vsfb")
+            batch = {
+                "id": batch_id,
+                "object": "vector_store.files_batch",
+                "created_at": _now(),
+                "vector_store_id": vector_store_id,
+                "_file_ids": [e["file_id"] for e in entries],
+                "_status": None,
+            }
+            state.batches[batch_id] = batch
+            return batch_out(batch)
+
+    @app.get("/v1/vector_stores/{vector_store_id}/file_batches/{batch_id}")
+    async def retrieve_batch(vector_store_id: str, batch_id: str) -> dict:
+        await enter("vector_stores.file_batches.retrieve")
+        with state.lock:
+            return batch_out(get_batch(vector_store_id, batch_id))
+
+    @app.post("/v1/vector_stores/{vector_store_id}/file_batches/{batch_id}/cancel")
+    async def cancel_batch(vector_store_id: str, batch_id: str) -> dict:
+        await enter("vector_stores.file_batches.cancel")
+        with state.lock:
+            batch = get_batch(vector_store_id, batch_id)
+            for file_id in batch["_file_ids"]:
+                item = state.vs_files[vector_store_id].get(file_id)
+                if item is not None and state.settle(item)["status"] == "in_progress":
+                    item["status"] = "cancelled"
+            batch["_status"] = "cancelled"
+            return batch_out(batch)
+
+    @app.get("/v1/vector_stores/{vector_store_id}/file_batches/{batch_id}/files")
+    async def list_batch_files(
+        vector_store_id: str,
+        batch_id: str,
+        limit: int = 20,
+        after: str | None = None,
+        before: str | None = None,
+        order: str = "desc",
+        filter: str | None = None,
+    ) -> dict:
+        await enter("vector_stores.file_batches.list_files")
+        with state.lock:
+            batch = get_batch(vector_store_id, batch_id)
+            files = state.vs_files[vector_store_id]
+            items = [state.public(state.settle(files[f])) for f in batch["_file_ids"] if f in files]
+            if filter:
+                items = [i for i in items if i["status"] == filter]
+            return page(items, limit=limit, after=after, before=before, order=order)
+
+    return app
+
+
+def fake_state(app: FastAPI) -> FakeProviderState:
+    return app.state.fake
+
+
+class ASGIBridgeTransport(httpx.BaseTransport):
+    # Синхронный httpx-транспорт поверх ASGI-приложения: провайдеры (синхронный SDK openai)
+    # ходят в стенд без сокетов. Приложение выполняется в отдельном цикле событий (anyio portal).
+
+    def __init__(self, app: Any) -> None:
+        self._portal_cm = anyio.from_thread.start_blocking_portal()
+        self._portal = self._portal_cm.__enter__()
+        self._asgi = httpx.ASGITransport(app=app)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        buffered = httpx.Request(request.method, request.url, headers=request.headers, content=body)
+
+        async def _call() -> tuple[int, list, bytes]:
+            response = await self._asgi.handle_async_request(buffered)
+            content = await response.aread()
+            return response.status_code, response.headers.raw, content
+
+        status_code, headers, content = self._portal.call(_call)
+        return httpx.Response(status_code, headers=headers, content=content, request=request)
+
+    def close(self) -> None:
+        if self._portal_cm is not None:
+            self._portal_cm.__exit__(None, None, None)
+            self._portal_cm = None
+
+
+def install_in_process(app: FastAPI, base_url: str = IN_PROCESS_BASE_URL) -> str:
+    # Перенаправляет HTTP-клиентов провайдеров (providers/http_transport.py) на base_url в app;
+    # -> base_url для подключения провайдера. Требует каталог app в sys.path.
+    from providers.http_transport import mount_transport
+
+    previous = mount_transport(base_url, ASGIBridgeTransport(app))
+    if previous is not None:
+        previous.close()
+    return f"{base_url}/v1"
+
+
+def uninstall_in_process(base_url: str = IN_PROCESS_BASE_URL) -> None:
+    from providers.http_transport import mount_transport
+
+    transport = mount_transport(base_url, None)
+    if transport is not None:
+        transport.close()
+
+
+class FakeProviderServer:
+    # Стенд на настоящем сокете localhost в фоновом потоке — для сравнения транспорта, пула и keep-alive
+
+    def __init__(self, app: FastAPI, *, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.app = app
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self) -> FakeProviderServer:
+        try:
+            import uvicorn
+        except ImportError as e:
+            raise RuntimeError("Для FakeProviderServer нужен uvicorn; без него используйте install_in_process") from e
+
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="fake-provider", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Стенд провайдера не запустился")
+            time.sleep(0.01)
+        if not self.port:
+            self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(10)
+        self._server = None
+        self._thread = None
+
+    def __enter__(self) -> FakeProviderServer:
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Локальный OpenAI-совместимый провайдер vector stores")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--rate-limit-per-minute", type=int, default=0)
+    parser.add_argument("--processing-ms", type=float, default=0.0)
+    parser.add_argument("--file-failure-rate", type=float, default=0.0)
+    parser.add_argument("--max-page-size", type=int, default=100)
+    parser.add_argument("--yandex", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    settings = FakeProviderSettings(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rate_limit_per_minute=args.rate_limit_per_minute,
+        processing_ms=args.processing_ms,
+        file_failure_rate=args.file_failure_rate,
+        max_page_size=args.max_page_size,
+        yandex=args.yandex,
+        seed=args.seed,
+    )
+    uvicorn.run(create_fake_provider_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+# Окружение одного прогона сценария (дочерний процесс run.py): временные БД и FILES_ROOT,
+# локальный провайдер в процессе, счётчики SQL-запросов и вызовов провайдера.
+# Переменные окружения задаются до импорта модулей приложения — config читается один раз.
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import os
+from pathlib import Path
+import resource
+import sys
+import time
+import uuid
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+
+BENCH_DOMAIN_ID = "bench"
+BENCH_PROVIDER_TYPE = "openai"
+
+
+def prepare_environment(workdir: Path, overrides: dict[str, str] | None = None, database_uri: str | None = None) -> None:
+    env = {
+        "DATABASE_URI": database_uri or f"sqlite:///{workdir}/bench.sqlite",
+        "FILES_ROOT": str(workdir / "files"),
+        "PROVIDER_SECRETS_KEY": "bench",
+        "DEFAULT_DOMAIN_ID": BENCH_DOMAIN_ID,
+        "LOG_TO_CONSOLE": "0",
+        "LOG_LEVEL": "WARNING",
+        "JOBS_EMBEDDED_WORKERS": "0",
+        "STATUS_POLLER_ENABLED": "0",
+        "TRACING_EXPORTER": "none",
+    }
+    env.update(overrides or {})
+    os.environ.update(env)
+    for path in (str(APP_DIR), str(BENCH_DIR)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def peak_rss_kb() -> int:
+    # ru_maxrss в Linux — КиБ, в macOS — байты
+    value = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return value // 1024 if sys.platform == "darwin" else value
+
+
+@dataclass
+class Measurement:
+    wall_seconds: float = 0.0
+    db_queries: int = 0
+    provider_calls: int = 0
+    provider_calls_by_operation: dict[str, int] = field(default_factory=dict)
+
+
+class BenchContext:
+    def __init__(self, workdir: Path) -> None:
+        from sqlalchemy import event
+
+        from database import get_engine, get_session_maker, init_db
+        from fake_provider import FakeProviderSettings, create_fake_provider_app, fake_state, install_in_process
+        from services.providers_connections_service import ProvidersConnectionsService
+        from utils.logger import configure_logging
+        from config import get_config
+
+        self.workdir = workdir
+        configure_logging(get_config())
+        init_db()
+        self.session_maker = get_session_maker()
+
+        self._queries = 0
+        event.listen(get_engine(), "before_cursor_execute", self._count_query)
+
+        # Провайдер не листает страницы — на больших объёмах листинги должны влезать в одну
+        self.fake_app = create_fake_provider_app(FakeProviderSettings(max_page_size=1_000_000))
+        self.fake = fake_state(self.fake_app)
+        self.provider_base_url = install_in_process(self.fake_app)
+
+        db = self.session_maker()
+        try:
+            ProvidersConnectionsService(db=db).upsert_connection(
+                provider_type=BENCH_PROVIDER_TYPE,
+                base_url=self.provider_base_url,
+                auth_type="api_key",
+                credentials={"api_key": "bench"},
+                token=None,
+                token_expires_at=None,
+                is_enabled=True,
+            )
+        finally:
+            db.close()
+
+    def _count_query(self, *_args) -> None:
+        self._queries += 1
+
+    @contextmanager
+    def measure(self):
+        m = Measurement()
+        calls_before = self.fake.stats()["calls"]
+        queries_before = self._queries
+        started = time.perf_counter()
+        try:
+            yield m
+        finally:
+            m.wall_seconds = time.perf_counter() - started
+            m.db_queries = self._queries - queries_before
+            calls_after = self.fake.stats()["calls"]
+            m.provider_calls_by_operation = {
+                op: count - calls_before.get(op, 0)
+                for op, count in sorted(calls_after.items())
+                if count - calls_before.get(op, 0)
+            }
+            m.provider_calls = sum(m.provider_calls_by_operation.values())
+
+    def close(self) -> None:
+        from fake_provider import uninstall_in_process
+        from utils.logger import stop_logging
+
+        uninstall_in_process()
+        stop_logging()
+
+    # --- наполнение БД и провайдера (вне замера) ---
+
+    def seed_files(self, count: int, *, domain_id: str = BENCH_DOMAIN_ID, size_bytes: int = 512) -> list[str]:
+        # Файлы на диске в раскладке FilesService (<FILES_ROOT>/<domain>/<id>/original/<name>) и строки rag_files
+        from models.rag_file import RagFile
+
+        files_root = Path(os.environ["FILES_ROOT"])
+        base_time = datetime.utcnow() - timedelta(days=1)
+        ids: list[str] = []
+        rows: list[dict] = []
+        for i in range(count):
+            file_id = str(uuid.uuid4())
+            name = f"doc-{i:06d}.txt"
+            path = files_root / domain_id / file_id / "original" / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            text = f"document {i} vector store benchmark topic{i % 50} " * (size_bytes // 40 + 1)
+            path.write_bytes(text.encode("utf-8")[:size_bytes])
+            ids.append(file_id)
+            created_at = base_time + timedelta(milliseconds=i)
+            rows.append(
+                {
+                    "id": file_id,
+                    "domain_id": domain_id,
+                    "file_name": name,
+                    "file_type": "text/plain",
+                    "local_path": str(path),
+                    "size_bytes": size_bytes,
+                    "tags": None,
+                    "notes": None,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            )
+        self._bulk_insert(RagFile, rows)
+        return ids
+
+    def seed_index(
+        self,
+        file_ids: list[str],
+        *,
+        domain_id: str = BENCH_DOMAIN_ID,
+        external_id: str | None = None,
+        indexing_status: str = "not_indexed",
+    ) -> str:
+        from models.rag_index import RagIndex
+        from models.rag_index_file import RagIndexFile
+
+        index_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        self._bulk_insert(
+            RagIndex,
+            [
+                {
+                    "id": index_id,
+                    "domain_id": domain_id,
+                    "provider_type": BENCH_PROVIDER_TYPE,
+                    "external_id": external_id,
+                    "name": f"bench-{index_id[:8]}",
+                    "file_ids": list(file_ids),
+                    "indexing_status": indexing_status,
+                    "status_poll_attempts": 0,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            ],
+        )
+        self._bulk_insert(
+            RagIndexFile,
+            [{"index_id": index_id, "file_id": file_id, "include_order": i} for i, file_id in enumerate(file_ids)],
+        )
+        return index_id
+
+    def seed_provider_vector_store(self, file_count: int, *, name: str | None = None, size_bytes: int = 512) -> str:
+        # Готовый vector store у провайдера с file_count обработанными файлами — напрямую в состоянии стенда
+        fake = self.fake
+        with fake.lock:
+            vs_id = fake.next_id("vs")
+            now = int(time.time())
+            fake.vector_stores[vs_id] = {
+                "id": vs_id,
+                "object": "vector_store",
+                "created_at": now,
+                "name": name or vs_id,
+                "description": None,
+                "metadata": {},
+                "expires_after": None,
+                "expires_at": None,
+                "last_active_at": now,
+            }
+            fake.vs_files[vs_id] = {}
+            for i in range(file_count):
+                file_id = fake.next_id("file")
+                content = f"provider document {i} benchmark topic{i % 50} ".encode("utf-8") * (size_bytes // 40 + 1)
+                fake.files[file_id] = {
+                    "id": file_id,
+                    "object": "file",
+                    "bytes": size_bytes,
+                    "created_at": now,
+                    "filename": f"{file_id}.txt",
+                    "purpose": "assistants",
+                    "status": "processed",
+                }
+                fake.contents[file_id] = content[:size_bytes]
+                item = fake.new_vs_file(vs_id, file_id, None, None)
+                item["status"] = "completed"
+                fake.vs_files[vs_id][file_id] = item
+        return vs_id
+
+    def _bulk_insert(self, model, rows: list[dict], *, chunk: int = 5000) -> None:
+        db = self.session_maker()
+        try:
+            for start in range(0, len(rows), chunk):
+                db.execute(model.__table__.insert(), rows[start : start + chunk])
+            db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,542 @@
+from __future__ import annotations
+
+# Нагрузочный прогон HTTP API: смесь загрузок, скачиваний, поисков, привязок файлов и публикаций
+# по многим X-Domain-Id; на выходе — перцентили задержек, rps и доля ошибок по маршрутам.
+#
+# Режимы:
+#   - по умолчанию: приложение в uvicorn (--workers процессов) и локальный провайдер отдельным процессом,
+#     временные SQLite (или --database-uri) и FILES_ROOT; нужен uvicorn;
+#   - --in-process: приложение и провайдер в этом процессе через ASGI, без сокетов и uvicorn
+#     (--workers не действует) — для проверки сценария и профилирования;
+#   - --url: уже запущенное приложение; подключение провайдера --provider-type должно быть настроено.
+#
+#   python benchmarks/loadtest.py --workers 4 --concurrency 32 --duration 60 --domains 20 --output load.json
+#   python benchmarks/loadtest.py --env DB_POOL_SIZE=20 --env LOG_LEVEL=INFO --mix search=10,download=5
+#
+# Нагрузка по умолчанию замкнутая: каждый поток шлёт следующий запрос сразу после ответа.
+# С --rate запросы идут по расписанию, и задержка считается от запланированного момента —
+# очередь перед перегруженным сервером видна в перцентилях, а не прячется за медленным клиентом.
+
+import argparse
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import importlib.util
+import json
+import os
+from pathlib import Path
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+
+DEFAULT_MIX = "upload=2,download=6,search=10,attach=2,publish=0.5,list=3"
+OPERATIONS = ("upload", "download", "search", "attach", "publish", "list")
+
+# Слова, по которым ищет сценарий; они же — в содержимом загружаемых файлов
+_TOPICS = 50
+
+
+def _parse_mix(value: str) -> dict[str, float]:
+    mix: dict[str, float] = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"неизвестная операция {name!r}, доступны: {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    if not any(w > 0 for w in mix.values()):
+        raise argparse.ArgumentTypeError("в смеси нет операций с положительным весом")
+    return mix
+
+
+def _parse_env(value: str) -> tuple[str, str]:
+    key, sep, val = value.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError("ожидается KEY=VALUE")
+    return key, val
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+# --- статистика ---
+
+
+@dataclass
+class RouteStats:
+    latencies_ms: list[float] = field(default_factory=list)
+    statuses: dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def add(self, latency_ms: float, status: str, error: bool) -> None:
+        self.latencies_ms.append(latency_ms)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if error:
+            self.errors += 1
+
+    def summary(self, seconds: float) -> dict:
+        ordered = sorted(self.latencies_ms)
+        count = len(ordered)
+        return {
+            "requests": count,
+            "rps": round(count / seconds, 2) if seconds > 0 else 0.0,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "statuses": dict(sorted(self.statuses.items())),
+            "p50_ms": round(_percentile(ordered, 0.50), 2),
+            "p90_ms": round(_percentile(ordered, 0.90), 2),
+            "p95_ms": round(_percentile(ordered, 0.95), 2),
+            "p99_ms": round(_percentile(ordered, 0.99), 2),
+            "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+            "mean_ms": round(sum(ordered) / count, 2) if count else 0.0,
+        }
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.routes: dict[str, RouteStats] = {}
+        self.recording = False
+
+    def record(self, route: str, latency_ms: float, status: str, error: bool) -> None:
+        if not self.recording:
+            return
+        with self._lock:
+            self.routes.setdefault(route, RouteStats()).add(latency_ms, status, error)
+
+    def report(self, seconds: float) -> dict:
+        with self._lock:
+            routes = {route: stats.summary(seconds) for route, stats in sorted(self.routes.items())}
+            total = RouteStats()
+            for stats in self.routes.values():
+                total.latencies_ms.extend(stats.latencies_ms)
+                total.errors += stats.errors
+                for status, n in stats.statuses.items():
+                    total.statuses[status] = total.statuses.get(status, 0) + n
+        return {"total": total.summary(seconds), "routes": routes}
+
+
+# --- состояние доменов ---
+
+
+@dataclass
+class DomainState:
+    domain_id: str
+    file_ids: list[str] = field(default_factory=list)
+    # Опубликованный индекс для поиска и «черновик», куда привязываются новые файлы и который публикуется
+    search_index_id: str | None = None
+    draft_index_id: str | None = None
+    unattached: deque = field(default_factory=deque)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _file_content(rng: random.Random, size: int) -> bytes:
+    words = " ".join(f"topic{rng.randrange(_TOPICS)}" for _ in range(64))
+    text = (f"load test document {rng.random():.6f} {words} ") * (size // 600 + 1)
+    return text.encode("utf-8")[:size]
+
+
+class LoadClient:
+    # Операции API поверх httpx.Client; маршрут в статистике — шаблон пути, а не конкретный id
+    def __init__(self, client: httpx.Client, recorder: Recorder, provider_type: str, upload_bytes: int) -> None:
+        self.client = client
+        self.recorder = recorder
+        self.provider_type = provider_type
+        self.upload_bytes = upload_bytes
+
+    def _request(self, route: str, method: str, url: str, domain: DomainState, *, started: float | None = None, **kwargs):
+        headers = {"X-Domain-Id": domain.domain_id}
+        started = time.perf_counter() if started is None else started
+        try:
+            response = self.client.request(method, url, headers=headers, **kwargs)
+            response.read()
+        except httpx.HTTPError as e:
+            self.recorder.record(route, (time.perf_counter() - started) * 1000, type(e).__name__, True)
+            return None
+        self.recorder.record(route, (time.perf_counter() - started) * 1000, str(response.status_code), response.status_code >= 400)
+        return response
+
+    def upload(self, domain: DomainState, rng: random.Random, started: float | None = None) -> str | None:
+        name = f"load-{rng.randrange(10**9):09d}.txt"
+        files = {"file": (name, _file_content(rng, self.upload_bytes), "text/plain")}
+        r = self._request("POST /api/v1/files", "POST", "/api/v1/files", domain, started=started, files=files)
+        if r is None or r.status_code >= 400:
+            return None
+        file_id = r.json()["id"]
+        with domain.lock:
+            domain.file_ids.append(file_id)
+            domain.unattached.append(file_id)
+        return file_id
+
+    def download(self, domain: DomainState, rng: random.Random, started: float | None = None) -> None:
+        with domain.lock:
+            file_id = rng.choice(domain.file_ids) if domain.file_ids else None
+        if file_id is None:
+            return
+        self._request("GET /api/v1/files/{file_id}/download", "GET", f"/api/v1/files/{file_id}/download", domain, started=started)
+
+    def search(self, domain: DomainState, rng: random.Random, started: float | None = None) -> None:
+        if domain.search_index_id is None:
+            return
+        payload = {"query": f"topic{rng.randrange(_TOPICS)} document", "max_num_results": 5}
+        url = f"/api/v1/indexes/{domain.search_index_id}/search"
+        self._request("POST /api/v1/indexes/{index_id}/search", "POST", url, domain, started=started, json=payload)
+
+    def attach(self, domain: DomainState, rng: random.Random, started: float | None = None) -> None:
+        with domain.lock:
+            file_id = domain.unattached.popleft() if domain.unattached else None
+        if file_id is None or domain.draft_index_id is None:
+            return
+        url = f"/api/v1/indexes/{domain.draft_index_id}/files/{file_id}"
+        self._request("POST /api/v1/indexes/{index_id}/files/{file_id}", "POST", url, domain, started=started, json={})
+
+    def publish(self, domain: DomainState, rng: random.Random, started: float | None = None) -> None:
+        if domain.draft_index_id is None:
+            return
+        url = f"/api/v1/indexes/{domain.draft_index_id}/publish"
+        self._request("POST /api/v1/indexes/{index_id}/publish", "POST", url, domain, started=started)
+
+    def list(self, domain: DomainState, rng: random.Random, started: float | None = None) -> None:
+        self._request("GET /api/v1/files", "GET", "/api/v1/files", domain, started=started, params={"limit": 50})
+
+    def create_index(self, domain: DomainState, file_ids: list[str], name: str) -> str:
+        payload = {"provider_type": self.provider_type, "name": name, "file_ids": file_ids}
+        r = self._request("POST /api/v1/indexes", "POST", "/api/v1/indexes", domain, json=payload)
+        if r is None or r.status_code >= 400:
+            raise RuntimeError(f"не удалось создать индекс в домене {domain.domain_id}: {r.text if r is not None else 'нет ответа'}")
+        return r.json()["id"]
+
+
+def seed_domains(load: LoadClient, domains: list[DomainState], files_per_domain: int, seed: int) -> None:
+    # Подготовка вне замера: файлы, опубликованный индекс для поиска и черновой индекс в каждом домене
+    rng = random.Random(seed)
+    for domain in domains:
+        for _ in range(files_per_domain):
+            if load.upload(domain, rng) is None:
+                raise RuntimeError(f"не удалось загрузить файл в домен {domain.domain_id}")
+        with domain.lock:
+            seeded = list(domain.file_ids)
+            domain.unattached.clear()
+        domain.search_index_id = load.create_index(domain, seeded, f"load-search-{domain.domain_id}")
+        r = load._request("seed publish", "POST", f"/api/v1/indexes/{domain.search_index_id}/publish", domain)
+        if r is None or r.status_code >= 400:
+            raise RuntimeError(f"не удалось опубликовать индекс домена {domain.domain_id}: {r.text if r is not None else 'нет ответа'}")
+        domain.draft_index_id = load.create_index(domain, [], f"load-draft-{domain.domain_id}")
+
+
+def run_load(
+    load: LoadClient,
+    domains: list[DomainState],
+    mix: dict[str, float],
+    *,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    rate: float,
+    seed: int,
+) -> float:
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    recorder = load.recorder
+    stop_at = time.perf_counter() + warmup + duration
+    # Интервал между запросами одного потока при заданной общей частоте
+    interval = concurrency / rate if rate > 0 else 0.0
+
+    def worker(n: int) -> None:
+        rng = random.Random(seed * 1000 + n)
+        next_at = time.perf_counter() + rng.random() * interval
+        while True:
+            scheduled = None
+            if interval:
+                now = time.perf_counter()
+                if next_at > now:
+                    time.sleep(next_at - now)
+                scheduled = next_at
+                next_at += interval
+            if time.perf_counter() >= stop_at:
+                return
+            domain = rng.choice(domains)
+            operation = rng.choices(names, weights)[0]
+            getattr(load, operation)(domain, rng, scheduled)
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    if warmup > 0:
+        time.sleep(warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    recorder.recording = False
+    return time.perf_counter() - started
+
+
+# --- окружение ---
+
+
+def _wait_http(url: str, timeout: float, process: subprocess.Popen | None = None) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"процесс завершился с кодом {process.returncode} до готовности {url}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} не ответил за {timeout:g} с")
+
+
+def _configure_provider_connection(provider_type: str, base_url: str) -> None:
+    from database import get_engine, get_session_maker, init_db
+    from services.providers_connections_service import ProvidersConnectionsService
+
+    init_db()
+    db = get_session_maker()()
+    try:
+        ProvidersConnectionsService(db=db).upsert_connection(
+            provider_type=provider_type,
+            base_url=base_url,
+            auth_type="api_key",
+            credentials={"api_key": "loadtest"},
+            token=None,
+            token_expires_at=None,
+            is_enabled=True,
+        )
+    finally:
+        db.close()
+    # Соединения этого процесса не нужны серверу приложения
+    get_engine().dispose()
+
+
+class Stand:
+    # Приложение и провайдер для прогона; client() — httpx.Client к приложению
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self._processes: list[subprocess.Popen] = []
+        self._tmp: tempfile.TemporaryDirectory | None = None
+        self._transport: httpx.BaseTransport | None = None
+        self.base_url = args.url
+
+    def start(self) -> Stand:
+        args = self.args
+        if args.url:
+            return self
+
+        self._tmp = tempfile.TemporaryDirectory(prefix="loadtest-")
+        workdir = Path(self._tmp.name)
+        sys.path.insert(0, str(BENCH_DIR))
+        from harness import prepare_environment
+
+        prepare_environment(workdir, dict(args.env), args.database_uri)
+
+        from fake_provider import FakeProviderSettings, create_fake_provider_app
+
+        provider_settings = FakeProviderSettings(
+            latency_ms=args.provider_latency_ms,
+            error_rate=args.provider_error_rate,
+            max_page_size=1_000_000,
+            seed=args.seed,
+        )
+
+        if args.in_process:
+            from fake_provider import ASGIBridgeTransport, install_in_process
+
+            provider_url = install_in_process(create_fake_provider_app(provider_settings))
+            _configure_provider_connection(args.provider_type, provider_url)
+
+            import main
+
+            self._transport = ASGIBridgeTransport(main.app)
+            self.base_url = "http://app.local"
+            return self
+
+        provider_port = _free_port()
+        self._spawn(
+            [
+                sys.executable,
+                str(BENCH_DIR / "fake_provider.py"),
+                "--port",
+                str(provider_port),
+                "--latency-ms",
+                str(provider_settings.latency_ms),
+                "--error-rate",
+                str(provider_settings.error_rate),
+                "--max-page-size",
+                str(provider_settings.max_page_size),
+                "--seed",
+                str(provider_settings.seed),
+            ],
+            cwd=BENCH_DIR,
+        )
+        provider_url = f"http://127.0.0.1:{provider_port}"
+        _wait_http(f"{provider_url}/_fake/stats", 30, self._processes[-1])
+        _configure_provider_connection(args.provider_type, f"{provider_url}/v1")
+
+        app_port = _free_port()
+        self._spawn(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:app",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(app_port),
+                "--workers",
+                str(args.workers),
+                "--log-level",
+                "warning",
+            ],
+            cwd=APP_DIR,
+        )
+        self.base_url = f"http://127.0.0.1:{app_port}"
+        _wait_http(f"{self.base_url}/health", 60, self._processes[-1])
+        return self
+
+    def _spawn(self, cmd: list[str], *, cwd: Path) -> None:
+        self._processes.append(subprocess.Popen(cmd, cwd=cwd, env=dict(os.environ), stdout=subprocess.DEVNULL))
+
+    def client(self, concurrency: int) -> httpx.Client:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        return httpx.Client(
+            base_url=self.base_url,
+            transport=self._transport,
+            limits=limits,
+            timeout=httpx.Timeout(self.args.request_timeout),
+        )
+
+    def stop(self) -> None:
+        for process in reversed(self._processes):
+            process.terminate()
+        for process in reversed(self._processes):
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._processes.clear()
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+
+    def __enter__(self) -> Stand:
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+def _print_table(report: dict) -> None:
+    header = f"{'маршрут':<52} {'запросов':>8} {'rps':>8} {'ошибки':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    print(header, file=sys.stderr)
+    rows = list(report["routes"].items()) + [("ВСЕГО", report["total"])]
+    for route, s in rows:
+        print(
+            f"{route:<52} {s['requests']:>8} {s['rps']:>8.1f} {s['error_rate']:>7.2%} "
+            f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}",
+            file=sys.stderr,
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон API на локальном провайдере")
+    parser.add_argument("--url", help="адрес уже запущенного приложения вместо локального стенда")
+    parser.add_argument("--in-process", action="store_true", help="приложение и провайдер в этом процессе, без uvicorn")
+    parser.add_argument("--workers", type=int, default=1, help="процессов uvicorn")
+    parser.add_argument("--env", type=_parse_env, action="append", default=[], help="KEY=VALUE для приложения (можно несколько раз)")
+    parser.add_argument("--database-uri", help="DATABASE_URI вместо временной SQLite (пустая БД MariaDB/MySQL)")
+    parser.add_argument("--provider-type", default="openai")
+    parser.add_argument("--provider-latency-ms", type=float, default=20.0, help="задержка ответов локального провайдера")
+    parser.add_argument("--provider-error-rate", type=float, default=0.0, help="доля ответов провайдера с ошибкой")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix(DEFAULT_MIX), help=f"веса операций (по умолчанию {DEFAULT_MIX})")
+    parser.add_argument("--domains", type=int, default=10, help="число X-Domain-Id")
+    parser.add_argument("--files-per-domain", type=int, default=20, help="файлов в домене перед прогоном")
+    parser.add_argument("--upload-bytes", type=int, default=64 * 1024, help="размер загружаемого файла")
+    parser.add_argument("--concurrency", type=int, default=16, help="параллельных клиентов")
+    parser.add_argument("--rate", type=float, default=0.0, help="общая частота запросов в секунду; 0 — замкнутая нагрузка")
+    parser.add_argument("--duration", type=float, default=30.0, help="длительность замера, с")
+    parser.add_argument("--warmup", type=float, default=5.0, help="прогрев без учёта в статистике, с")
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="файл для JSON с результатами (по умолчанию — stdout)")
+    args = parser.parse_args(argv)
+
+    if args.in_process and args.workers != 1:
+        print("--workers не действует с --in-process", file=sys.stderr)
+    if not args.url and not args.in_process and importlib.util.find_spec("uvicorn") is None:
+        parser.error("для запуска стенда нужен uvicorn; без него — --in-process или --url")
+
+    recorder = Recorder()
+    with Stand(args) as stand:
+        with stand.client(args.concurrency) as client:
+            load = LoadClient(client, recorder, args.provider_type, args.upload_bytes)
+            domains = [DomainState(domain_id=f"load-{n:03d}") for n in range(args.domains)]
+            print(f"подготовка: {args.domains} доменов по {args.files_per_domain} файлов ...", file=sys.stderr, flush=True)
+            seed_domains(load, domains, args.files_per_domain, args.seed)
+            print(f"нагрузка: {args.concurrency} клиентов, {args.duration:g} с ...", file=sys.stderr, flush=True)
+            seconds = run_load(
+                load,
+                domains,
+                args.mix,
+                concurrency=args.concurrency,
+                duration=args.duration,
+                warmup=args.warmup,
+                rate=args.rate,
+                seed=args.seed,
+            )
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "target": args.url or ("in-process" if args.in_process else "uvicorn"),
+            "workers": 1 if args.in_process else args.workers,
+            "database": "sqlite" if not args.database_uri else args.database_uri.split(":", 1)[0],
+            "env": dict(args.env),
+            "mix": args.mix,
+            "domains": args.domains,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "duration_seconds": round(seconds, 3),
+            "seed": args.seed,
+        },
+        **recorder.report(seconds),
+    }
+    _print_table(report)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
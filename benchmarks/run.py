@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+# Запуск бенчмарков: каждая пара (сценарий, размер) — отдельный дочерний процесс со своей
+# временной БД, чтобы пиковый RSS и кеши одного прогона не влияли на другой.
+#
+#   python benchmarks/run.py --output bench.json
+#   python benchmarks/run.py --scenario publish --sizes 100,10000,100000
+#   python benchmarks/run.py --baseline benchmarks/baseline.json --tolerance 0.25
+#
+# С --baseline код возврата 1, если время выросло больше допуска или выросло число
+# SQL-запросов / вызовов провайдера (они детерминированы, по умолчанию допуск нулевой).
+
+import argparse
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import tempfile
+import traceback
+
+BENCH_DIR = Path(__file__).resolve().parent
+
+# Метрики, по которым считается регрессия: время — с допуском --tolerance, счётчики — --count-tolerance
+_TIME_METRICS = ("wall_seconds",)
+_COUNT_METRICS = ("db_queries", "provider_calls")
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_child(scenario_name: str, size: int, database_uri: str | None) -> dict:
+    # Выполняется в дочернем процессе; окружение — до импорта модулей приложения
+    sys.path.insert(0, str(BENCH_DIR))
+    from harness import prepare_environment
+    from scenarios import SCENARIOS
+
+    spec = SCENARIOS[scenario_name]
+    with tempfile.TemporaryDirectory(prefix=f"bench-{scenario_name}-") as tmp:
+        workdir = Path(tmp)
+        env = {key: value.format(workdir=workdir) for key, value in spec.env.items()}
+        prepare_environment(workdir, env, database_uri)
+
+        from harness import BenchContext, peak_rss_kb
+
+        ctx = BenchContext(workdir)
+        try:
+            run = spec.setup(ctx, size)
+            with ctx.measure() as m:
+                extra = run() or {}
+        finally:
+            ctx.close()
+
+        return {
+            "scenario": scenario_name,
+            "size": size,
+            "wall_seconds": round(m.wall_seconds, 6),
+            "db_queries": m.db_queries,
+            "provider_calls": m.provider_calls,
+            "provider_calls_by_operation": m.provider_calls_by_operation,
+            "peak_rss_kb": peak_rss_kb(),
+            "extra": extra,
+        }
+
+
+def run_in_subprocess(scenario_name: str, size: int, database_uri: str | None, timeout: float) -> dict:
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--child", scenario_name, str(size)]
+    if database_uri:
+        cmd += ["--database-uri", database_uri]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"scenario": scenario_name, "size": size, "error": f"таймаут {timeout:g} с"}
+
+    # Результат — последняя строка stdout; всё остальное (предупреждения, логи) идёт в stderr
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode == 0 and lines:
+        try:
+            return json.loads(lines[-1])
+        except json.JSONDecodeError:
+            pass
+    tail = (proc.stderr or proc.stdout).strip().splitlines()[-20:]
+    return {"scenario": scenario_name, "size": size, "error": "\n".join(tail) or f"код возврата {proc.returncode}"}
+
+
+def compare_with_baseline(results: list[dict], baseline: dict, *, tolerance: float, count_tolerance: float) -> list[str]:
+    base_by_key = {(r["scenario"], r["size"]): r for r in baseline.get("results", []) if "error" not in r}
+    regressions: list[str] = []
+    for result in results:
+        key = (result["scenario"], result["size"])
+        base = base_by_key.get(key)
+        if base is None or "error" in result:
+            continue
+        for metric, allowed in [(m, tolerance) for m in _TIME_METRICS] + [(m, count_tolerance) for m in _COUNT_METRICS]:
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            limit = old * (1 + allowed)
+            if new > limit:
+                regressions.append(f"{key[0]}[{key[1]}] {metric}: {old} -> {new} (допуск {allowed:.0%})")
+    return regressions
+
+
+def _parse_sizes(value: str) -> list[int]:
+    return [int(part.replace("_", "")) for part in value.split(",") if part.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки публикации, синхронизации и поиска на локальном провайдере")
+    parser.add_argument("--scenario", action="append", help="сценарий (можно несколько раз); по умолчанию — все")
+    parser.add_argument("--sizes", type=_parse_sizes, help="размеры через запятую вместо размеров сценария по умолчанию")
+    parser.add_argument("--output", type=Path, help="файл для JSON с результатами (по умолчанию — stdout)")
+    parser.add_argument("--baseline", type=Path, help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост времени, доля (0.2 = +20%%)")
+    parser.add_argument("--count-tolerance", type=float, default=0.0, help="допустимый рост числа запросов и вызовов")
+    parser.add_argument("--database-uri", help="DATABASE_URI вместо временной SQLite (пустая БД MariaDB/MySQL)")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="таймаут одного прогона, с")
+    parser.add_argument("--list", action="store_true", help="показать сценарии и выйти")
+    parser.add_argument("--child", nargs=2, metavar=("SCENARIO", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        try:
+            result = run_child(args.child[0], int(args.child[1]), args.database_uri)
+        except Exception:
+            traceback.print_exc()
+            return 1
+        print(json.dumps(result, ensure_ascii=False))
+        return 0
+
+    sys.path.insert(0, str(BENCH_DIR))
+    # Список сценариев без импорта приложения: scenarios импортирует harness, но не app
+    from scenarios import SCENARIOS
+
+    if args.list:
+        for spec in SCENARIOS.values():
+            sizes = ",".join(str(s) for s in spec.default_sizes)
+            print(f"{spec.name:<28} [{sizes}] {spec.description}")
+        return 0
+
+    names = args.scenario or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(unknown)}")
+
+    results: list[dict] = []
+    for name in names:
+        for size in args.sizes or SCENARIOS[name].default_sizes:
+            print(f"{name}[{size}] ...", file=sys.stderr, flush=True)
+            result = run_in_subprocess(name, size, args.database_uri, args.timeout)
+            if "error" in result:
+                print(f"{name}[{size}] ошибка:\n{result['error']}", file=sys.stderr)
+            else:
+                print(
+                    f"{name}[{size}] {result['wall_seconds']:.3f} с, SQL {result['db_queries']}, "
+                    f"провайдер {result['provider_calls']}, RSS {result['peak_rss_kb']} КиБ",
+                    file=sys.stderr,
+                )
+            results.append(result)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": "sqlite" if not args.database_uri else args.database_uri.split(":", 1)[0],
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    failed = any("error" in r for r in results)
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_with_baseline(
+            results,
+            baseline,
+            tolerance=args.tolerance,
+            count_tolerance=args.count_tolerance,
+        )
+        for line in regressions:
+            print(f"РЕГРЕССИЯ {line}", file=sys.stderr)
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,598 @@
+from __future__ import annotations
+
+# Сценарии бенчмарков. Каждый сценарий — setup(ctx, size) -> run: наполнение БД и провайдера
+# не замеряется, run() выполняется внутри ctx.measure() и возвращает дополнительные показатели.
+# size — объём данных сценария (файлов, индексов или запросов, см. description).
+
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import os
+import statistics
+import time
+
+from harness import BENCH_DOMAIN_ID, BENCH_PROVIDER_TYPE, BenchContext
+
+_HEADERS = {"X-Domain-Id": BENCH_DOMAIN_ID}
+
+# Файлов в одном vector store провайдера при наполнении сценариев синхронизации
+_FILES_PER_VECTOR_STORE = 100
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    description: str
+    setup: Callable[[BenchContext, int], Callable[[], dict]]
+    default_sizes: tuple[int, ...]
+    # Переменные окружения дочернего процесса; "{workdir}" заменяется временным каталогом прогона
+    env: dict[str, str] = field(default_factory=dict)
+
+
+SCENARIOS: dict[str, Scenario] = {}
+
+
+def scenario(name: str, description: str, *, default_sizes: tuple[int, ...], env: dict[str, str] | None = None):
+    def decorator(setup: Callable[[BenchContext, int], Callable[[], dict]]):
+        SCENARIOS[name] = Scenario(name, description, setup, default_sizes, env or {})
+        return setup
+
+    return decorator
+
+
+def _percentiles(samples_ms: list[float]) -> dict:
+    if not samples_ms:
+        return {}
+    ordered = sorted(samples_ms)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "mean_ms": round(statistics.fmean(ordered), 3)}
+
+
+def _test_client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # Без контекстного менеджера: startup (воркеры очереди, опрос статусов) не запускается
+    return TestClient(main.app)
+
+
+async def _asgi_request(app, method: str, path: str, headers: dict[str, str], body: Iterable[bytes] = ()) -> dict:
+    # Запрос напрямую в ASGI-приложение с телом, отдаваемым кусками (как из сокета uvicorn):
+    # TestClient собирает тело в памяти целиком, что для гигабайтных загрузок не годится.
+    # Параллельно тикает таймер — максимальная задержка его пробуждения показывает, блокировался ли цикл событий.
+    import anyio
+
+    body_iter = iter(body)
+    result = {"status": None, "headers": {}, "body_bytes": 0, "body": bytearray(), "max_loop_stall_ms": 0.0}
+    done = anyio.Event()
+    response_sent = anyio.Event()
+    body_sent = False
+
+    async def receive() -> dict:
+        nonlocal body_sent
+        if body_sent:
+            # Как у сервера: после тела запроса следующее сообщение — отключение клиента по окончании ответа
+            await response_sent.wait()
+            return {"type": "http.disconnect"}
+        chunk = next(body_iter, None)
+        if chunk is None:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            result["headers"] = {k.decode("latin-1"): v.decode("latin-1") for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            result["body_bytes"] += len(chunk)
+            if len(result["body"]) < 64 * 1024:
+                result["body"] += chunk[: 64 * 1024]
+            if not message.get("more_body", False):
+                response_sent.set()
+
+    async def ticker() -> None:
+        interval = 0.005
+        while not done.is_set():
+            started = time.perf_counter()
+            await anyio.sleep(interval)
+            stall_ms = (time.perf_counter() - started - interval) * 1000
+            result["max_loop_stall_ms"] = max(result["max_loop_stall_ms"], stall_ms)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(ticker)
+        try:
+            await app(scope, receive, send)
+        finally:
+            done.set()
+            response_sent.set()
+    result["max_loop_stall_ms"] = round(result["max_loop_stall_ms"], 3)
+    return result
+
+
+def _seed_provider_files(ctx: BenchContext, size: int) -> list[str]:
+    vector_store_ids = []
+    remaining = size
+    while remaining > 0:
+        count = min(_FILES_PER_VECTOR_STORE, remaining)
+        vector_store_ids.append(ctx.seed_provider_vector_store(count))
+        remaining -= count
+    return vector_store_ids
+
+
+@scenario("publish", "IndexPublishService.publish индекса из size новых файлов", default_sizes=(100, 10_000))
+def publish(ctx: BenchContext, size: int):
+    from services.index_publish_service import IndexPublishService
+
+    index_id = ctx.seed_index(ctx.seed_files(size))
+
+    def run() -> dict:
+        db = ctx.session_maker()
+        try:
+            result = IndexPublishService(db=db, domain_id=BENCH_DOMAIN_ID).publish(index_id=index_id)
+        finally:
+            db.close()
+        return {"errors": len(result.get("errors") or [])}
+
+    return run
+
+
+@scenario(
+    "provider_sync",
+    "ProviderSyncService.sync: size файлов у провайдера (по 100 в vector store) импортируются в БД",
+    default_sizes=(100, 10_000),
+)
+def provider_sync(ctx: BenchContext, size: int):
+    from services.provider_sync_service import ProviderSyncService
+
+    _seed_provider_files(ctx, size)
+
+    def run() -> dict:
+        db = ctx.session_maker()
+        try:
+            report = ProviderSyncService(db=db).sync(BENCH_PROVIDER_TYPE)
+        finally:
+            db.close()
+        return {
+            "indexes_created": report["indexes_created"],
+            "files_created": report["files_created"],
+            "errors": len(report["errors"]),
+        }
+
+    return run
+
+
+@scenario(
+    "provider_sync_info_logging",
+    "provider_sync при LOG_LEVEL=INFO с записью в файл — цена логирования синхронизации",
+    default_sizes=(1_000,),
+    env={"LOG_LEVEL": "INFO", "LOG_FILE": "{workdir}/bench.log"},
+)
+def provider_sync_info_logging(ctx: BenchContext, size: int):
+    return provider_sync(ctx, size)
+
+
+@scenario(
+    "indexes_sync",
+    "IndexesSyncService.sync_domain_indexes: size файлов в индексах по 100, статус с провайдера",
+    default_sizes=(100, 10_000),
+)
+def indexes_sync(ctx: BenchContext, size: int):
+    from services.indexes_sync_service import IndexesSyncService
+
+    for vector_store_id in _seed_provider_files(ctx, size):
+        ctx.seed_index([], external_id=vector_store_id, indexing_status="in_progress")
+
+    def run() -> dict:
+        db = ctx.session_maker()
+        try:
+            result = IndexesSyncService(db=db, domain_id=BENCH_DOMAIN_ID).sync_domain_indexes(
+                provider_type=BENCH_PROVIDER_TYPE,
+                force=True,
+            )
+        finally:
+            db.close()
+        return {"indexes": len(result["items"]), "errors": len(result["errors"])}
+
+    return run
+
+
+@scenario("search", "IndexSearchService.search: 200 запросов к индексу из size файлов", default_sizes=(100, 10_000))
+def search(ctx: BenchContext, size: int):
+    from services.index_search_service import IndexSearchService
+
+    vector_store_id = ctx.seed_provider_vector_store(size)
+    index_id = ctx.seed_index([], external_id=vector_store_id, indexing_status="completed")
+
+    def run() -> dict:
+        samples: list[float] = []
+        for i in range(200):
+            db = ctx.session_maker()
+            started = time.perf_counter()
+            try:
+                IndexSearchService(db=db, domain_id=BENCH_DOMAIN_ID).search(
+                    index_id=index_id,
+                    query=f"benchmark topic{i % 50}",
+                    max_num_results=10,
+                )
+            finally:
+                db.close()
+            samples.append((time.perf_counter() - started) * 1000)
+        return {"searches": len(samples), **_percentiles(samples)}
+
+    return run
+
+
+@scenario(
+    "files_pagination",
+    "GET /api/v1/files по 100: обход курсором и последняя страница через skip при size файлов",
+    default_sizes=(10_000,),
+)
+def files_pagination(ctx: BenchContext, size: int):
+    ctx.seed_files(size, size_bytes=16)
+    client = _test_client()
+
+    def run() -> dict:
+        page_ms: list[float] = []
+        after = None
+        pages = 0
+        while True:
+            params = {"limit": 100}
+            if after:
+                params["after"] = after
+            started = time.perf_counter()
+            r = client.get("/api/v1/files", params=params, headers=_HEADERS)
+            page_ms.append((time.perf_counter() - started) * 1000)
+            r.raise_for_status()
+            pages += 1
+            after = r.json().get("next_cursor")
+            if not after:
+                break
+
+        skip_ms: list[float] = []
+        for _ in range(5):
+            started = time.perf_counter()
+            r = client.get("/api/v1/files", params={"limit": 100, "skip": max(0, size - 100)}, headers=_HEADERS)
+            skip_ms.append((time.perf_counter() - started) * 1000)
+            r.raise_for_status()
+
+        return {
+            "pages": pages,
+            "cursor_first_page_ms": round(page_ms[0], 3),
+            "cursor_last_page_ms": round(page_ms[-1], 3),
+            "skip_last_page_ms": round(statistics.median(skip_ms), 3),
+        }
+
+    return run
+
+
+@scenario(
+    "indexes_list_serialization",
+    "GET /api/v1/indexes?limit=1000 (20 раз) при size индексах — сериализация ответа",
+    default_sizes=(1_000,),
+)
+def indexes_list_serialization(ctx: BenchContext, size: int):
+    for _ in range(size):
+        ctx.seed_index([])
+    client = _test_client()
+
+    def run() -> dict:
+        samples: list[float] = []
+        body_bytes = 0
+        for _ in range(20):
+            started = time.perf_counter()
+            r = client.get("/api/v1/indexes", params={"limit": 1000}, headers=_HEADERS)
+            samples.append((time.perf_counter() - started) * 1000)
+            r.raise_for_status()
+            body_bytes = len(r.content)
+        return {"response_bytes": body_bytes, **_percentiles(samples)}
+
+    return run
+
+
+@scenario(
+    "middleware_rps",
+    "size последовательных запросов GET /health и скачивания файла 64 КиБ — накладные расходы middleware",
+    default_sizes=(2_000,),
+)
+def middleware_rps(ctx: BenchContext, size: int):
+    (file_id,) = ctx.seed_files(1, size_bytes=64 * 1024)
+    client = _test_client()
+
+    def run() -> dict:
+        started = time.perf_counter()
+        for _ in range(size):
+            client.get("/health").raise_for_status()
+        health_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(size):
+            client.get(f"/api/v1/files/{file_id}/download", headers=_HEADERS).raise_for_status()
+        download_seconds = time.perf_counter() - started
+
+        return {
+            "health_rps": round(size / health_seconds, 1),
+            "download_rps": round(size / download_seconds, 1),
+        }
+
+    return run
+
+
+@scenario(
+    "db_pool_concurrency",
+    "size запросов GET /api/v1/indexes из 200 потоков — ожидание соединения из пула БД",
+    default_sizes=(1_000,),
+)
+def db_pool_concurrency(ctx: BenchContext, size: int):
+    from database import DB_POOL_WAIT_SECONDS
+
+    for _ in range(50):
+        ctx.seed_index([])
+    client = _test_client()
+
+    def one(_: int) -> float:
+        started = time.perf_counter()
+        client.get("/api/v1/indexes", params={"limit": 50}, headers=_HEADERS).raise_for_status()
+        return (time.perf_counter() - started) * 1000
+
+    def run() -> dict:
+        wait = DB_POOL_WAIT_SECONDS.labels()
+        count_before, sum_before = wait.count, wait.sum
+        with ThreadPoolExecutor(max_workers=min(200, size)) as pool:
+            samples = list(pool.map(one, range(size)))
+        extra = {"concurrency": min(200, size), **_percentiles(samples)}
+        # У SQLite свой пул без замера ожидания — показатель есть только для MariaDB/MySQL
+        if wait.count > count_before:
+            extra["pool_wait_mean_ms"] = round((wait.sum - sum_before) / (wait.count - count_before) * 1000, 3)
+        return extra
+
+    return run
+
+
+@scenario(
+    "provider_transport",
+    "size вызовов retrieve_vector_store по сокету: общий пул keep-alive против нового клиента на вызов",
+    default_sizes=(500,),
+)
+def provider_transport(ctx: BenchContext, size: int):
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        return lambda: {"skipped": "нужен uvicorn"}
+
+    from openai import OpenAI
+
+    from fake_provider import FakeProviderServer
+    from services.providers_connections_service import ProvidersConnectionsService
+
+    vector_store_id = ctx.seed_provider_vector_store(1)
+    server = FakeProviderServer(ctx.fake_app).start()
+    db = ctx.session_maker()
+    try:
+        ProvidersConnectionsService(db=db).upsert_connection(
+            provider_type=BENCH_PROVIDER_TYPE,
+            base_url=server.base_url,
+            auth_type="api_key",
+            credentials={"api_key": "bench"},
+            token=None,
+            token_expires_at=None,
+            is_enabled=True,
+        )
+    finally:
+        db.close()
+
+    def run() -> dict:
+        db = ctx.session_maker()
+        try:
+            started = time.perf_counter()
+            for _ in range(size):
+                # Как в обработчике запроса: провайдер собирается заново, пул соединений общий
+                ProvidersConnectionsService(db=db).get_provider(BENCH_PROVIDER_TYPE).retrieve_vector_store(vector_store_id)
+            pooled_seconds = time.perf_counter() - started
+        finally:
+            db.close()
+
+        started = time.perf_counter()
+        for _ in range(size):
+            # Прежнее поведение: клиент SDK с настройками httpx по умолчанию на каждый экземпляр провайдера
+            with OpenAI(api_key="bench", base_url=server.base_url, max_retries=0) as client:
+                client.vector_stores.retrieve(vector_store_id)
+        fresh_seconds = time.perf_counter() - started
+        server.stop()
+
+        return {
+            "pooled_ms_per_call": round(pooled_seconds / size * 1000, 3),
+            "fresh_client_ms_per_call": round(fresh_seconds / size * 1000, 3),
+        }
+
+    return run
+
+
+_UPLOAD_BOUNDARY = "bench-upload-boundary"
+# Размер сообщений тела запроса — как при чтении из сокета uvicorn
+_UPLOAD_MESSAGE_BYTES = 64 * 1024
+
+
+def _multipart_upload_body(total_bytes: int, block: bytes) -> tuple[int, Callable[[], Iterable[bytes]]]:
+    # Тело multipart/form-data с одним файлом total_bytes, генерируется по ходу отправки из повторяющегося блока
+    head = (
+        f"--{_UPLOAD_BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="big.bin"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{_UPLOAD_BOUNDARY}--\r\n".encode()
+    views = [block[i : i + _UPLOAD_MESSAGE_BYTES] for i in range(0, len(block), _UPLOAD_MESSAGE_BYTES)]
+
+    def body() -> Iterable[bytes]:
+        yield head
+        sent = 0
+        while sent < total_bytes:
+            for view in views:
+                if sent >= total_bytes:
+                    break
+                part = view[: total_bytes - sent]
+                sent += len(part)
+                yield part
+        yield tail
+
+    return len(head) + total_bytes + len(tail), body
+
+
+@scenario(
+    "upload_throughput",
+    "Загрузка файла size МиБ через POST /files: потоковая запись против разбора формы Starlette с копированием",
+    default_sizes=(1024,),
+)
+def upload_throughput(ctx: BenchContext, size: int):
+    import shutil
+
+    import anyio
+    from starlette.requests import Request
+
+    import main
+
+    total_bytes = size * 1024 * 1024
+    content_length, body = _multipart_upload_body(total_bytes, os.urandom(4 * 1024 * 1024))
+    headers = {
+        **_HEADERS,
+        "content-type": f"multipart/form-data; boundary={_UPLOAD_BOUNDARY}",
+        "content-length": str(content_length),
+    }
+    legacy_path = ctx.workdir / "legacy-upload.bin"
+
+    async def legacy_app(scope, receive, send) -> None:
+        # Прежний путь: Starlette разбирает форму во временный SpooledTemporaryFile,
+        # затем синхронный обработчик копирует его в FILES_ROOT блоками по 1 МиБ
+        form = await Request(scope, receive).form(max_part_size=1024 * 1024)
+        upload = form["file"]
+
+        def copy() -> None:
+            with open(legacy_path, "wb") as f:
+                shutil.copyfileobj(upload.file, f, 1024 * 1024)
+            upload.file.close()
+
+        await anyio.to_thread.run_sync(copy)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    def run() -> dict:
+        started = time.perf_counter()
+        result = anyio.run(_asgi_request, main.app, "POST", "/api/v1/files", headers, body())
+        streaming_seconds = time.perf_counter() - started
+        if result["status"] != 200:
+            raise RuntimeError(f"POST /files: {result['status']} {bytes(result['body'][:500])!r}")
+
+        started = time.perf_counter()
+        legacy = anyio.run(_asgi_request, legacy_app, "POST", "/", headers, body())
+        legacy_seconds = time.perf_counter() - started
+        legacy_path.unlink(missing_ok=True)
+
+        return {
+            "streaming_mib_per_s": round(size / streaming_seconds, 1),
+            "streaming_max_loop_stall_ms": result["max_loop_stall_ms"],
+            "legacy_mib_per_s": round(size / legacy_seconds, 1),
+            "legacy_max_loop_stall_ms": legacy["max_loop_stall_ms"],
+        }
+
+    return run
+
+
+_DOWNLOAD_CONCURRENCY = 8
+
+
+@scenario(
+    "download_concurrency",
+    f"{_DOWNLOAD_CONCURRENCY} одновременных скачиваний файла size МиБ: GET /files/{{id}}/download против "
+    "FileResponse Starlette по умолчанию, и повторная проверка по If-None-Match",
+    default_sizes=(256,),
+)
+def download_concurrency(ctx: BenchContext, size: int):
+    import anyio
+    from starlette.responses import FileResponse
+
+    import main
+    from models.rag_file import RagFile
+    from services.files_service import backfill_content_sha256
+
+    (file_id,) = ctx.seed_files(1)
+    db = ctx.session_maker()
+    try:
+        rag_file = db.get(RagFile, file_id)
+        local_path = rag_file.local_path
+        block = os.urandom(4 * 1024 * 1024)
+        with open(local_path, "wb") as f:
+            for _ in range(size // 4 or 1):
+                f.write(block)
+        rag_file.size_bytes = os.path.getsize(local_path)
+        db.commit()
+    finally:
+        db.close()
+    etag = f'"{backfill_content_sha256(file_id)}"'
+    path = f"/api/v1/files/{file_id}/download"
+    mib = os.path.getsize(local_path) / (1024 * 1024)
+
+    async def legacy_app(scope, receive, send) -> None:
+        # Прежний ответ: FileResponse без ETag по содержимому, чтение блоками по 64 КиБ
+        await FileResponse(local_path, media_type="application/octet-stream")(scope, receive, send)
+
+    async def download_all(app, request_path: str) -> dict:
+        samples_ms: list[float] = []
+        stalls: list[float] = []
+
+        async def one() -> None:
+            started = time.perf_counter()
+            result = await _asgi_request(app, "GET", request_path, _HEADERS)
+            if result["status"] != 200:
+                raise RuntimeError(f"GET {request_path}: {result['status']}")
+            samples_ms.append((time.perf_counter() - started) * 1000)
+            stalls.append(result["max_loop_stall_ms"])
+
+        started = time.perf_counter()
+        async with anyio.create_task_group() as tg:
+            for _ in range(_DOWNLOAD_CONCURRENCY):
+                tg.start_soon(one)
+        seconds = time.perf_counter() - started
+        return {
+            "mib_per_s": round(mib * _DOWNLOAD_CONCURRENCY / seconds, 1),
+            "max_loop_stall_ms": max(stalls),
+            **_percentiles(samples_ms),
+        }
+
+    async def revalidate(count: int) -> float:
+        started = time.perf_counter()
+        for _ in range(count):
+            result = await _asgi_request(main.app, "GET", path, {**_HEADERS, "if-none-match": etag})
+            if result["status"] != 304:
+                raise RuntimeError(f"If-None-Match: {result['status']}")
+        return (time.perf_counter() - started) / count * 1000
+
+    def run() -> dict:
+        current = anyio.run(download_all, main.app, path)
+        legacy = anyio.run(download_all, legacy_app, "/")
+        return {
+            "concurrency": _DOWNLOAD_CONCURRENCY,
+            "download": current,
+            "legacy_file_response": legacy,
+            "not_modified_ms_per_request": round(anyio.run(revalidate, 200), 3),
+        }
+
+    return run
@@ -0,0 +1,43 @@
+-- Составные индексы для keyset-пагинации списков (сортировка created_at DESC, id DESC)
+-- Миграция: 0009_add_keyset_pagination_indexes.sql
+
+SET @db := DATABASE();
+
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.STATISTICS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_files' AND INDEX_NAME = 'ix_rag_files_domain_created_id'
+    ),
+    'SELECT 1',
+    'CREATE INDEX ix_rag_files_domain_created_id ON rag_files (domain_id, created_at, id)'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
+
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.STATISTICS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_indexes' AND INDEX_NAME = 'ix_rag_indexes_domain_created_id'
+    ),
+    'SELECT 1',
+    'CREATE INDEX ix_rag_indexes_domain_created_id ON rag_indexes (domain_id, created_at, id)'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
+
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.STATISTICS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_provider_file_uploads' AND INDEX_NAME = 'ix_rag_provider_file_uploads_provider_created_id'
+    ),
+    'SELECT 1',
+    'CREATE INDEX ix_rag_provider_file_uploads_provider_created_id ON rag_provider_file_uploads (provider_id, created_at, id)'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
@@ -0,0 +1,49 @@
+-- Индексы для горячих выборок синхронизации, публикации и смены домена файла
+-- Миграция: 0010_add_sync_and_publish_lookup_indexes.sql
+--
+-- rag_provider_file_uploads уже покрыт: (provider_id, local_file_id) — уникальный ключ
+-- uq_rag_provider_file_uploads_provider_file, local_file_id — ix_rag_provider_file_uploads_local_file_id.
+
+SET @db := DATABASE();
+
+-- RagIndex по (provider_type, external_id): ProviderSyncService
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.STATISTICS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_indexes' AND INDEX_NAME = 'ix_rag_indexes_provider_external'
+    ),
+    'SELECT 1',
+    'CREATE INDEX ix_rag_indexes_provider_external ON rag_indexes (provider_type, external_id)'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
+
+-- RagIndexFile по file_id: FilesService.change_domain (в БД, созданных через create_all, индекса не было)
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.STATISTICS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_index_files' AND INDEX_NAME = 'ix_rag_index_files_file_id'
+    ),
+    'SELECT 1',
+    'CREATE INDEX ix_rag_index_files_file_id ON rag_index_files (file_id)'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
+
+-- RagIndexFile по index_id с сортировкой include_order: список файлов индекса, publish
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.STATISTICS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_index_files' AND INDEX_NAME = 'ix_rag_index_files_index_order'
+    ),
+    'SELECT 1',
+    'CREATE INDEX ix_rag_index_files_index_order ON rag_index_files (index_id, include_order)'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
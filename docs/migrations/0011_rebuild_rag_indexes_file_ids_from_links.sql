@@ -0,0 +1,13 @@
+-- rag_index_files — источник правды о составе индекса.
+-- Пересобираем производное поле rag_indexes.file_ids из связей (порядок — include_order).
+-- Требуется MariaDB 10.5+ (ORDER BY внутри JSON_ARRAYAGG).
+
+UPDATE rag_indexes i
+SET i.file_ids = COALESCE(
+  (
+    SELECT JSON_ARRAYAGG(f.file_id ORDER BY f.include_order, f.file_id)
+    FROM rag_index_files f
+    WHERE f.index_id = i.id
+  ),
+  JSON_ARRAY()
+);
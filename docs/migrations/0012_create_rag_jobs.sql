@@ -0,0 +1,38 @@
+-- Очередь фоновых задач (публикация, переиндексация, синхронизация индексов/провайдера).
+-- Захват задачи — условным UPDATE (status/lease_owner), без SELECT ... FOR UPDATE SKIP LOCKED.
+CREATE TABLE IF NOT EXISTS rag_jobs (
+  id VARCHAR(36) NOT NULL,
+
+  job_type VARCHAR(32) NOT NULL,
+  domain_id VARCHAR(128) NULL,
+  index_id VARCHAR(36) NULL,
+  provider_type VARCHAR(32) NULL,
+  params JSON NULL,
+
+  status VARCHAR(16) NOT NULL DEFAULT 'queued',
+  attempts INT NOT NULL DEFAULT 0,
+  max_attempts INT NOT NULL DEFAULT 3,
+  run_after DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+  lease_owner VARCHAR(128) NULL,
+  lease_expires_at DATETIME NULL,
+  heartbeat_at DATETIME NULL,
+  cancel_requested TINYINT(1) NOT NULL DEFAULT 0,
+
+  progress JSON NULL,
+  result JSON NULL,
+  last_error TEXT NULL,
+
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  started_at DATETIME NULL,
+  finished_at DATETIME NULL,
+
+  PRIMARY KEY (id),
+  INDEX ix_rag_jobs_status_run_after (status, run_after),
+  INDEX ix_rag_jobs_domain_created_id (domain_id, created_at, id),
+  INDEX ix_rag_jobs_index_status (index_id, status)
+)
+ENGINE=InnoDB
+DEFAULT CHARSET=utf8mb4
+COLLATE=utf8mb4_unicode_ci;
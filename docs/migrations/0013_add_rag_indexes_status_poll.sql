@@ -0,0 +1,44 @@
+-- Поля фонового опроса статуса индексации (IndexStatusPoller)
+-- Миграция: 0013_add_rag_indexes_status_poll.sql
+
+SET @db := DATABASE();
+
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.COLUMNS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_indexes' AND COLUMN_NAME = 'status_poll_after'
+    ),
+    'SELECT 1',
+    'ALTER TABLE rag_indexes ADD COLUMN status_poll_after DATETIME NULL AFTER indexed_at'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
+
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.COLUMNS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_indexes' AND COLUMN_NAME = 'status_poll_attempts'
+    ),
+    'SELECT 1',
+    'ALTER TABLE rag_indexes ADD COLUMN status_poll_attempts INT NOT NULL DEFAULT 0 AFTER status_poll_after'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
+
+-- Выборка кандидатов опроса: indexing_status IN (...) AND status_poll_after <= NOW()
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.STATISTICS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_indexes' AND INDEX_NAME = 'ix_rag_indexes_status_poll'
+    ),
+    'SELECT 1',
+    'CREATE INDEX ix_rag_indexes_status_poll ON rag_indexes (indexing_status, status_poll_after)'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
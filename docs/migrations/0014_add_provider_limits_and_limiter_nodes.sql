@@ -0,0 +1,55 @@
+-- Клиентские лимиты вызовов провайдера (providers/limiter.py) и узлы для их деления между процессами
+-- Миграция: 0014_add_provider_limits_and_limiter_nodes.sql
+
+SET @db := DATABASE();
+
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.COLUMNS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_provider_connections' AND COLUMN_NAME = 'rate_limit_per_minute'
+    ),
+    'SELECT 1',
+    'ALTER TABLE rag_provider_connections ADD COLUMN rate_limit_per_minute INT NULL AFTER last_error'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
+
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.COLUMNS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_provider_connections' AND COLUMN_NAME = 'rate_limit_burst'
+    ),
+    'SELECT 1',
+    'ALTER TABLE rag_provider_connections ADD COLUMN rate_limit_burst INT NULL AFTER rate_limit_per_minute'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
+
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.COLUMNS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_provider_connections' AND COLUMN_NAME = 'max_concurrency'
+    ),
+    'SELECT 1',
+    'ALTER TABLE rag_provider_connections ADD COLUMN max_concurrency INT NULL AFTER rate_limit_burst'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
+
+-- Живые процессы (API, jobs_worker.py) при PROVIDER_LIMITER_DB_COORDINATION=true
+CREATE TABLE IF NOT EXISTS rag_limiter_nodes (
+  id VARCHAR(255) NOT NULL,
+  heartbeat_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (id),
+  INDEX ix_rag_limiter_nodes_heartbeat_at (heartbeat_at)
+)
+ENGINE=InnoDB
+DEFAULT CHARSET=utf8mb4
+COLLATE=utf8mb4_unicode_ci;
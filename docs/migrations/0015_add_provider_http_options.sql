@@ -0,0 +1,17 @@
+-- Параметры HTTP-клиента провайдера (providers/http_transport.py): HTTP/2, пул, таймауты, кеш DNS
+-- Миграция: 0015_add_provider_http_options.sql
+
+SET @db := DATABASE();
+
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.COLUMNS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_provider_connections' AND COLUMN_NAME = 'http_options'
+    ),
+    'SELECT 1',
+    'ALTER TABLE rag_provider_connections ADD COLUMN http_options JSON NULL AFTER max_concurrency'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
@@ -0,0 +1,63 @@
+-- Возобновляемая загрузка файлов кусками: сессии, принятые куски и SHA-256 содержимого в rag_files
+-- Миграция: 0016_create_rag_upload_sessions.sql
+
+CREATE TABLE IF NOT EXISTS rag_upload_sessions (
+  id VARCHAR(36) NOT NULL,
+  domain_id VARCHAR(128) NOT NULL,
+
+  file_id VARCHAR(36) NOT NULL,
+  file_name VARCHAR(512) NOT NULL,
+  file_type VARCHAR(128) NOT NULL,
+  local_path VARCHAR(1024) NOT NULL,
+  size_bytes BIGINT NOT NULL,
+  chunk_size BIGINT NOT NULL,
+
+  tags JSON NULL,
+  notes TEXT NULL,
+
+  expected_sha256 VARCHAR(64) NULL,
+  content_sha256 VARCHAR(64) NULL,
+
+  status VARCHAR(16) NOT NULL DEFAULT 'open',
+
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  expires_at DATETIME NOT NULL,
+
+  PRIMARY KEY (id),
+  INDEX ix_rag_upload_sessions_status_expires (status, expires_at),
+  INDEX ix_rag_upload_sessions_domain_created_id (domain_id, created_at, id)
+)
+ENGINE=InnoDB
+DEFAULT CHARSET=utf8mb4
+COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS rag_upload_chunks (
+  session_id VARCHAR(36) NOT NULL,
+  chunk_index INT NOT NULL,
+
+  size_bytes BIGINT NOT NULL,
+  sha256 VARCHAR(64) NOT NULL,
+
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (session_id, chunk_index)
+)
+ENGINE=InnoDB
+DEFAULT CHARSET=utf8mb4
+COLLATE=utf8mb4_unicode_ci;
+
+SET @db := DATABASE();
+
+SET @stmt := (
+  SELECT IF(
+    EXISTS(
+      SELECT 1
+      FROM INFORMATION_SCHEMA.COLUMNS
+      WHERE TABLE_SCHEMA = @db AND TABLE_NAME = 'rag_files' AND COLUMN_NAME = 'content_sha256'
+    ),
+    'SELECT 1',
+    'ALTER TABLE rag_files ADD COLUMN content_sha256 VARCHAR(64) NULL AFTER size_bytes'
+  )
+);
+PREPARE s FROM @stmt; EXECUTE s; DEALLOCATE PREPARE s;
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+# Модули приложения импортируются как в рантайме (из app/); окружение — до импорта config
+import os
+from pathlib import Path
+import sys
+import tempfile
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+_TMP_DIR = Path(tempfile.mkdtemp(prefix="vector-stores-tests-"))
+
+# Файловая SQLite: обработчики и пул потоков работают с одной базой (у sqlite:// своя база на поток)
+os.environ.setdefault("DATABASE_URI", f"sqlite:///{_TMP_DIR / 'tests.db'}")
+os.environ.setdefault("FILES_ROOT", str(_TMP_DIR / "files"))
+os.environ.setdefault("PROVIDER_SECRETS_KEY", "tests")
+os.environ.setdefault("LOG_TO_CONSOLE", "0")
+
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+from database import _statement_timeout_sql
+
+
+def test_statement_timeout_uses_server_specific_variable():
+    # max_statement_time есть только в MariaDB: на MySQL такое подключение падало бы с ошибкой
+    assert _statement_timeout_sql(True, 1500) == "SET SESSION max_statement_time=1.5"
+    assert _statement_timeout_sql(False, 1500) == "SET SESSION max_execution_time=1500"
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import httpx
+
+from providers import http_transport
+from providers.http_transport import get_http_client, http_settings_for, mount_transport
+
+
+def _routing_transport(monkeypatch, **env) -> http_transport._ProviderRoutingTransport:
+    for name in ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "NO_PROXY", "http_proxy", "https_proxy", "all_proxy", "no_proxy"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    settings, _ = http_settings_for(None)
+    return http_transport._ProviderRoutingTransport(settings)
+
+
+def test_environment_proxy_and_no_proxy(monkeypatch):
+    transport = _routing_transport(monkeypatch, HTTPS_PROXY="proxy.local:3128", NO_PROXY="internal.local")
+    try:
+        proxied = transport._route(httpx.Request("GET", "https://api.openai.com/v1/files"))
+        assert proxied is transport._proxies["https"]
+        assert transport._route(httpx.Request("GET", "https://internal.local/v1/files")) is transport._direct
+        assert transport._route(httpx.Request("GET", "http://api.openai.com/v1/files")) is transport._direct
+    finally:
+        transport.close()
+
+
+def test_without_proxy_requests_go_direct(monkeypatch):
+    transport = _routing_transport(monkeypatch)
+    try:
+        assert transport._proxies == {}
+        assert transport._route(httpx.Request("GET", "https://api.openai.com/v1/files")) is transport._direct
+    finally:
+        transport.close()
+
+
+def test_mount_transport_keeps_shared_clients_open():
+    settings, _ = http_settings_for({"dns_cache_ttl_seconds": 0})
+    client = get_http_client(settings)
+    mounted = httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True}))
+
+    assert mount_transport("http://fake-provider.local", mounted) is None
+    try:
+        assert get_http_client(settings) is client
+        assert client.get("http://fake-provider.local/v1/files").json() == {"ok": True}
+    finally:
+        assert mount_transport("http://fake-provider.local", None) is mounted
+    assert not client.is_closed
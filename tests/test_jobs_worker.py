@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+# Воркер очереди задач: соединения пула во время выполнения и размер результата в rag_jobs
+
+import pytest
+from sqlalchemy import text
+
+from database import get_pool_status, get_session_maker, init_db
+from services import jobs_worker
+from services.jobs_service import JOB_STATUS_SUCCEEDED, JobsService
+from services.jobs_worker import JOB_TYPE_PROVIDER_SYNC, JobWorker
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _db():
+    init_db()
+
+
+def _enqueue(job_type: str, **kwargs) -> str:
+    db = get_session_maker()()
+    try:
+        return JobsService(db=db).enqueue(job_type, domain_id=None, **kwargs).id
+    finally:
+        db.close()
+
+
+def _get_job(job_id: str):
+    db = get_session_maker()()
+    try:
+        return JobsService(db=db).get_job(job_id)
+    finally:
+        db.close()
+
+
+def test_claim_session_is_closed_while_job_runs(monkeypatch):
+    seen: dict = {}
+
+    def handler(db, job, ctx):
+        db.execute(text("SELECT 1"))
+        seen["checkedout"] = get_pool_status()["checkedout"]
+        return {"ok": True}
+
+    monkeypatch.setitem(jobs_worker.JOB_HANDLERS, "test_pool", handler)
+    job_id = _enqueue("test_pool")
+
+    assert JobWorker("tests").run_once()
+
+    # Только сессия обработчика; сессия захвата задачи уже вернула соединение в пул
+    assert seen["checkedout"] == 1
+    job = _get_job(job_id)
+    assert job.status == JOB_STATUS_SUCCEEDED
+    assert job.result == {"ok": True}
+
+
+def test_provider_sync_result_keeps_counters_only(monkeypatch):
+    class FakeSyncService:
+        def __init__(self, db):
+            pass
+
+        def stream_sync(self, provider_type):
+            report = {"provider_type": provider_type, "files_created": 3, "file_results": [], "errors": ["e"]}
+            return report, iter({"local_file_id": str(i)} for i in range(3))
+
+    monkeypatch.setattr(jobs_worker, "ProviderSyncService", FakeSyncService)
+    job_id = _enqueue(JOB_TYPE_PROVIDER_SYNC, provider_type="openai")
+
+    assert JobWorker("tests").run_once()
+
+    job = _get_job(job_id)
+    assert job.status == JOB_STATUS_SUCCEEDED
+    assert job.result["file_results"] == []
+    assert job.result["files_done"] == 3
+    assert job.result["errors"] == ["e"]
+    assert job.progress == {"files_done": 3}
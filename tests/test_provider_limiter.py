@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import pytest
+
+from providers.limiter import PRIORITY_DEFAULT, ProviderGovernor
+from providers.resilience import ProviderThrottledError
+
+
+@pytest.mark.parametrize(
+    "limits",
+    [
+        {"rate_per_minute": 60, "burst": 2, "max_concurrency": 0, "background_share": 0.0},
+        {"rate_per_minute": 60, "burst": 2, "max_concurrency": -1, "background_share": 0.5},
+    ],
+)
+def test_reconfigure_with_clamped_limits_keeps_buckets(limits):
+    # Часы стоят: токены пополняются только переконфигурацией
+    governor = ProviderGovernor("tests", clock=lambda: 0.0)
+    governor.configure(**limits)
+    for _ in range(2):
+        governor.acquire(PRIORITY_DEFAULT, timeout=0)
+        governor.release(PRIORITY_DEFAULT)
+
+    # get_provider вызывает configure с теми же настройками на каждый запрос
+    governor.configure(**limits)
+
+    with pytest.raises(ProviderThrottledError):
+        governor.acquire(PRIORITY_DEFAULT, timeout=0)
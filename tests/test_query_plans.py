@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+# Горячие выборки должны идти по индексу, а не полным просмотром таблицы: схема создаётся из моделей
+# в SQLite, план каждого запроса берётся из EXPLAIN QUERY PLAN. Индексы — те же, что в миграции 0010.
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from database import Base
+from models.rag_index import RagIndex
+from models.rag_index_file import RagIndexFile
+from models.rag_provider_file_upload import RagProviderFileUpload
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+HOT_LOOKUPS = {
+    "rag_indexes by (provider_type, external_id)": (
+        select(RagIndex.id).where(RagIndex.provider_type == "openai", RagIndex.external_id == "vs_1"),
+        "ix_rag_indexes_provider_external",
+    ),
+    "rag_index_files by file_id": (
+        select(RagIndexFile.index_id).where(RagIndexFile.file_id == "f1"),
+        "ix_rag_index_files_file_id",
+    ),
+    "rag_index_files by (index_id, include_order)": (
+        select(RagIndexFile.file_id).where(RagIndexFile.index_id == "i1").order_by(RagIndexFile.include_order),
+        "ix_rag_index_files_index_order",
+    ),
+    "rag_provider_file_uploads by (provider_id, local_file_id)": (
+        select(RagProviderFileUpload.id).where(
+            RagProviderFileUpload.provider_id == "openai",
+            RagProviderFileUpload.local_file_id == "f1",
+        ),
+        # Уникальное ограничение uq_rag_provider_file_uploads_provider_file; автоиндексы SQLite безымянные
+        "(provider_id=? AND local_file_id=?)",
+    ),
+    "rag_provider_file_uploads by local_file_id": (
+        select(RagProviderFileUpload.id).where(RagProviderFileUpload.local_file_id == "f1"),
+        "ix_rag_provider_file_uploads_local_file_id",
+    ),
+}
+
+
+def _query_plan(engine, stmt) -> list[str]:
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+@pytest.mark.parametrize("name", list(HOT_LOOKUPS))
+def test_hot_lookup_uses_index(engine, name):
+    stmt, expected = HOT_LOOKUPS[name]
+    plan = _query_plan(engine, stmt)
+
+    assert not any(step.startswith("SCAN") for step in plan), plan
+    assert any("USING" in step and "INDEX" in step and expected in step for step in plan), plan
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+# Возобновляемая загрузка через HTTP: сессия -> PUT кусков -> завершение
+
+import hashlib
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from api.uploads import router
+from database import init_db
+
+HEADERS = {"X-Domain-Id": "tests"}
+CHUNK_SIZE = 4
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_db()
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        yield client
+
+
+def _create_session(client: TestClient, content: bytes) -> str:
+    res = client.post(
+        "/api/v1/uploads",
+        headers=HEADERS,
+        json={"file_name": "a.bin", "size_bytes": len(content), "chunk_size": CHUNK_SIZE},
+    )
+    assert res.status_code == 200, res.text
+    return res.json()["id"]
+
+
+def _put_chunk(client: TestClient, session_id: str, chunk_index: int, data: bytes, sha256: str | None = None):
+    headers = dict(HEADERS)
+    if sha256 is not None:
+        headers["X-Chunk-Sha256"] = sha256
+    return client.put(f"/api/v1/uploads/{session_id}/chunks/{chunk_index}", headers=headers, content=data)
+
+
+def test_complete_returns_content_sha256(client):
+    content = b"abcdefghij"
+    session_id = _create_session(client, content)
+    for chunk_index in (2, 0, 1):
+        chunk = content[chunk_index * CHUNK_SIZE : (chunk_index + 1) * CHUNK_SIZE]
+        assert _put_chunk(client, session_id, chunk_index, chunk).status_code == 200
+
+    res = client.post(f"/api/v1/uploads/{session_id}/complete", headers=HEADERS)
+    assert res.status_code == 200, res.text
+    assert res.json()["content_sha256"] == hashlib.sha256(content).hexdigest()
+
+
+def test_rejected_reput_leaves_chunk_missing(client):
+    content = b"abcdefghij"
+    session_id = _create_session(client, content)
+    for chunk_index in range(3):
+        chunk = content[chunk_index * CHUNK_SIZE : (chunk_index + 1) * CHUNK_SIZE]
+        assert _put_chunk(client, session_id, chunk_index, chunk).status_code == 200
+
+    # Повторный PUT уже принятого куска пишет на диск другие байты и отклоняется по X-Chunk-Sha256
+    res = _put_chunk(client, session_id, 0, b"XXXX", sha256=hashlib.sha256(b"abcd").hexdigest())
+    assert res.status_code == 400
+
+    session = client.get(f"/api/v1/uploads/{session_id}", headers=HEADERS).json()
+    assert session["received_chunks"] == [1, 2]
+
+    res = client.post(f"/api/v1/uploads/{session_id}/complete", headers=HEADERS)
+    assert res.status_code == 409
+    assert res.json()["detail"] == "Загружены не все куски файла"
+
+    # После повторной загрузки куска хеш файла считается по байтам на диске
+    assert _put_chunk(client, session_id, 0, b"abcd").status_code == 200
+    res = client.post(f"/api/v1/uploads/{session_id}/complete", headers=HEADERS)
+    assert res.status_code == 200, res.text
+    assert res.json()["content_sha256"] == hashlib.sha256(content).hexdigest()